@@ -51,6 +51,12 @@ setup(
         "SpeechRecognition>=3.10.0",
     ],
     
+    # Dependencias opcionales
+    extras_require={
+        "re2": ["google-re2>=1.1"],
+        "trajectory": ["numpy>=1.20"],
+    },
+    
     # Versión mínima de Python
     python_requires=">=3.8",
     
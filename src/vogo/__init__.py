@@ -1,10 +1,58 @@
 __version__ = "0.1.0"  
 
-from .grammar import Grammar
-from .processor import Processor
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ['Grammar', 'Processor']
+# Los nombres públicos se importan al usarse por primera vez, para que
+# `import vogo` no cargue Lark, NLTK ni las dependencias de OCR y voz.
+_EXPORTS = {
+    'Grammar': '.grammar',
+    'Processor': '.processor',
+    'GrammarCache': '.cache',
+    'ResultCache': '.cache',
+    'GrammarRegistry': '.registry',
+    'Instrumentation': '.instrumentation',
+    'configure_nltk': '.nltk_resources',
+    'download_nltk_resources': '.nltk_resources',
+    'Tokenizer': '.tokenizer',
+    'RegexTokenizer': '.tokenizer',
+    'NLTKTokenizer': '.tokenizer',
+    'Result': '.result',
+    'GestureSession': '.gesture_session',
+    'GestureVocabulary': '.vocabulary',
+    'TrajectoryQuantizer': '.trajectory',
+}
 
-import re
-from typing import Dict
-from lark import Lark
\ No newline at end of file
+__all__ = ['Grammar', 'Processor', 'GrammarCache', 'ResultCache', 'GrammarRegistry', 'Instrumentation',
+           'configure_nltk', 'download_nltk_resources',
+           'Tokenizer', 'RegexTokenizer', 'NLTKTokenizer', 'Result', 'GestureSession',
+           'GestureVocabulary', 'TrajectoryQuantizer']
+
+if TYPE_CHECKING:
+    from .grammar import Grammar
+    from .processor import Processor
+    from .cache import GrammarCache, ResultCache
+    from .registry import GrammarRegistry
+    from .instrumentation import Instrumentation
+    from .nltk_resources import configure_nltk, download_nltk_resources
+    from .tokenizer import Tokenizer, RegexTokenizer, NLTKTokenizer
+    from .result import Result
+    from .gesture_session import GestureSession
+    from .vocabulary import GestureVocabulary
+    from .trajectory import TrajectoryQuantizer
+
+
+def __getattr__(name):
+    if name == 'Lark':
+        from lark import Lark
+        return Lark
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'vogo' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
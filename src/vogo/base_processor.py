@@ -1,49 +1,112 @@
-import re
-import nltk
-from typing import Dict, List, Any
-from lark import ParseError
+import contextvars
+from typing import Callable, Dict, List, Any, Optional, Union
 from .grammar import Grammar
-
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
+from .instrumentation import current_timings, stage
+from .result import Result
+from .spans import SpanList
+from .tokenizer import Tokenizer, get_tokenizer
 
 class BaseProcessor:
-    def __init__(self, grammar: Grammar):
+    def __init__(self, grammar: Grammar,
+                 tokenizer: Union[str, Tokenizer, Callable[[str], List[str]], None] = None,
+                 offsets: bool = False, lazy: bool = False):
         self.grammar = grammar
+        # 'regex' (por defecto), 'nltk', un `Tokenizer` o una función.
+        self.tokenizer = get_tokenizer(tokenizer)
+        # Con offsets, tokens y coincidencias son `SpanList`: posiciones en
+        # el texto procesado que crean las cadenas solo al acceder a ellas.
+        self.offsets = offsets
+        # Con lazy, `process` devuelve un `Result` que tokeniza y calcula
+        # las estadísticas solo si se leen.
+        self.lazy = lazy
+    
+    async def aprocess(self, input: Any) -> Dict[str, Any]:
+        """Versión asíncrona de `process`: se ejecuta en el executor por defecto del bucle."""
+        return await self._offload(self.process, input)
+    
+    async def _offload(self, function: Callable[..., Any], *args: Any) -> Any:
+        # Se copia el contexto para que las etapas medidas en el hilo se
+        # registren en la llamada instrumentada en curso.
+        import asyncio
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(None, context.run, function, *args)
     
-    def _nltk_tokenize_elements(self, text: str) -> List[str]:
+    def _tokenize_elements(self, text: str) -> List[str]:
         try:
-            return nltk.word_tokenize(text)
+            with stage('tokenize'):
+                if self.offsets:
+                    return self.tokenizer.token_spans(text)
+                return self.tokenizer.tokenize(text)
         except Exception as e:
-            raise ValueError(f"Error in NLTK tokenization: {str(e)}")
+            raise ValueError(f"Error in tokenization: {str(e)}")
     
     def _match_grammar(self, text: str) -> List[Dict[str, Any]]:
+        # Se lee la gramática una sola vez: si se sustituye durante la
+        # llamada, esta termina con la versión con la que empezó.
+        grammar = self.grammar
+        timings = current_timings()
+        with stage('match'):
+            return self._match(grammar, text, timings.rules if timings else None)
+    
+    def _match(self, grammar: Grammar, text: str,
+               durations: Optional[Dict[str, float]]) -> List[Dict[str, Any]]:
         matches = []
         
-        if self.grammar.type == 'regex':
-            for key, pattern in self.grammar.rules.items():
-                found = re.findall(pattern, text, re.IGNORECASE)
-                if found:
-                    matches.append({'type': key, 'matches': found})
+        if grammar.type == 'regex':
+            findall = grammar.matcher.findall_spans if self.offsets else grammar.matcher.findall
+            matches = findall(text, timeout=grammar.rule_timeout, durations=durations)
         
-        elif self.grammar.type == 'cfg':
+        elif grammar.scanner is not None:
+            spans = grammar.scanner.scan(
+                text, overlapping=grammar.cfg_mode == 'scan_all')
+            if spans:
+                matches.append({
+                    'type': 'cfg_scan',
+                    'matches': (SpanList.from_spans(text, spans) if self.offsets
+                                else [text[start:end] for start, end in spans]),
+                    'spans': spans
+                })
+        
+        elif grammar.type == 'cfg':
+            from lark.exceptions import ParseError, UnexpectedInput
             try:
-                tree = self.grammar.parser.parse(text)
+                tree = grammar.parser.parse(text)
                 matches.append({
                     'type': 'cfg_parse',
-                    'tree': str(tree),
-                    'matches': [text]
+                    'tree': grammar.render_tree(tree),
+                    'matches': SpanList.from_spans(text, [(0, len(text))]) if self.offsets else [text]
                 })
-            except ParseError:
+            except (ParseError, UnexpectedInput):
                 pass
         
+        elif grammar.type == 'gestures':
+            raise ValueError("Gesture grammars only apply to 'gestures' inputs.")
+        
         return matches
     
+    def _result(self, processed_text: str,
+                matches: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Tokeniza, busca coincidencias (salvo que se pasen ya calculadas) y
+        construye el resultado de `process`.
+        """
+        if self.lazy:
+            if matches is None:
+                matches = self._match_grammar(processed_text)
+            result = Result(processed_text, matches, tokenize=self._tokenize_elements)
+            timeouts = getattr(matches, 'timeouts', None)
+            if timeouts:
+                result['timeouts'] = timeouts
+            return result
+        elements = self._tokenize_elements(processed_text)
+        if matches is None:
+            matches = self._match_grammar(processed_text)
+        return self._build_result(processed_text, elements, matches)
+    
     def _build_result(self, processed_text: str, elements: List[str], 
                     matches: List[Dict[str, Any]]) -> Dict[str, Any]:
-        return {
+        result = {
             'text': processed_text,
             'tokens': elements,
             'matches': matches,
@@ -53,4 +116,9 @@ class BaseProcessor:
                 'unique_tokens': len(set(e.lower() for e in elements))
             }
         }
+        # Reglas abortadas por superar `Grammar.rule_timeout`.
+        timeouts = getattr(matches, 'timeouts', None)
+        if timeouts:
+            result['timeouts'] = timeouts
+        return result
     
\ No newline at end of file
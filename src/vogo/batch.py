@@ -0,0 +1,245 @@
+import re
+import time
+from bisect import bisect_right
+from functools import partial
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from .matcher import _WORD_RUN, MatchList, RegexMatcher, _findall_value
+from .regex_analysis import fold_text, joinable
+from .spans import SpanList
+
+# Separadores candidatos, ninguno de ellos carácter de palabra. Se elige el
+# que permite unir más reglas: '\n' no lo consume `.`, '\x00' no lo
+# consume `\s`.
+SEPARATORS = ('\n', '\x00', '\x1f')
+
+# Hasta este número de palabras clave, las de todas las reglas se buscan en
+# el texto unido con una sola alternancia en lugar de palabra a palabra.
+MAX_KEYWORD_ALTERNATION = 256
+
+
+class BatchMatcher:
+    """
+    Busca las reglas de un `RegexMatcher` en muchos textos cortos a la vez.
+
+    Los textos se unen con un separador y las reglas que lo permiten (ver
+    `regex_analysis.joinable`) se recorren una sola vez sobre el conjunto;
+    cada coincidencia se asigna a su texto con una búsqueda binaria sobre
+    los inicios. Las demás reglas (anclas, lookarounds, clases que
+    consumen el separador...) y los textos que contienen el separador se
+    buscan texto a texto. El resultado es el mismo que el de
+    `RegexMatcher.findall` sobre cada texto.
+    """
+
+    def __init__(self, matcher: RegexMatcher):
+        self.matcher = matcher
+        infos = matcher.infos
+        self.separator = max(SEPARATORS, key=lambda separator: sum(
+            joinable(info.pattern, separator, matcher.flags) for info in infos))
+        self.joined_rules = [index for index, info in enumerate(infos)
+                             if joinable(info.pattern, self.separator, matcher.flags)]
+        self.joined = self._submatcher(self.joined_rules)
+        self._keyword_regex = None
+        words = self.joined.keywords.words if self.joined is not None else {}
+        if 0 < len(words) <= MAX_KEYWORD_ALTERNATION:
+            # Las palabras están en su forma canónica; con IGNORECASE la
+            # alternancia reconoce las mismas variantes que `re`.
+            alternation = '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+            self._keyword_regex = re.compile(rf'\b(?:{alternation})\b', re.IGNORECASE)
+        self._rest: Dict[Tuple[int, ...], Tuple[List[int], Optional[RegexMatcher]]] = {}
+
+    def _submatcher(self, indices: Sequence[int]) -> Optional[RegexMatcher]:
+        if not indices:
+            return None
+        infos = self.matcher.infos
+        return RegexMatcher({infos[index].key: infos[index].pattern for index in indices},
+                            self.matcher.flags, self.matcher.backend)
+
+    def _rest_matcher(self, skip: Sequence[int]) -> Tuple[List[int], Optional[RegexMatcher]]:
+        """Reglas que no están en `skip` y su `RegexMatcher`, que se guarda por conjunto."""
+        key = tuple(skip)
+        rest = self._rest.get(key)
+        if rest is None:
+            indices = [index for index in range(len(self.matcher.infos)) if index not in skip]
+            rest = self._rest[key] = (indices, self._submatcher(indices))
+        return rest
+
+    def scan(self, texts: Sequence[str], timeout: Optional[float] = None,
+             durations: Optional[Dict[str, float]] = None,
+             spans: bool = False) -> Tuple[List[Dict[int, list]], List[List[str]]]:
+        """
+        Devuelve, por texto, un diccionario {índice de regla: coincidencias}
+        con los valores de `re.findall` (o un `SpanList` con `spans`), y por
+        texto las reglas que agotaron `timeout`. Al recorrer
+        los textos unidos el límite se multiplica por su número.
+        """
+        infos = self.matcher.infos
+        found: List[Dict[int, list]] = [{} for _ in texts]
+        timeouts: List[List[str]] = [[] for _ in texts]
+        separator = self.separator
+        joined = [position for position, text in enumerate(texts) if separator not in text]
+        if self.joined is None:
+            joined = []
+        expired: List[str] = []
+        if joined:
+            self._scan_joined(texts, joined, timeout, expired, durations, found, spans)
+
+        # Texto a texto: las reglas que no se pueden unir (o que agotaron
+        # el tiempo unidas), y todas en los textos con el separador.
+        keys = set(expired)
+        done = [index for index in self.joined_rules if infos[index].key not in keys]
+        in_joined = set(joined)
+        for position, text in enumerate(texts):
+            indices, matcher = self._rest_matcher(done if position in in_joined else ())
+            if matcher is None:
+                continue
+            scanned = matcher.scan(text, timeout, timeouts[position], durations)
+            for index, rule_hits in zip(indices, scanned):
+                if not rule_hits:
+                    continue
+                if spans:
+                    found[position][index] = SpanList.from_spans(
+                        text, [m.span(base or 0) for m, base in rule_hits])
+                else:
+                    groups = infos[index].groups
+                    found[position][index] = [_findall_value(m, base, groups)
+                                              for m, base in rule_hits]
+        return found, timeouts
+
+    def _scan_joined(self, texts: Sequence[str], joined: List[int], timeout: Optional[float],
+                     expired: List[str], durations: Optional[Dict[str, float]],
+                     found: List[Dict[int, list]], spans: bool):
+        """
+        Recorre cada carril de las reglas unibles sobre los textos `joined`.
+        Como en `RegexMatcher.scan`, un carril con literales obligatorios
+        solo recorre los textos que los contienen.
+        """
+        matcher = self.joined
+        if matcher.backend.linear:
+            timeout = None
+        lowered: List[Optional[str]] = []
+        if any(lane.prefiltered for lane in matcher.lanes):
+            for position in joined:
+                text = texts[position]
+                low = text.lower()
+                # Si algún carácter cambia de longitud, no se filtra el texto.
+                lowered.append(low if len(low) == len(text) else None)
+
+        steps = []
+        if matcher.keywords.rules:
+            steps.append((matcher.keywords.rules, joined, self._scan_keywords))
+        for lane in matcher.lanes:
+            positions = joined
+            if lane.prefiltered:
+                required = [matcher.infos[index].required for index in lane.members]
+                positions = [position for position, low in zip(joined, lowered)
+                             if low is None or any(all(piece in low for piece in pieces)
+                                                   for pieces in required)]
+            if timeout is None:
+                run = lane.scan
+            else:
+                # El límite de tiempo se multiplica por el número de textos.
+                run = partial(_timed_scan, matcher, lane,
+                              timeout=timeout * len(positions), timeouts=expired)
+            steps.append((lane.members, positions, run))
+
+        for members, positions, run in steps:
+            if not positions:
+                continue
+            start = time.perf_counter() if durations is not None else None
+            self._join(texts, positions, run, found, spans)
+            if start is not None:
+                label = matcher._label(members)
+                durations[label] = durations.get(label, 0.0) + time.perf_counter() - start
+
+    def _join(self, texts: Sequence[str], positions: List[int],
+              run: Callable[[str, List[list]], None], found: List[Dict[int, list]], spans: bool):
+        """Une los textos `positions`, ejecuta `run` y reparte sus coincidencias."""
+        starts = []
+        offset = 0
+        for position in positions:
+            starts.append(offset)
+            offset += len(texts[position]) + 1
+        starts.append(offset)
+        buffer = self.separator.join([texts[position] for position in positions])
+        hits: List[list] = [[] for _ in self.joined_rules]
+        run(buffer, hits)
+        infos = self.matcher.infos
+        for index, rule_hits in zip(self.joined_rules, hits):
+            if not rule_hits:
+                continue
+            groups = infos[index].groups
+            # Las coincidencias de una regla están ordenadas: solo se busca
+            # el texto cuando se sale del anterior.
+            low = high = 0
+            bucket: list = []
+            for m, base in rule_hits:
+                start = m.start(base or 0)
+                if not low <= start < high:
+                    item = bisect_right(starts, start) - 1
+                    low, high = starts[item], starts[item + 1]
+                    position = positions[item]
+                    bucket = found[position].get(index)
+                    if bucket is None:
+                        bucket = found[position][index] = (
+                            SpanList(texts[position]) if spans else [])
+                if spans:
+                    bucket.append(start - low, m.end(base or 0) - low)
+                elif base is None:
+                    # `m` puede ser del texto en minúsculas (`_scan_keywords`).
+                    bucket.append(buffer[start:m.end()])
+                else:
+                    bucket.append(_findall_value(m, base, groups))
+
+    def _scan_keywords(self, buffer: str, hits: List[list]):
+        """
+        `KeywordIndex.scan` sobre el texto unido. Con pocas palabras clave
+        se buscan todas con una alternancia y solo se consulta el índice en
+        cada coincidencia; si no, se recorren las palabras pasando a
+        minúsculas todo el texto de una vez. Las coincidencias pueden ser del
+        texto en minúsculas: `_join` toma los valores del original.
+        """
+        keywords = self.joined.keywords
+        words = keywords.words
+        if self._keyword_regex is not None:
+            for m in self._keyword_regex.finditer(buffer):
+                for index in words[fold_text(m.group())]:
+                    hits[index].append((m, None))
+            return
+        lowered = buffer.lower()
+        if len(lowered) != len(buffer):
+            keywords.scan(buffer, hits)
+            return
+        for m in _WORD_RUN.finditer(lowered):
+            word = m.group()
+            # Fuera de ASCII `lower` no siempre coincide con la forma de `re`.
+            rules = words.get(word if word.isascii() else fold_text(buffer[m.start():m.end()]))
+            if rules:
+                for index in rules:
+                    hits[index].append((m, None))
+
+    def findall(self, texts: Sequence[str], timeout: Optional[float] = None,
+                durations: Optional[Dict[str, float]] = None) -> List[MatchList]:
+        """`RegexMatcher.findall` de cada texto."""
+        found, timeouts = self.scan(texts, timeout, durations)
+        return [self._matches(rules, text_timeouts)
+                for rules, text_timeouts in zip(found, timeouts)]
+
+    def findall_spans(self, texts: Sequence[str], timeout: Optional[float] = None,
+                      durations: Optional[Dict[str, float]] = None) -> List[MatchList]:
+        """`RegexMatcher.findall_spans` de cada texto."""
+        found, timeouts = self.scan(texts, timeout, durations, spans=True)
+        return [self._matches(rules, text_timeouts)
+                for rules, text_timeouts in zip(found, timeouts)]
+
+    def _matches(self, rules: Dict[int, list], timeouts: List[str]) -> MatchList:
+        infos = self.matcher.infos
+        matches = MatchList()
+        for index in sorted(rules):
+            matches.append({'type': infos[index].key, 'matches': rules[index]})
+        matches.timeouts = timeouts
+        return matches
+
+
+def _timed_scan(matcher: RegexMatcher, lane, buffer: str, hits: List[list],
+                timeout: float, timeouts: List[str]):
+    matcher._timed_scan(lane, buffer, hits, timeout, timeouts)
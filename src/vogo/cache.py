@@ -0,0 +1,321 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Se incluye en las claves para invalidar artefactos de versiones anteriores.
+CACHE_FORMAT = 2
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get('VOGO_CACHE_DIR')
+    if base:
+        return base
+    xdg = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(xdg, 'vogo')
+
+
+def fingerprint(*parts: Any) -> str:
+    """Hash estable (sha256) de valores serializables como JSON."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=repr)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """
+    Almacén clave -> bytes en un directorio, con límite de tamaño total.
+
+    Las escrituras son atómicas (fichero temporal + `os.replace`), por lo que
+    varios procesos pueden compartir el mismo directorio. Al superar
+    `max_bytes` se eliminan primero las entradas usadas hace más tiempo.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024,
+                 suffix: str = '.bin'):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive.")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def set(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, self._path(key))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            return
+        self._evict(keep=self._path(key))
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        entries = []
+        for name in names:
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def _evict(self, keep: Optional[str] = None):
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return
+            for path, size, _ in sorted(entries, key=lambda e: e[2]):
+                if path == keep:
+                    continue
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+
+class GrammarCache:
+    """
+    Caché persistente de gramáticas compiladas.
+
+    Guarda el artefacto compilado de cada gramática (el `RegexMatcher`
+    analizado o los datos del parser de Lark) indexado por un hash de sus
+    reglas, su tipo y sus opciones, para que un proceso nuevo no tenga que
+    regenerarlo. El directorio debe ser de confianza: los artefactos se
+    cargan con `pickle`.
+    """
+
+    def __init__(self, directory: Optional[str] = None,
+                 max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory or os.path.join(default_cache_dir(), 'grammars')
+        self.store = DiskCache(self.directory, max_bytes, suffix='.grammar')
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        return fingerprint(CACHE_FORMAT, sys.version_info[:2], *parts)
+
+    def path(self, *parts: Any) -> str:
+        """Ruta de una entrada, para herramientas que escriben su propio fichero."""
+        os.makedirs(self.directory, exist_ok=True)
+        return self.store._path(self.key(*parts))
+
+    def load(self, *parts: Any) -> Optional[Any]:
+        key = self.key(*parts)
+        data = self.store.get(key)
+        if data is None:
+            return None
+        try:
+            return pickle.loads(data)
+        except Exception:
+            # Artefacto corrupto o de una versión incompatible.
+            self.store.delete(key)
+            return None
+
+    def save(self, artifact: Any, *parts: Any):
+        try:
+            data = pickle.dumps(artifact, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        self.store.set(self.key(*parts), data)
+
+
+_default_grammar_cache: Optional[GrammarCache] = None
+
+
+def resolve_grammar_cache(cache: Union[GrammarCache, bool, str, None]) -> Optional[GrammarCache]:
+    """Interpreta el argumento `cache` de `Grammar`: instancia, ruta, True o None."""
+    global _default_grammar_cache
+    if cache is None or cache is False:
+        return None
+    if isinstance(cache, GrammarCache):
+        return cache
+    if isinstance(cache, str):
+        return GrammarCache(cache)
+    if cache is True:
+        if _default_grammar_cache is None:
+            _default_grammar_cache = GrammarCache()
+        return _default_grammar_cache
+    raise ValueError(f"Invalid grammar cache: {cache!r}")
+
+
+class ResultCache:
+    """
+    Caché de resultados de `Processor` indexada por el contenido.
+
+    La clave es un hash de la huella de la gramática, la modalidad, las
+    opciones del procesador que cambian el resultado y la entrada (texto,
+    bytes de imagen o audio, lista de gestos), por lo que un acierto evita
+    también el OCR o el reconocimiento de voz. Hay un nivel en memoria (LRU,
+    limitado por entradas y bytes) y, con `directory`, otro en disco que se
+    conserva entre reinicios y se comparte entre procesos. `ttl` (segundos)
+    caduca las entradas de ambos niveles.
+
+    Los resultados se guardan serializados con `pickle`: cada acierto
+    devuelve una copia nueva y el directorio debe ser de confianza.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: Optional[float] = None, directory: Optional[str] = None,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive.")
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive.")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive.")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk = DiskCache(directory, max_disk_bytes, suffix='.result') if directory else None
+        self._lock = threading.Lock()
+        # clave -> (caducidad, resultado serializado), del menos al más reciente.
+        self._entries: 'OrderedDict[str, Tuple[Optional[float], bytes]]' = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+    @staticmethod
+    def key(grammar_fingerprint: str, modality: str, input: Union[str, bytes, List[str]],
+            scope: str = '') -> str:
+        """Hash (sha256) de la gramática, la modalidad, las opciones y la entrada."""
+        digest = hashlib.sha256()
+        digest.update(f'{CACHE_FORMAT}\0{grammar_fingerprint}\0{modality}\0{scope}\0'.encode('utf-8'))
+        if isinstance(input, bytes):
+            digest.update(b'b')
+            digest.update(input)
+        elif isinstance(input, str):
+            digest.update(b's')
+            digest.update(input.encode('utf-8', 'surrogatepass'))
+        elif hasattr(input, 'tobytes'):
+            # Arrays (NumPy, `array`): el `repr` de uno grande está recortado.
+            layout = (str(getattr(input, 'dtype', '')), getattr(input, 'typecode', None),
+                      getattr(input, 'shape', None))
+            digest.update(b'a')
+            digest.update(repr(layout).encode('utf-8'))
+            digest.update(input.tobytes())
+        else:
+            digest.update(b'j')
+            digest.update(json.dumps(input, ensure_ascii=False, default=repr).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, data = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return pickle.loads(data)
+                self._remove(key)
+        if self.disk is not None:
+            stored = self.disk.get(key)
+            if stored is not None:
+                try:
+                    expires, data = pickle.loads(stored)
+                    if expires is None or expires > now:
+                        result = pickle.loads(data)
+                        with self._lock:
+                            self.hits += 1
+                            self.disk_hits += 1
+                            self._store(key, expires, data)
+                        return result
+                except Exception:
+                    pass
+                # Caducada, corrupta o de una versión incompatible.
+                self.disk.delete(key)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, result: Any):
+        try:
+            data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._store(key, expires, data)
+        if self.disk is not None:
+            self.disk.set(key, pickle.dumps((expires, data), protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _store(self, key: str, expires: Optional[float], data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires, data)
+        self._bytes += len(data)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        _, data = self._entries.pop(key)
+        self._bytes -= len(data)
+
+    def clear(self):
+        """Vacía el nivel en memoria y reinicia los contadores (el disco se conserva)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.memory_hits = self.disk_hits = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
@@ -0,0 +1,178 @@
+import re
+from typing import Dict, List, Set, Tuple
+
+
+class CFGLexer:
+    """
+    Lexer básico construido a partir de los terminales de un parser de Lark.
+
+    A diferencia de `Lark.lex`, los caracteres que ningún terminal reconoce no
+    producen un error: se devuelven como separadores (`None`) que ninguna
+    coincidencia puede atravesar.
+    """
+
+    def __init__(self, terminals, ignore):
+        terminals = sorted(terminals, key=lambda t: (
+            -t.priority, -t.pattern.max_width, -len(t.pattern.value), t.name))
+        self.ignore = set(ignore)
+        # Igual que Lark: una cadena literal reconocida por un terminal regex
+        # se reetiqueta con el nombre del terminal literal.
+        self.strings = {t.pattern.value: t.name for t in terminals
+                        if t.pattern.type == 'str' and not t.pattern.flags}
+        self.regex = re.compile('|'.join(
+            f'({t.pattern.to_regexp()})' for t in terminals))
+        self.group_names = {}
+        group = 1
+        for t in terminals:
+            self.group_names[group] = t.name
+            group += 1 + re.compile(t.pattern.to_regexp()).groups
+
+    def lex(self, text: str) -> List:
+        """Lista de (tipo, inicio, fin) o None en los huecos no reconocidos."""
+        tokens = []
+        pos = 0
+        n = len(text)
+        match = self.regex.match
+        while pos < n:
+            m = match(text, pos)
+            if m is None or m.end() == pos:
+                if tokens and tokens[-1] is not None:
+                    tokens.append(None)
+                pos += 1
+                continue
+            name = self.group_names[m.lastindex]
+            if name not in self.ignore:
+                name = self.strings.get(m.group(), name)
+                tokens.append((name, pos, m.end()))
+            pos = m.end()
+        return tokens
+
+
+class CFGScanner:
+    """
+    Busca en un texto todos los tramos de tokens que derivan del símbolo
+    inicial de una gramática CFG.
+
+    Usa un único reconocedor de Earley en el que el símbolo inicial se siembra
+    en cada posición, de modo que las predicciones y compleciones se comparten
+    entre todos los puntos de inicio en lugar de volver a analizar cada
+    subcadena.
+    """
+
+    def __init__(self, parser, start: str):
+        self.start = start
+        self.lexer = CFGLexer(parser.lexer_conf.terminals, parser.lexer_conf.ignore)
+        self.rules: List[Tuple[str, Tuple[Tuple[str, bool], ...]]] = [
+            (str(rule.origin.name), tuple((str(s.name), s.is_term) for s in rule.expansion))
+            for rule in parser.rules
+        ]
+        self.by_lhs: Dict[str, List[int]] = {}
+        for index, (lhs, _) in enumerate(self.rules):
+            self.by_lhs.setdefault(lhs, []).append(index)
+        self.nullable = self._nullable()
+
+    def _nullable(self) -> Set[str]:
+        nullable: Set[str] = set()
+        changed = True
+        while changed:
+            changed = False
+            for lhs, rhs in self.rules:
+                if lhs not in nullable and all(
+                        not is_term and name in nullable for name, is_term in rhs):
+                    nullable.add(lhs)
+                    changed = True
+        return nullable
+
+    def _recognize(self, types: List[str]) -> Set[Tuple[int, int]]:
+        """Tramos (i, j) de tokens tales que types[i:j] deriva del símbolo inicial."""
+        rules = self.rules
+        by_lhs = self.by_lhs
+        nullable = self.nullable
+        start = self.start
+        start_rules = by_lhs.get(start, [])
+        n = len(types)
+
+        columns: List[Set[Tuple[int, int, int]]] = [set() for _ in range(n + 1)]
+        waiting: List[Dict[str, List[Tuple[int, int, int]]]] = [{} for _ in range(n + 1)]
+        spans: Set[Tuple[int, int]] = set()
+
+        for j in range(n + 1):
+            column = columns[j]
+            agenda = list(column)
+            for rule in start_rules:
+                item = (rule, 0, j)
+                if item not in column:
+                    column.add(item)
+                    agenda.append(item)
+            predicted = set()
+            waiting_j = waiting[j]
+
+            while agenda:
+                item = agenda.pop()
+                rule, dot, origin = item
+                lhs, rhs = rules[rule]
+
+                if dot == len(rhs):
+                    if lhs == start and origin < j:
+                        spans.add((origin, j))
+                    for w_rule, w_dot, w_origin in waiting[origin].get(lhs, ()):
+                        new = (w_rule, w_dot + 1, w_origin)
+                        if new not in column:
+                            column.add(new)
+                            agenda.append(new)
+                    continue
+
+                name, is_term = rhs[dot]
+                if is_term:
+                    if j < n and types[j] == name:
+                        columns[j + 1].add((rule, dot + 1, origin))
+                    continue
+
+                waiting_j.setdefault(name, []).append(item)
+                if name not in predicted:
+                    predicted.add(name)
+                    for sub in by_lhs.get(name, ()):
+                        new = (sub, 0, j)
+                        if new not in column:
+                            column.add(new)
+                            agenda.append(new)
+                if name in nullable:
+                    new = (rule, dot + 1, origin)
+                    if new not in column:
+                        column.add(new)
+                        agenda.append(new)
+        return spans
+
+    def scan(self, text: str, overlapping: bool = False) -> List[Tuple[int, int]]:
+        """
+        Tramos (inicio, fin) en caracteres. Por defecto devuelve, de izquierda a
+        derecha, el tramo más largo que empieza en cada punto sin solapamientos;
+        con `overlapping=True` devuelve todos los tramos.
+        """
+        tokens = self.lexer.lex(text)
+        segments = []
+        current = []
+        for token in tokens + [None]:
+            if token is None:
+                if current:
+                    segments.append(current)
+                current = []
+            else:
+                current.append(token)
+
+        spans = []
+        for segment in segments:
+            found = sorted(self._recognize([t[0] for t in segment]),
+                           key=lambda s: (s[0], -s[1]))
+            if not overlapping:
+                selected = []
+                end = -1
+                for i, j in found:
+                    if i >= end:
+                        selected.append((i, j))
+                        end = j
+                found = selected
+            else:
+                found.sort()
+            spans.extend((segment[i][1], segment[j - 1][2]) for i, j in found)
+        return spans
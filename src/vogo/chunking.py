@@ -0,0 +1,219 @@
+import codecs
+import os
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from .matcher import RegexMatcher, _findall_value
+from .tokenizer import Tokenizer
+
+# (inicio, fin, valor) con posiciones absolutas en el documento.
+Hit = Tuple[int, int, Any]
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_OVERLAP = 4096
+# Separadores tras los que se corta una ventana para no partir un token, y
+# longitud máxima de un tramo sin ellos que se espera entero.
+_SPACES = ' \n\t\r\f\v'
+MAX_TOKEN = 64 * 1024
+
+
+class Window:
+    """
+    Fragmento de un documento preparado para buscar coincidencias.
+
+    `text` empieza en la posición `offset` del documento e incluye contexto
+    a ambos lados del tramo `[start, end)`, el único del que se aceptan
+    coincidencias y tokens. Así las reglas con `\\b` o lookarounds ven los
+    caracteres vecinos y cada posición se confirma en una sola ventana.
+    """
+
+    __slots__ = ('text', 'offset', 'start', 'end', 'final')
+
+    def __init__(self, text: str, offset: int, start: int, end: int, final: bool):
+        self.text = text
+        self.offset = offset
+        self.start = start
+        self.end = end
+        self.final = final
+
+    def segment(self) -> str:
+        return self.text[self.start - self.offset:self.end - self.offset]
+
+
+def iter_chunks(source: Union[str, 'os.PathLike[str]', IO, Iterable[Union[str, bytes]]],
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                encoding: str = 'utf-8') -> Iterator[str]:
+    """
+    Trozos de texto de una ruta, un fichero abierto o un iterable de `str`
+    o `bytes`. Los `bytes` se decodifican de forma incremental, por lo que
+    un carácter puede quedar partido entre dos trozos.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', encoding=encoding, newline='') as f:
+            yield from iter_chunks(f, chunk_size, encoding)
+        return
+    if hasattr(source, 'read'):
+        f = source
+        source = iter(lambda: f.read(chunk_size), f.read(0))
+    decoder = None
+    for chunk in source:
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            chunk = decoder.decode(chunk)
+        if chunk:
+            yield chunk
+    if decoder is not None:
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+
+def stream_windows(chunks: Iterable[str], overlap: int = DEFAULT_OVERLAP) -> Iterator[Window]:
+    """
+    Ventanas sucesivas sobre un flujo de trozos.
+
+    Los últimos `overlap` caracteres de cada ventana se confirman en la
+    siguiente, que además conserva otros `overlap` caracteres ya confirmados
+    como contexto. El tramo confirmado termina tras el último espacio, de
+    modo que el token final, aún sin terminar, pasa entero a la siguiente
+    ventana; solo se parte un tramo sin espacios de más de `MAX_TOKEN`
+    caracteres. La memoria usada es la de un trozo más 2 × `overlap` (y el
+    token pendiente); una coincidencia que empiece antes del margen y sea
+    más larga que `overlap` puede quedar cortada.
+    """
+    if overlap < 0:
+        raise ValueError("overlap must be non-negative.")
+    buffer = ''
+    offset = 0
+    committed = 0
+    for chunk in chunks:
+        buffer += chunk
+        end = offset + len(buffer) - overlap
+        if end <= committed:
+            continue
+        boundary = _last_space(buffer, committed - offset, end - offset)
+        if boundary is not None:
+            end = offset + boundary
+        elif end - committed < MAX_TOKEN:
+            continue
+        yield Window(buffer, offset, committed, end, False)
+        keep = max(end - overlap, offset)
+        buffer = buffer[keep - offset:]
+        offset = keep
+        committed = end
+    end = offset + len(buffer)
+    if end > committed:
+        yield Window(buffer, offset, committed, end, True)
+
+
+def split_windows(text: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  overlap: int = DEFAULT_OVERLAP) -> Iterator[Window]:
+    """
+    Ventanas de un texto ya en memoria que se pueden procesar por separado:
+    cada una confirma hasta `chunk_size` caracteres (hasta el último espacio)
+    y lleva `overlap` de contexto a cada lado, como las de `stream_windows`.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive.")
+    if overlap < 0:
+        raise ValueError("overlap must be non-negative.")
+    length = len(text)
+    start = 0
+    while start < length:
+        end = min(start + chunk_size, length)
+        if end < length:
+            boundary = _last_space(text, start, end)
+            if boundary is None:
+                # El token sigue tras el tramo: se incluye entero si termina
+                # antes de `MAX_TOKEN` caracteres o con el texto.
+                limit = min(end + MAX_TOKEN, length)
+                boundary = _next_space(text, end, limit)
+                if boundary is None and limit == length:
+                    boundary = length
+            if boundary is not None:
+                end = boundary
+        offset = max(start - overlap, 0)
+        yield Window(text[offset:end + overlap], offset, start, end, end == length)
+        start = end
+
+
+def _last_space(text: str, low: int, high: int) -> Optional[int]:
+    """Posición tras el último espacio de `text[low:high]`; None si no hay."""
+    position = max(text.rfind(space, low, high) for space in _SPACES)
+    return position + 1 if position >= 0 else None
+
+
+def _next_space(text: str, low: int, high: int) -> Optional[int]:
+    """Posición tras el primer espacio de `text[low:high]`; None si no hay."""
+    positions = [position for position in (text.find(space, low, high) for space in _SPACES)
+                 if position >= 0]
+    return min(positions) + 1 if positions else None
+
+
+def window_hits(matcher: RegexMatcher, window: Window, timeout: Optional[float] = None,
+                timeouts: Optional[List[str]] = None,
+                durations: Optional[Dict[str, float]] = None) -> List[List[Hit]]:
+    """Coincidencias de cada regla que empiezan en el tramo confirmado de la ventana."""
+    offset = window.offset
+    low = window.start - offset
+    high = window.end - offset
+    result: List[List[Hit]] = []
+    scanned = matcher.scan(window.text, timeout, timeouts, durations)
+    for info, rule_hits in zip(matcher.infos, scanned):
+        bucket = []
+        for m, base in rule_hits:
+            start, end = m.span(base or 0)
+            if low <= start < high:
+                bucket.append((start + offset, end + offset, _findall_value(m, base, info.groups)))
+        result.append(bucket)
+    return result
+
+
+def window_tokens(tokenizer: Tokenizer, window: Window) -> List[Hit]:
+    """Tokens que empiezan en el tramo confirmado de la ventana."""
+    offset = window.offset
+    low = window.start - offset
+    high = window.end - offset
+    spans = tokenizer.token_spans(window.text)
+    return [(start + offset, end + offset, spans[index])
+            for index, (start, end) in enumerate(spans.spans())
+            if low <= start < high]
+
+
+class HitMerger:
+    """
+    Une las coincidencias de ventanas consecutivas en orden del documento.
+
+    Como `re.finditer`, descarta por regla las que empiezan antes del final
+    de la última aceptada: una misma coincidencia vista desde el contexto de
+    dos ventanas, o un trozo de una coincidencia ya confirmada, no se
+    duplica.
+    """
+
+    __slots__ = ('last_ends',)
+
+    def __init__(self, count: int):
+        self.last_ends = [-1] * count
+
+    def merge(self, index: int, hits: Iterable[Hit]) -> List[Hit]:
+        last_end = self.last_ends[index]
+        kept = []
+        for hit in hits:
+            if hit[0] < last_end:
+                continue
+            kept.append(hit)
+            last_end = hit[1]
+        self.last_ends[index] = last_end
+        return kept
+
+
+def build_matches(matcher: RegexMatcher, hits: List[List[Hit]]) -> List[Dict[str, Any]]:
+    """Lista de coincidencias con el formato de `process` y sus posiciones en 'spans'."""
+    matches = []
+    for info, rule_hits in zip(matcher.infos, hits):
+        if rule_hits:
+            matches.append({
+                'type': info.key,
+                'matches': [value for _, _, value in rule_hits],
+                'spans': [(start, end) for start, end, _ in rule_hits],
+            })
+    return matches
@@ -0,0 +1,61 @@
+from array import array
+from typing import Any, Dict, List, Sequence, Union
+from .instrumentation import current_timings, stage
+from .text_processor import TextProcessor
+
+class GestureProcessor(TextProcessor):
+    """
+    Procesa secuencias de gestos.
+
+    Con una gramática de tipo 'gestures' las reglas se buscan directamente
+    sobre la lista (ver `GestureMatcher`): los tokens son los gestos y cada
+    regla incluye en 'spans' las posiciones (inicio, fin) de sus
+    coincidencias en la lista. La entrada puede ser también un `array('H')`
+    de ids de `grammar.matcher.vocabulary.encode`, que ocupa dos bytes por
+    gesto y se busca sin volver a convertir los nombres. Con una gramática
+    regex o CFG los gestos se unen con espacios y se procesan como texto,
+    igual que en `TextProcessor`.
+    """
+    
+    def process(self, input: Union[str, List[str]]) -> Dict[str, Any]:
+        if self.grammar.type != 'gestures':
+            return super().process(input)
+        return self._gesture_result(self._prepare_gestures(input))
+    
+    def process_many(self, texts: List[Any]) -> List[Dict[str, Any]]:
+        if self.grammar.type != 'gestures':
+            return super().process_many(texts)
+        return [self._gesture_result(gestures) for gestures in texts]
+    
+    def _prepare_text(self, input: Union[str, List[str]]) -> Any:
+        if self.grammar.type != 'gestures':
+            if isinstance(input, array):
+                raise ValueError("Gesture ids require a 'gestures' grammar.")
+            return super()._prepare_text(input)
+        return self._prepare_gestures(input)
+    
+    def _prepare_gestures(self, input: Union[str, Sequence[str], array]) -> Union[List[str], array]:
+        if isinstance(input, array):
+            if not input:
+                raise ValueError("Input is empty.")
+            if input.typecode != 'H' or max(input) >= len(self.grammar.matcher.vocabulary):
+                raise ValueError("Gesture ids must be an array('H') from the grammar vocabulary.")
+            return input
+        # Un texto se toma como gestos separados por espacios.
+        gestures = input.split() if isinstance(input, str) else list(input)
+        if not gestures:
+            raise ValueError("Input is empty.")
+        for gesture in gestures:
+            if not isinstance(gesture, str):
+                raise ValueError(f"Invalid gesture: {gesture!r}. Gestures must be strings.")
+        return gestures
+    
+    def _gesture_result(self, gestures: Union[List[str], array]) -> Dict[str, Any]:
+        grammar = self.grammar
+        timings = current_timings()
+        with stage('match'):
+            matches = grammar.matcher.find(gestures, timeout=grammar.rule_timeout,
+                                           durations=timings.rules if timings else None)
+        if isinstance(gestures, array):
+            gestures = grammar.matcher.vocabulary.decode(gestures)
+        return self._build_result(' '.join(gestures), gestures, matches)
@@ -0,0 +1,305 @@
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .gestures import Node
+from .grammar import Grammar
+from .vocabulary import GestureVocabulary
+
+# Tipos de estado del autómata.
+_SYMBOL, _ANY, _SPLIT, _ACCEPT = range(4)
+
+# Tope de estados por regla: las repeticiones acotadas ({n,m}) se expanden.
+MAX_STATES = 10000
+
+
+class _Program:
+    """
+    Autómata de Thompson de una regla de gestos: estados que consumen un
+    gesto (`_SYMBOL`, `_ANY`), bifurcaciones sin consumir (`_SPLIT`) y el
+    estado final (`_ACCEPT`).
+    """
+
+    __slots__ = ('kinds', 'args', 'outs', 'start')
+
+    def __init__(self, tree: Node):
+        self.kinds: List[int] = []
+        self.args: List[Optional[int]] = []
+        self.outs: List[List[Optional[int]]] = []
+        start, dangling = self._build(tree)
+        self._patch(dangling, self._state(_ACCEPT))
+        self.start = start
+
+    def _state(self, kind: int, arg: Optional[int] = None) -> int:
+        if len(self.kinds) >= MAX_STATES:
+            raise ValueError("pattern is too large for incremental matching")
+        self.kinds.append(kind)
+        self.args.append(arg)
+        self.outs.append([None, None])
+        return len(self.kinds) - 1
+
+    def _patch(self, dangling: List[Tuple[int, int]], target: int):
+        for state, slot in dangling:
+            self.outs[state][slot] = target
+
+    def _build(self, node: Node) -> Tuple[int, List[Tuple[int, int]]]:
+        """Fragmento del nodo: su estado inicial y las salidas por conectar."""
+        kind = node[0]
+        if kind in ('gesture', 'any'):
+            state = (self._state(_SYMBOL, node[1]) if kind == 'gesture'
+                     else self._state(_ANY))
+            return state, [(state, 0)]
+        if kind == 'seq':
+            start, dangling = self._build(node[1][0])
+            for item in node[1][1:]:
+                item_start, item_dangling = self._build(item)
+                self._patch(dangling, item_start)
+                dangling = item_dangling
+            return start, dangling
+        if kind == 'alt':
+            start, dangling = self._build(node[1][-1])
+            for branch in reversed(node[1][:-1]):
+                branch_start, branch_dangling = self._build(branch)
+                split = self._state(_SPLIT)
+                self.outs[split] = [branch_start, start]
+                start, dangling = split, branch_dangling + dangling
+            return start, dangling
+
+        _, item, low, high = node
+        if low == 0 and high == 0:
+            empty = self._state(_SPLIT)
+            return empty, [(empty, 0), (empty, 1)]
+        # x{2,4} = x x (x (x)?)?   x{2,} = x x x*
+        fragments = [self._build(item) for _ in range(low)]
+        if high is None:
+            loop = self._state(_SPLIT)
+            item_start, item_dangling = self._build(item)
+            self.outs[loop][0] = item_start
+            self._patch(item_dangling, loop)
+            fragments.append((loop, [(loop, 1)]))
+        elif high > low:
+            start, dangling = self._build(item)
+            optional = self._state(_SPLIT)
+            self.outs[optional][0] = start
+            tail = (optional, dangling + [(optional, 1)])
+            for _ in range(high - low - 1):
+                start, dangling = self._build(item)
+                self._patch(dangling, tail[0])
+                optional = self._state(_SPLIT)
+                self.outs[optional][0] = start
+                tail = (optional, tail[1] + [(optional, 1)])
+            fragments.append(tail)
+        start, dangling = fragments[0]
+        for fragment_start, fragment_dangling in fragments[1:]:
+            self._patch(dangling, fragment_start)
+            dangling = fragment_dangling
+        return start, dangling
+
+
+class _RuleState:
+    """Hilos vivos de una regla: (estado que espera un gesto, índice de inicio)."""
+
+    __slots__ = ('key', 'program', 'threads')
+
+    def __init__(self, key: str, program: _Program):
+        self.key = key
+        self.program = program
+        self.threads: List[Tuple[int, int]] = []
+
+
+class GestureSession:
+    """
+    Reconocimiento incremental de una gramática de gestos: los gestos se
+    añaden de uno en uno con `push` y cada llamada devuelve las
+    coincidencias que completa, sin volver a recorrer la secuencia.
+
+    Cada regla se simula como un autómata (máquina de Pike): se mantiene el
+    conjunto de estados alcanzables junto con el gesto en que empezó cada
+    uno, así que el coste por gesto no depende de la longitud de la sesión.
+    Sin límites es proporcional al número de estados de la gramática; con
+    `window` o `max_duration` un estado guarda un intento por cada inicio
+    aún válido (uno más joven puede sobrevivir al más antiguo), y el coste
+    es O(estados × gestos en la ventana). Una coincidencia se emite en cuanto se
+    completa (la que termina antes y, de ellas, la que empieza antes) y la
+    regla sigue a partir del gesto siguiente, sin solapamientos: con
+    `(izquierda | derecha)+` cada gesto lateral es una coincidencia.
+
+    - `window`: número máximo de gestos de una coincidencia; los intentos
+      más largos se descartan.
+    - `max_duration`: segundos máximos entre el primer y el último gesto
+      de una coincidencia.
+    - `debounce`: un gesto igual al anterior que llega antes de estos
+      segundos (contados desde la última repetición) se ignora.
+
+    Los índices de 'spans' cuentan los gestos aceptados desde el inicio de
+    la sesión (sin los ignorados por `debounce`). Los gestos pendientes se
+    guardan como ids de `vocabulary` en un `array('H')`, y sus instantes en
+    un `array('d')`.
+    """
+
+    def __init__(self, grammar: Grammar, window: Optional[int] = None,
+                 max_duration: Optional[float] = None, debounce: float = 0.0):
+        if grammar.type != 'gestures':
+            raise ValueError("Gesture sessions require a 'gestures' grammar.")
+        if window is not None and window < 1:
+            raise ValueError("window must be positive.")
+        if max_duration is not None and max_duration <= 0:
+            raise ValueError("max_duration must be positive.")
+        if debounce < 0:
+            raise ValueError("debounce must be non-negative.")
+        self.grammar = grammar
+        self.window = window
+        self.max_duration = max_duration
+        self.debounce = debounce
+        # Los gestos de la gramática conservan sus ids; los demás nombres se
+        # añaden al vocabulario de la sesión según llegan.
+        self.vocabulary = GestureVocabulary(grammar.matcher.vocabulary.names)
+        self.rules: List[_RuleState] = []
+        for key, tree in grammar.matcher.trees.items():
+            try:
+                program = _Program(tree)
+            except ValueError as e:
+                raise ValueError(f"Invalid gesture pattern for '{key}': {str(e)}")
+            self.rules.append(_RuleState(key, program))
+        self.reset()
+
+    def reset(self):
+        """Descarta los gestos recibidos y los intentos en curso."""
+        for rule in self.rules:
+            rule.threads = []
+        self.position = 0
+        # Gestos (ids) e instantes desde el índice `_base`.
+        self._ids = array('H')
+        self._times = array('d')
+        self._base = 0
+        # Primer índice aún dentro de `max_duration`; solo avanza.
+        self._expired = 0
+        self._last: Optional[Tuple[int, float]] = None
+
+    def push(self, gesture: str, timestamp: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Añade un gesto y devuelve las coincidencias que termina, con el
+        formato de `resultado['matches']`: una entrada por regla con la
+        subsecuencia en 'matches' y su posición en 'spans'.
+        """
+        id = self.vocabulary.intern(gesture)
+        folded = self.vocabulary.folded[id]
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if self.debounce and self._last is not None:
+            last_id, last_time = self._last
+            if folded == last_id and timestamp - last_time < self.debounce:
+                self._last = (folded, timestamp)
+                return []
+        self._last = (folded, timestamp)
+
+        index = self.position
+        self.position += 1
+        self._ids.append(id)
+        self._times.append(timestamp)
+        oldest = self._oldest_start(index, timestamp)
+        matches = []
+        for rule in self.rules:
+            start = self._step(rule, folded, index, oldest)
+            if start is not None:
+                matches.append({
+                    'type': rule.key,
+                    'matches': [self._gestures(start, index + 1)],
+                    'spans': [(start, index + 1)],
+                })
+        self._trim(index + 1)
+        return matches
+
+    def feed(self, gestures: Iterable[str]) -> List[Dict[str, Any]]:
+        """Añade varios gestos (con el instante actual) y devuelve todas las coincidencias."""
+        matches = []
+        for gesture in gestures:
+            matches.extend(self.push(gesture))
+        return matches
+
+    def _oldest_start(self, index: int, timestamp: float) -> int:
+        """Primer índice en que puede empezar una coincidencia que termine en `index`."""
+        oldest = 0
+        if self.window is not None:
+            oldest = index - self.window + 1
+        if self.max_duration is not None:
+            times = self._times
+            position = max(oldest, self._expired, self._base)
+            while position < index and \
+                    timestamp - times[position - self._base] > self.max_duration:
+                position += 1
+            self._expired = position
+            oldest = position
+        return oldest
+
+    def _step(self, rule: _RuleState, gesture: int, index: int, oldest: int) -> Optional[int]:
+        """
+        Avanza los hilos de la regla con el gesto `index` y devuelve el
+        inicio de la coincidencia que termina en él, si la hay. `gesture`
+        es el id en minúsculas del gesto.
+        """
+        program = rule.program
+        kinds, args, outs = program.kinds, program.args, program.outs
+        # Sin caducidad, de dos hilos en el mismo estado basta el que empezó
+        # antes. Con `window` o `max_duration` ese puede caducar antes que
+        # el otro, así que se conservan todos los inicios de cada estado.
+        by_start = self.window is not None or self.max_duration is not None
+        # Hilos vivos (ordenados por inicio) más uno nuevo que empieza aquí.
+        current = [(state, start) for state, start in rule.threads if start >= oldest]
+        seen = set() if by_start else {state for state, _ in current}
+        self._closure(program, program.start, index, current, seen, by_start)
+
+        following: List[Tuple[int, int]] = []
+        visited: set = set()
+        accepted = None
+        for state, start in current:
+            kind = kinds[state]
+            if kind == _ANY or (kind == _SYMBOL and args[state] == gesture):
+                if self._closure(program, outs[state][0], start, following, visited, by_start) \
+                        and accepted is None:
+                    accepted = start
+        rule.threads = [] if accepted is not None else following
+        return accepted
+
+    @staticmethod
+    def _closure(program: _Program, state: int, start: int,
+                 threads: List[Tuple[int, int]], visited: set, by_start: bool) -> bool:
+        """
+        Añade a `threads` los estados que consumen gesto alcanzables desde
+        `state` sin consumir; devuelve True si se alcanza el estado final.
+        `visited` guarda los estados (o los pares (estado, inicio) con
+        `by_start`) ya añadidos en este paso.
+        """
+        kinds, outs = program.kinds, program.outs
+        accepted = False
+        stack = [state]
+        while stack:
+            state = stack.pop()
+            key = (state, start) if by_start else state
+            if key in visited:
+                continue
+            visited.add(key)
+            kind = kinds[state]
+            if kind == _SPLIT:
+                stack.append(outs[state][1])
+                stack.append(outs[state][0])
+            elif kind == _ACCEPT:
+                accepted = True
+            else:
+                threads.append((state, start))
+        return accepted
+
+    def _gestures(self, start: int, end: int) -> List[str]:
+        return self.vocabulary.decode(self._ids[start - self._base:end - self._base])
+
+    def _trim(self, end: int):
+        """
+        Olvida los gestos anteriores al inicio del hilo vivo más antiguo. Se
+        recortan cuando son al menos la mitad, para que el coste por gesto
+        no dependa de cuántos quedan.
+        """
+        oldest = min((start for rule in self.rules for _, start in rule.threads), default=end)
+        drop = oldest - self._base
+        if drop and drop * 2 >= len(self._ids):
+            del self._ids[:drop]
+            del self._times[:drop]
+            self._base = oldest
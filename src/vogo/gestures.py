@@ -0,0 +1,236 @@
+import re
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from .matcher import MatchList, RegexMatcher
+from .vocabulary import UNKNOWN, GestureVocabulary
+
+# Cada gesto de la gramática se representa con un carácter de uso privado de
+# Unicode, de modo que una secuencia de gestos es una cadena de la misma
+# longitud y las posiciones de una coincidencia son índices en la lista.
+# Los gestos que no aparecen en la gramática comparten `OTHER`.
+OTHER = '\ue000'
+_SYMBOL_RANGES = ((0xE001, 0xF8FF), (0xF0000, 0xFFFFD), (0x100000, 0x10FFFD))
+
+_TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<name>[\w-]+)
+      | (?P<repeat>\{\s*(?P<low>\d+)\s*(?:(?P<comma>,)\s*(?P<high>\d*)\s*)?\})
+      | (?P<op>[()|*+?])
+      | (?P<end>$)
+    )''', re.VERBOSE)
+
+WILDCARD = '_'
+
+
+def _symbol(index: int) -> str:
+    for low, high in _SYMBOL_RANGES:
+        if index <= high - low:
+            return chr(low + index)
+        index -= high - low + 1
+    raise ValueError("Too many distinct gestures in the grammar.")
+
+
+# Nodos del árbol de una expresión de gestos (los gestos, por su id en el
+# vocabulario de la gramática):
+#   ('gesture', id) | ('any',) | ('seq', [nodos]) | ('alt', [nodos])
+#   | ('repeat', nodo, mínimo, máximo o None)
+Node = Tuple[Any, ...]
+
+
+class _PatternParser:
+    """
+    Analiza una expresión de gestos:
+
+        arriba{2} derecha          dos 'arriba' seguidos de 'derecha'
+        (izquierda | derecha)+     uno o más gestos laterales
+        abrir _* cerrar            'abrir', cualquier secuencia y 'cerrar'
+
+    Los nombres se separan con espacios; `|` es la alternativa, `()` agrupa,
+    `* + ? {n} {n,} {n,m}` repiten el elemento anterior y `_` es cualquier
+    gesto.
+    """
+
+    _QUANTIFIERS = {'*': (0, None), '+': (1, None), '?': (0, 1)}
+
+    def __init__(self, pattern: str, intern):
+        self.pattern = pattern
+        self.intern = intern
+        self.tokens: List[Tuple[str, str, int, re.Match]] = []
+        position = 0
+        while True:
+            m = _TOKEN.match(pattern, position)
+            if m is None:
+                rest = pattern[position:].lstrip()
+                raise ValueError(f"unexpected character {rest[0]!r} "
+                                 f"at position {len(pattern) - len(rest)}")
+            kind = m.lastgroup if m.lastgroup in ('name', 'op', 'end') else 'repeat'
+            self.tokens.append((kind, m.group(kind), m.start(kind), m))
+            if kind == 'end':
+                break
+            position = m.end()
+        self.index = 0
+
+    def parse(self) -> Node:
+        node = self.alternation()
+        kind, value, position, _ = self.tokens[self.index]
+        if kind != 'end':
+            raise ValueError(f"unexpected {value!r} at position {position}")
+        return node
+
+    def peek(self) -> Tuple[str, str]:
+        kind, value, _, _ = self.tokens[self.index]
+        return kind, value
+
+    def alternation(self) -> Node:
+        branches = [self.sequence()]
+        while self.peek() == ('op', '|'):
+            self.index += 1
+            branches.append(self.sequence())
+        return ('alt', branches) if len(branches) > 1 else branches[0]
+
+    def sequence(self) -> Node:
+        items = []
+        while self.peek()[0] in ('name', 'op') and self.peek()[1] not in ('|', ')'):
+            items.append(self.repeat())
+        if not items:
+            _, value, position, _ = self.tokens[self.index]
+            raise ValueError(f"expected a gesture at position {position}")
+        return ('seq', items) if len(items) > 1 else items[0]
+
+    def repeat(self) -> Node:
+        atom = self.atom()
+        kind, value, position, m = self.tokens[self.index]
+        if kind == 'op' and value in self._QUANTIFIERS:
+            low, high = self._QUANTIFIERS[value]
+        elif kind == 'repeat':
+            low = int(m.group('low'))
+            high = m.group('high')
+            high = int(high) if high else (None if m.group('comma') else low)
+            if high is not None and high < low:
+                raise ValueError(f"invalid repeat {{{low},{high}}} at position {position}")
+        else:
+            return atom
+        self.index += 1
+        kind, value, position, _ = self.tokens[self.index]
+        if kind == 'repeat' or (kind == 'op' and value in self._QUANTIFIERS):
+            raise ValueError(f"multiple repeat at position {position}")
+        return ('repeat', atom, low, high)
+
+    def atom(self) -> Node:
+        kind, value, position, _ = self.tokens[self.index]
+        self.index += 1
+        if kind == 'name':
+            return ('any',) if value == WILDCARD else ('gesture', self.intern(value.lower()))
+        if (kind, value) == ('op', '('):
+            node = self.alternation()
+            kind, value, position, _ = self.tokens[self.index]
+            if (kind, value) != ('op', ')'):
+                raise ValueError(f"missing ')' at position {position}")
+            self.index += 1
+            return node
+        if kind == 'end':
+            raise ValueError("unexpected end of pattern")
+        raise ValueError(f"unexpected {value!r} at position {position}")
+
+
+def to_regex(node: Node) -> str:
+    """Expresión regular equivalente sobre los símbolos (se compila con DOTALL)."""
+    kind = node[0]
+    if kind == 'gesture':
+        return re.escape(_symbol(node[1]))
+    if kind == 'any':
+        return '.'
+    if kind == 'seq':
+        return ''.join(to_regex(item) for item in node[1])
+    if kind == 'alt':
+        return f"(?:{'|'.join(to_regex(branch) for branch in node[1])})"
+    _, item, low, high = node
+    quantifier = {(0, None): '*', (1, None): '+', (0, 1): '?'}.get((low, high))
+    if quantifier is None:
+        quantifier = f"{{{low}}}" if low == high else f"{{{low},{'' if high is None else high}}}"
+    return f'(?:{to_regex(item)}){quantifier}'
+
+
+class GestureMatcher:
+    """
+    Motor de coincidencias para gramáticas de gestos.
+
+    Cada regla es una expresión sobre nombres de gestos (ver
+    `_PatternParser`) que se traduce a una expresión regular sobre los
+    símbolos de los gestos y se busca con un `RegexMatcher`: las reglas se
+    combinan en carriles y admiten `timeout` igual que las regex. Los nombres
+    no distinguen mayúsculas. Como `re.finditer`, cada regla devuelve las
+    coincidencias más a la izquierda que no se solapan.
+    """
+
+    def __init__(self, rules: Dict[str, str]):
+        # Gestos de la gramática, en minúsculas: sus ids son 0..n-1 y el
+        # símbolo de cada uno es `_symbol(id)`.
+        self.vocabulary = GestureVocabulary()
+        # Árbol de cada regla (para `GestureSession`) y su traducción a regex.
+        self.trees: Dict[str, Node] = {}
+        self.patterns: Dict[str, str] = {}
+        for key, pattern in rules.items():
+            try:
+                tree = _PatternParser(pattern, self.vocabulary.intern).parse()
+            except ValueError as e:
+                raise ValueError(f"Invalid gesture pattern for '{key}': {str(e)}")
+            regex = to_regex(tree)
+            if re.compile(regex, re.DOTALL).match(''):
+                raise ValueError(
+                    f"Invalid gesture pattern for '{key}': it can match an empty sequence")
+            self.trees[key] = tree
+            self.patterns[key] = regex
+        self.matcher = RegexMatcher(self.patterns, flags=re.DOTALL)
+        self._size = self._known = len(self.vocabulary)
+        # Símbolo de cada id del vocabulario, para `str.translate`. Los ids
+        # que se añadan después (otras grafías, gestos desconocidos) se
+        # incorporan al usarlos.
+        self._symbols = {id: _symbol(id) for id in range(self._size)}
+        self._symbols[UNKNOWN] = OTHER
+
+    @property
+    def risky_rules(self) -> List[str]:
+        return self.matcher.risky_rules
+
+    def encode(self, gestures: Union[Sequence[str], array]) -> str:
+        """
+        Cadena con el símbolo de cada gesto (`OTHER` si no está en la
+        gramática). `gestures` puede ser una lista de nombres o un
+        `array('H')` de ids de `vocabulary.encode`.
+        """
+        vocabulary = self.vocabulary
+        ids = gestures if isinstance(gestures, array) else vocabulary.lookup(gestures)
+        size = len(vocabulary)
+        if self._known < size:
+            folded = vocabulary.folded
+            for id in range(self._known, size):
+                self._symbols[id] = _symbol(folded[id]) if folded[id] < self._size else OTHER
+            self._known = size
+        return vocabulary.text(ids).translate(self._symbols)
+
+    def find(self, gestures: Union[Sequence[str], array], timeout: Optional[float] = None,
+             durations: Optional[Dict[str, float]] = None) -> MatchList:
+        """
+        Coincidencias de cada regla: 'matches' son las subsecuencias de
+        gestos y 'spans' sus posiciones (inicio, fin) en `gestures`, que
+        puede ser también un `array('H')` de ids (ver `encode`).
+        """
+        timeouts: List[str] = []
+        matches = MatchList()
+        scanned = self.matcher.scan(self.encode(gestures), timeout, timeouts, durations)
+        for info, hits in zip(self.matcher.infos, scanned):
+            if hits:
+                spans = [m.span(base or 0) for m, base in hits]
+                matches.append({
+                    'type': info.key,
+                    'matches': [self._gestures(gestures, start, end) for start, end in spans],
+                    'spans': spans,
+                })
+        matches.timeouts = timeouts
+        return matches
+
+    def _gestures(self, gestures: Union[Sequence[str], array], start: int, end: int) -> List[str]:
+        if isinstance(gestures, array):
+            return self.vocabulary.decode(gestures[start:end])
+        return list(gestures[start:end])
@@ -1,29 +1,238 @@
 import re
-from typing import Dict
-from lark import Lark
+import threading
+import uuid
+import warnings
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from .cache import GrammarCache, fingerprint, resolve_grammar_cache
+from .cfg_scanner import CFGScanner
+from .matcher import RegexMatcher
+from .regex_backends import RegexBackend, get_backend
+
+# Lark solo se importa al construir una gramática CFG.
+if TYPE_CHECKING:
+    from lark import Lark
+
+GRAMMAR_TYPES = ('regex', 'cfg', 'gestures')
+CFG_PARSERS = ('earley', 'lalr', 'auto')
+TREE_FORMATS = ('str', 'tree')
+CFG_MODES = ('parse', 'scan', 'scan_all')
+RISKY_ACTIONS = ('ignore', 'warn', 'error')
+
+# Identidad de los transformers en la huella: su `cache_key` o, si no tienen,
+# un valor aleatorio por objeto, que no se repite aunque Python reutilice su
+# `id()` ni en otro proceso.
+_identities: 'weakref.WeakKeyDictionary[Any, str]' = weakref.WeakKeyDictionary()
+_identities_lock = threading.Lock()
 
 class Grammar:
-    def __init__(self, rules: Dict[str, str], type: str = 'regex'):
-        
+    def __init__(self, rules: Dict[str, str], type: str = 'regex',
+                 cache: Union[GrammarCache, bool, str, None] = None,
+                 parser: str = 'earley', transformer: Optional[Any] = None,
+                 tree_format: str = 'str', cfg_mode: str = 'parse',
+                 backend: Union[str, RegexBackend] = 're',
+                 rule_timeout: Optional[float] = None, on_risky: str = 'ignore'):
+
         if not rules:
             raise ValueError("Grammar rules cannot be empty.")
-        
+
         self.type = type
         self.rules = rules
         self.parser = None
-        
+        self.matcher = None
+        self.parser_type = None
+        self.scanner = None
+        self.transformer = transformer
+        self.tree_format = tree_format
+        self.cfg_mode = cfg_mode
+        self.rule_timeout = rule_timeout
+        if rule_timeout is not None and rule_timeout <= 0:
+            raise ValueError("rule_timeout must be positive.")
+        if on_risky not in RISKY_ACTIONS:
+            raise ValueError(f"Invalid on_risky action: {on_risky}. Must be one of {RISKY_ACTIONS}.")
         if type == 'cfg':
-            grammar_str = "\n".join([f"{k}: {v}" for k, v in rules.items()])
-            try:
-                self.parser = Lark(grammar_str, start=list(rules.keys())[0])
-            except Exception as e:
-                raise ValueError(f"Error in CFG grammar: {str(e)}")
-        
-        elif type == 'regex':
-            for key, pattern in rules.items():
+            if parser not in CFG_PARSERS:
+                raise ValueError(f"Invalid CFG parser: {parser}. Must be one of {CFG_PARSERS}.")
+            if tree_format not in TREE_FORMATS:
+                raise ValueError(f"Invalid tree format: {tree_format}. Must be one of {TREE_FORMATS}.")
+            if cfg_mode not in CFG_MODES:
+                raise ValueError(f"Invalid CFG mode: {cfg_mode}. Must be one of {CFG_MODES}.")
+        self.fingerprint = self.compute_fingerprint(
+            rules, type, parser=parser, transformer=transformer,
+            tree_format=tree_format, cfg_mode=cfg_mode, backend=backend,
+            rule_timeout=rule_timeout, on_risky=on_risky)
+        cache = resolve_grammar_cache(cache)
+        # Argumentos para reconstruir la gramática en otro proceso (los
+        # parsers de Lark no se pueden serializar); ver `__reduce__`.
+        self._options = {
+            'cache': cache.directory if cache else None, 'parser': parser,
+            'transformer': transformer, 'tree_format': tree_format,
+            'cfg_mode': cfg_mode, 'backend': backend, 'rule_timeout': rule_timeout,
+            'on_risky': on_risky,
+        }
+
+        if type == 'cfg':
+            from lark.exceptions import GrammarError
+            # Las claves que empiezan por '%' son directivas de Lark (p. ej.
+            # '%ignore': '" "'), no reglas.
+            grammar_str = "\n".join([f"{k} {v}" if k.startswith('%') else f"{k}: {v}"
+                                     for k, v in rules.items()])
+            if parser in ('lalr', 'auto'):
                 try:
-                    re.compile(pattern)
-                except re.error as e:
-                    raise ValueError(f"Invalid regex pattern for '{key}': {str(e)}")
+                    self.parser = self._build_lalr_parser(grammar_str, cache)
+                    self.parser_type = 'lalr'
+                except GrammarError as e:
+                    if parser == 'lalr':
+                        raise ValueError(f"Error in LALR grammar: {str(e)}")
+            if self.parser is None:
+                # El parser Earley guardado no incluye el transformer (se
+                # aplica en `render_tree`), así que su clave no depende de él.
+                key = self.compute_fingerprint(rules, type, parser=parser, tree_format=tree_format,
+                                               cfg_mode=cfg_mode)
+                self.parser = self._build_earley_parser(grammar_str, cache, key)
+                self.parser_type = 'earley'
+            if cfg_mode != 'parse':
+                self.scanner = CFGScanner(self.parser, self.start)
+
+        elif type == 'regex':
+            backend = get_backend(backend)
+            self.matcher = cache.load(self.fingerprint) if cache else None
+            if self.matcher is None:
+                for key, pattern in rules.items():
+                    try:
+                        re.compile(pattern)
+                        backend.compile(pattern)
+                    except (re.error, ValueError) as e:
+                        raise ValueError(f"Invalid regex pattern for '{key}': {str(e)}")
+                self.matcher = RegexMatcher(rules, backend=backend)
+                if cache:
+                    cache.save(self.matcher, self.fingerprint)
+            risky = [] if backend.linear else self.risky_rules
+            if risky and on_risky == 'error':
+                raise ValueError(f"Patterns prone to catastrophic backtracking: {risky}")
+            if risky and on_risky == 'warn':
+                warnings.warn(f"Patterns prone to catastrophic backtracking: {risky}",
+                              RuntimeWarning, stacklevel=2)
+        elif type == 'gestures':
+            from .gestures import GestureMatcher
+            self.matcher = GestureMatcher(rules)
         else:
-            raise ValueError(f"Invalid grammar type: {type}. Must be 'regex' or 'cfg'.")
\ No newline at end of file
+            raise ValueError(f"Invalid grammar type: {type}. Must be one of {GRAMMAR_TYPES}.")
+
+    def __reduce__(self):
+        # Se recompila en el destino; con caché en disco, la compilación se
+        # comparte entre procesos.
+        return _rebuild_grammar, (self.rules, self.type, self._options)
+
+    @staticmethod
+    def compute_fingerprint(rules: Dict[str, str], type: str = 'regex',
+                            parser: str = 'earley', transformer: Optional[Any] = None,
+                            tree_format: str = 'str', cfg_mode: str = 'parse',
+                            backend: Union[str, RegexBackend] = 're',
+                            rule_timeout: Optional[float] = None,
+                            on_risky: str = 'ignore') -> str:
+        """Hash del contenido de una gramática, sin compilarla."""
+        options = {}
+        backend = getattr(backend, 'name', backend)
+        if type == 'regex':
+            if backend != 're':
+                options['backend'] = backend
+            if on_risky != 'ignore':
+                options['on_risky'] = on_risky
+        if type in ('regex', 'gestures') and rule_timeout is not None:
+            options['rule_timeout'] = rule_timeout
+        if type == 'cfg':
+            options = {
+                'parser': parser,
+                'cfg_mode': cfg_mode,
+                'tree_format': tree_format,
+                'transformer': transformer and object_identity(transformer),
+            }
+        return fingerprint(type, list(rules.items()), options)
+
+    @property
+    def risky_rules(self) -> List[str]:
+        """Reglas regex propensas a un retroceso catastrófico con `re`."""
+        return self.matcher.risky_rules if self.matcher is not None else []
+
+    @property
+    def start(self) -> str:
+        return next(k for k in self.rules if not k.startswith('%'))
+
+    def _build_lalr_parser(self, grammar_str: str, cache) -> 'Lark':
+        import lark
+        from lark import Lark
+        from lark.exceptions import GrammarError
+        # Con LALR el transformer se aplica durante el análisis y no se
+        # construye el árbol. Lark gestiona su propia caché para este parser;
+        # con transformer no se usa, porque el artefacto dependería de él.
+        lark_cache = False
+        if cache and self.transformer is None:
+            lark_cache = cache.path(self.fingerprint, lark.__version__, 'lalr')
+        try:
+            return Lark(grammar_str, start=self.start, parser='lalr',
+                        transformer=self.transformer, cache=lark_cache)
+        except GrammarError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error in CFG grammar: {str(e)}")
+
+    def _build_earley_parser(self, grammar_str: str, cache, key: str) -> 'Lark':
+        import lark
+        from lark import Lark
+        # Se guarda la gramática ya cargada por Lark (el análisis del texto de
+        # la gramática es la parte costosa); el parser se reconstruye a partir
+        # de ella.
+        if cache:
+            loaded = cache.load(key, lark.__version__)
+            if loaded is not None:
+                try:
+                    return Lark(loaded, start=self.start)
+                except Exception:
+                    pass
+        try:
+            parser = Lark(grammar_str, start=self.start)
+        except Exception as e:
+            raise ValueError(f"Error in CFG grammar: {str(e)}")
+        if cache:
+            cache.save(parser.grammar, key, lark.__version__)
+        return parser
+
+    def render_tree(self, tree: Any) -> Any:
+        """Convierte el resultado de `parser.parse` al formato configurado."""
+        if self.transformer is not None:
+            if self.parser_type == 'earley':
+                return self.transformer.transform(tree)
+            return tree
+        if self.tree_format == 'str':
+            return str(tree)
+        return tree
+
+
+def type_name(obj: Any) -> str:
+    cls = obj if isinstance(obj, type) else obj.__class__
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def object_identity(obj: Any) -> str:
+    """Clave de `obj` en una huella: su `cache_key` o una propia de ese objeto."""
+    key = getattr(obj, 'cache_key', None)
+    if key is not None:
+        return f"{type_name(obj)}:{key}"
+    with _identities_lock:
+        try:
+            identity = _identities.get(obj)
+        except TypeError:
+            # Sin referencias débiles no se puede recordar sin retenerlo: cada
+            # huella es distinta y la gramática no se comparte ni se cachea.
+            warnings.warn(f"{type_name(obj)} cannot be weakly referenced; set a cache_key "
+                          "attribute to share or cache grammars that use it.",
+                          RuntimeWarning, stacklevel=3)
+            return f"{type_name(obj)}@{uuid.uuid4().hex}"
+        if identity is None:
+            identity = _identities[obj] = f"{type_name(obj)}@{uuid.uuid4().hex}"
+        return identity
+
+
+def _rebuild_grammar(rules: Dict[str, str], type: str, options: Dict[str, Any]) -> Grammar:
+    return Grammar(rules, type, **options)
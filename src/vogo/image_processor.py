@@ -1,22 +1,69 @@
 from typing import Dict, Any
+import asyncio
 import io
 import pytesseract
 from PIL import Image
 from .base_processor import BaseProcessor
+from .instrumentation import stage
+
+# Modos que se pueden guardar como PNG sin convertir.
+_PNG_MODES = ('1', 'L', 'LA', 'P', 'RGB', 'RGBA', 'I;16')
 
 class ImageProcessor(BaseProcessor):
 
     def process(self, input: bytes) -> Dict[str, Any]:
 
         processed_text = self._extract_text_from_image(input)
-        elements = self._nltk_tokenize_elements(processed_text)
-        matches = self._match_grammar(processed_text)
-        return self._build_result(processed_text, elements, matches)
+        return self._result(processed_text)
+    
+    async def aprocess(self, input: bytes) -> Dict[str, Any]:
+        processed_text = await self._aextract_text_from_image(input)
+        return await self._offload(self._result, processed_text)
     
     def _extract_text_from_image(self, image_bytes: bytes) -> str:
 
         try:
-            img = Image.open(io.BytesIO(image_bytes))
-            return pytesseract.image_to_string(img)
+            with stage('ocr'):
+                img = Image.open(io.BytesIO(image_bytes))
+                return pytesseract.image_to_string(img)
+        except Exception as e:
+            raise ValueError(f"Error in image OCR: {str(e)}")
+    
+    async def _aextract_text_from_image(self, image_bytes: bytes) -> str:
+        """
+        OCR sin bloquear el bucle: la imagen se decodifica en el executor y
+        tesseract se ejecuta como subproceso de asyncio, leyendo la imagen
+        por stdin. Si se cancela la tarea, se termina el subproceso.
+        """
+        try:
+            with stage('ocr'):
+                png = await self._offload(_to_png, image_bytes)
+                return await _run_tesseract(png)
         except Exception as e:
-            raise ValueError(f"Error in image OCR: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Error in image OCR: {str(e)}")
+
+
+def _to_png(image_bytes: bytes) -> bytes:
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.mode not in _PNG_MODES:
+        img = img.convert('RGB')
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+async def _run_tesseract(image: bytes) -> str:
+    process = await asyncio.create_subprocess_exec(
+        pytesseract.pytesseract.tesseract_cmd, 'stdin', 'stdout',
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE)
+    try:
+        output, errors = await process.communicate(image)
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+        message = errors.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(message or f"tesseract exited with status {process.returncode}")
+    return output.decode('utf-8', errors='replace')
@@ -0,0 +1,192 @@
+import json
+import threading
+import time
+import warnings
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, IO, List, Optional, Union
+
+# Límites superiores (en segundos) de los intervalos de los histogramas:
+# potencias de 2 desde 1 µs hasta ~67 s, más un intervalo abierto.
+BUCKET_BOUNDS = tuple(1e-6 * 2 ** i for i in range(27))
+
+
+class Histogram:
+    """Histograma de duraciones con intervalos de escala logarítmica."""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Aproximación del percentil `q` (0-100): límite superior de su intervalo."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                bound = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': {
+                (f'{BUCKET_BOUNDS[index]:g}' if index < len(BUCKET_BOUNDS) else 'inf'): count
+                for index, count in enumerate(self.counts) if count
+            },
+        }
+
+
+class Timings:
+    """Duraciones de una llamada a `process_input`, por etapa y por regla."""
+
+    __slots__ = ('stages', 'calls', 'rules')
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.rules: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Timings':
+        """Inversa de `as_dict`, p. ej. para registrar tiempos medidos en otro proceso."""
+        timings = cls()
+        timings.stages.update(data.get('stages', {}))
+        timings.calls.update(data.get('calls', {}))
+        timings.rules.update(data.get('rules', {}))
+        return timings
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'stages': dict(self.stages),
+            'calls': dict(self.calls),
+            'rules': dict(self.rules),
+        }
+
+
+_current: ContextVar[Optional[Timings]] = ContextVar('vogo_timings', default=None)
+
+
+def current_timings() -> Optional[Timings]:
+    """Registro de la llamada en curso, o None si la instrumentación está desactivada."""
+    return _current.get()
+
+
+def stage(name: str):
+    """Mide un bloque como etapa `name` si hay una llamada instrumentada en curso."""
+    timings = _current.get()
+    return timings.stage(name) if timings is not None else nullcontext()
+
+
+@contextmanager
+def recording(timings: Timings):
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+class Instrumentation:
+    """
+    Agrega las duraciones de las llamadas instrumentadas en histogramas.
+
+    Los histogramas de etapas se agrupan por modalidad ('text', 'image'...)
+    y los de reglas por nombre de regla; las reglas que comparten carril en
+    el `RegexMatcher` se miden juntas y aparecen como 'regla1+regla2'. Se
+    puede compartir una instancia entre varios `Processor` y volcarla
+    periódicamente con `dump`.
+    """
+
+    def __init__(self, hook: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self._lock = threading.Lock()
+        self._hooks: List[Callable[[str, Dict[str, Any]], None]] = [hook] if hook else []
+        self.stages: Dict[str, Dict[str, Histogram]] = {}
+        self.rules: Dict[str, Histogram] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add_hook(self, hook: Callable[[str, Dict[str, Any]], None]):
+        """Registra una función que recibe (modalidad, tiempos) tras cada llamada."""
+        with self._lock:
+            self._hooks.append(hook)
+
+    def record(self, modality: str, timings: Timings, error: bool = False):
+        with self._lock:
+            stages = self.stages.setdefault(modality, {})
+            for name, seconds in timings.stages.items():
+                stages.setdefault(name, Histogram()).observe(seconds)
+            for name, seconds in timings.rules.items():
+                self.rules.setdefault(name, Histogram()).observe(seconds)
+            if error:
+                self.errors[modality] = self.errors.get(modality, 0) + 1
+            hooks = list(self._hooks)
+
+        data = timings.as_dict()
+        for hook in hooks:
+            try:
+                hook(modality, data)
+            except Exception as e:
+                warnings.warn(f"Instrumentation hook failed: {str(e)}", RuntimeWarning)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'stages': {modality: {name: h.as_dict() for name, h in stages.items()}
+                           for modality, stages in self.stages.items()},
+                'rules': {name: h.as_dict() for name, h in self.rules.items()},
+                'errors': dict(self.errors),
+            }
+
+    def dump(self, target: Union[str, IO[str], None] = None) -> str:
+        """Devuelve el estado en JSON y, si se indica, lo escribe en un fichero o ruta."""
+        data = json.dumps(self.snapshot(), indent=2, sort_keys=True)
+        if isinstance(target, str):
+            with open(target, 'w', encoding='utf-8') as f:
+                f.write(data)
+        elif target is not None:
+            target.write(data)
+        return data
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.rules = {}
+            self.errors = {}
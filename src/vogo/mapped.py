@@ -0,0 +1,165 @@
+import mmap
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from .matcher import RegexMatcher, MatchList, _Lane, _findall_value
+from .regex_backends import RegexBackend, RuleTimeout, alarm_available, alarm_budget
+
+# Codificaciones admitidas: en utf-8 las posiciones en caracteres se calculan
+# contando bytes de continuación; en las de un byte coinciden con las de bytes.
+ENCODINGS = ('utf-8', 'ascii', 'latin-1')
+_ENCODING_ALIASES = {'utf8': 'utf-8', 'us-ascii': 'ascii', 'latin1': 'latin-1',
+                     'iso-8859-1': 'latin-1'}
+
+# Bytes que no son de continuación en utf-8, para contarlos con `translate`.
+_NOT_CONTINUATION = bytes(b for b in range(256) if not 0x80 <= b < 0xC0)
+# Tamaño máximo de cada copia al contar caracteres.
+_BLOCK = 16 * 1024 * 1024
+
+# (inicio, fin, valor) de una coincidencia, en bytes.
+Hit = Tuple[int, int, Any]
+
+
+class BytesBackend(RegexBackend):
+    """Compila las reglas como patrones de bytes (solo reglas ASCII)."""
+
+    name = 'bytes'
+
+    def compile(self, pattern: str, flags: int = 0):
+        return re.compile(pattern.encode('ascii'), flags & ~re.UNICODE)
+
+
+class MappedMatcher:
+    """
+    Reglas de un `RegexMatcher` compiladas como bytes para buscar
+    directamente en un fichero mapeado en memoria, sin decodificarlo.
+
+    Usa los mismos carriles que el `RegexMatcher` (las reglas de palabras
+    clave van en carriles propios). En modo bytes `\\w`, `\\d`, `\\s`, `\\b`
+    y la comparación sin mayúsculas solo cubren ASCII, así que las reglas
+    deben ser ASCII y un carácter no ASCII nunca es parte de una palabra.
+    """
+
+    def __init__(self, matcher: RegexMatcher):
+        for info in matcher.infos:
+            if not info.pattern.isascii():
+                raise ValueError(
+                    f"Rule '{info.key}' is not ASCII and cannot be compiled as a bytes pattern.")
+        self.matcher = matcher
+        backend = BytesBackend()
+        self.lanes: List[_Lane] = []
+        members = [lane.members for lane in matcher.lanes]
+        members.extend([index] for index in matcher.keywords.rules)
+        for indices in members:
+            lane = _Lane(list(indices))
+            lane.compile(matcher.infos, matcher.flags, backend)
+            self.lanes.append(lane)
+
+    def match_file(self, path: str, encoding: str = 'utf-8',
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Busca las reglas en el fichero `path` mapeado en memoria.
+
+        Cada regla incluye sus coincidencias decodificadas ('matches'), sus
+        posiciones en caracteres ('spans') y en bytes ('byte_spans'). Con
+        `timeout` (solo en el hilo principal) los carriles que lo superan se
+        omiten y sus reglas se informan en 'timeouts'.
+        """
+        encoding = _ENCODING_ALIASES.get(encoding.lower(), encoding.lower())
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Invalid encoding: {encoding}. Must be one of {ENCODINGS}.")
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return self._build_result(path, b'', 0, [[] for _ in self.matcher.infos],
+                                          encoding, [])
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                hits, timeouts = self._scan(data, timeout)
+                return self._build_result(path, data, size, hits, encoding, timeouts)
+
+    def _scan(self, data, timeout: Optional[float]) -> Tuple[List[List[Hit]], List[str]]:
+        infos = self.matcher.infos
+        timeouts: List[str] = []
+        hits = [_HitCollector(info.groups) for info in infos]
+        for lane in self.lanes:
+            found = {index: _HitCollector(infos[index].groups) for index in lane.members}
+            try:
+                if timeout is not None and alarm_available():
+                    with alarm_budget(timeout):
+                        lane.scan(data, found)
+                else:
+                    lane.scan(data, found)
+            except RuleTimeout:
+                timeouts.extend(infos[index].key for index in lane.members)
+                continue
+            for index, collector in found.items():
+                hits[index] = collector
+        return [collector.hits for collector in hits], timeouts
+
+    def _build_result(self, path: str, data, size: int, hits: List[List[Hit]],
+                      encoding: str, timeouts: List[str]) -> Dict[str, Any]:
+        matches = MatchList()
+        for info, rule_hits in zip(self.matcher.infos, hits):
+            if not rule_hits:
+                continue
+            byte_spans = [(start, end) for start, end, _ in rule_hits]
+            matches.append({
+                'type': info.key,
+                'matches': [_decode(value, encoding) for _, _, value in rule_hits],
+                'spans': _char_spans(data, rule_hits) if encoding == 'utf-8' else byte_spans,
+                'byte_spans': byte_spans,
+            })
+        matches.timeouts = timeouts
+        result = {
+            'path': path,
+            'size': size,
+            'matches': matches,
+            'stats': {'match_count': sum(len(m['matches']) for m in matches)},
+        }
+        if timeouts:
+            result['timeouts'] = timeouts
+        return result
+
+
+class _HitCollector:
+    """Guarda (inicio, fin, valor) de cada coincidencia sin retener el `Match`."""
+
+    __slots__ = ('hits', 'groups')
+
+    def __init__(self, groups: int):
+        self.hits: List[Hit] = []
+        self.groups = groups
+
+    def append(self, hit: Tuple[Any, Optional[int]]):
+        m, base = hit
+        start, end = m.span(base or 0)
+        self.hits.append((start, end, _findall_value(m, base, self.groups)))
+
+
+def _decode(value: Any, encoding: str) -> Any:
+    if isinstance(value, tuple):
+        return tuple(part.decode(encoding, 'replace') for part in value)
+    return value.decode(encoding, 'replace')
+
+
+def _char_spans(data, hits: List[Hit]) -> List[Tuple[int, int]]:
+    """
+    Posiciones en caracteres (utf-8) de coincidencias ordenadas que no se
+    solapan, en un solo recorrido del fichero hasta la última.
+    """
+    spans = []
+    position = 0
+    count = 0
+    for start, end, _ in hits:
+        span = []
+        for offset in (start, end):
+            while position < offset:
+                stop = min(offset, position + _BLOCK)
+                block = data[position:stop]
+                # Cada carácter tiene un solo byte que no es de continuación:
+                # al borrarlos quedan los bytes que no cuentan como carácter.
+                count += len(block) - len(block.translate(None, _NOT_CONTINUATION))
+                position = stop
+            span.append(count)
+        spans.append((span[0], span[1]))
+    return spans
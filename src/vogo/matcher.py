@@ -0,0 +1,338 @@
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from .regex_analysis import RuleInfo, analyze_rules, fold_text
+from .spans import SpanList
+from .regex_backends import (
+    RegexBackend, RuleTimeout, alarm_available, alarm_budget, get_backend, isolated_runner
+)
+
+_WORD_RUN = re.compile(r'\w+')
+_NO_PREFILTER = object()
+
+
+# Máximo de sub-carriles compilados que se guardan por carril.
+MAX_CACHED_SUBLANES = 64
+
+
+class _Lane:
+    """Alternancia compilada de reglas cuyas coincidencias no pueden solaparse."""
+
+    __slots__ = ('members', 'regex', 'by_group', 'prefiltered', 'risky', '_sublanes')
+
+    def __init__(self, members: List[int]):
+        self.members = members
+        self.regex = None
+        self.by_group = {}
+        self.prefiltered = False
+        self.risky = False
+        self._sublanes: Dict[Tuple[int, ...], '_Lane'] = {}
+
+    def compile(self, infos: List[RuleInfo], flags: int,
+                backend: Optional[RegexBackend] = None):
+        backend = backend or RegexBackend()
+        self.prefiltered = any(infos[index].required for index in self.members)
+        self.risky = any(infos[index].risky for index in self.members)
+        if len(self.members) == 1:
+            index = self.members[0]
+            self.regex = backend.compile(infos[index].pattern, flags)
+            self.by_group = {None: (index, 0)}
+            return
+
+        parts = []
+        group = 1
+        for index in self.members:
+            parts.append(f'({infos[index].pattern})')
+            # Con re2, `lastindex` es el último grupo que participó y no el
+            # grupo exterior de la regla: se registran todos sus grupos.
+            for inner in range(group, group + 1 + infos[index].groups):
+                self.by_group[inner] = (index, group)
+            group += 1 + infos[index].groups
+        self.regex = backend.compile('|'.join(parts), flags)
+
+    def single(self, index: int, infos: List[RuleInfo], flags: int,
+               backend: RegexBackend) -> '_Lane':
+        """Carril con una sola de las reglas, para aislar la que agota el tiempo."""
+        key = (index,)
+        lane = self._sublanes.get(key)
+        if lane is None:
+            lane = _Lane([index])
+            lane.compile(infos, flags, backend)
+            self._sublanes[key] = lane
+        return lane
+
+    def select(self, infos: List[RuleInfo], flags: int, lowered: str,
+               backend: Optional[RegexBackend] = None):
+        """
+        Carril reducido a las reglas cuyos literales obligatorios aparecen en
+        el texto, o None si ninguna puede coincidir.
+        """
+        active = tuple(index for index in self.members
+                       if all(piece in lowered for piece in infos[index].required))
+        if len(active) == len(self.members):
+            return self
+        if not active:
+            return None
+
+        lane = self._sublanes.get(active)
+        if lane is None:
+            if len(self._sublanes) >= MAX_CACHED_SUBLANES:
+                return self
+            lane = _Lane(list(active))
+            lane.compile(infos, flags, backend)
+            self._sublanes[active] = lane
+        return lane
+
+    def scan(self, text: str, hits, found=None):
+        """
+        Reparte las coincidencias entre las reglas del carril. `found` permite
+        pasar coincidencias ya calculadas (p. ej. en otro proceso).
+        """
+        if found is None:
+            found = self.regex.finditer(text)
+        if len(self.members) == 1:
+            index, base = self.by_group[None]
+            bucket = hits[index]
+            for m in found:
+                bucket.append((m, base))
+            return
+
+        by_group = self.by_group
+        for m in found:
+            index, base = by_group[m.lastindex]
+            hits[index].append((m, base))
+
+
+class KeywordIndex:
+    """
+    Índice compartido para reglas `\\b(palabra1|palabra2|...)\\b`.
+
+    Una coincidencia de estas reglas es siempre una secuencia máxima de
+    caracteres de palabra, así que basta con recorrer las palabras del texto
+    una vez y buscarlas en un diccionario, en lugar de ejecutar una
+    alternancia por regla.
+    """
+
+    __slots__ = ('words', 'rules')
+
+    def __init__(self):
+        self.words: Dict[str, Tuple[int, ...]] = {}
+        self.rules: List[int] = []
+
+    def add(self, index: int, keywords):
+        self.rules.append(index)
+        for word in keywords:
+            self.words[word] = self.words.get(word, ()) + (index,)
+
+    def scan(self, text: str, hits: List[List[Tuple[Any, int]]]):
+        words = self.words
+        for m in _WORD_RUN.finditer(text):
+            rules = words.get(fold_text(m.group()))
+            if rules:
+                for index in rules:
+                    hits[index].append((m, None))
+
+
+def _findall_value(m, base: int, groups: int):
+    """Reproduce el valor que devolvería `re.findall` para una coincidencia."""
+    if base is None:
+        return m.group()
+    if groups == 0:
+        return m.group(base)
+    if groups == 1:
+        return m.group(base + 1) or ''
+    return tuple(m.group(base + k) or '' for k in range(1, groups + 1))
+
+
+class MatchList(list):
+    """Lista de coincidencias con las reglas que agotaron su tiempo en `timeouts`."""
+
+    def __init__(self, matches=(), timeouts=()):
+        super().__init__(matches)
+        self.timeouts = list(timeouts)
+
+
+class RegexMatcher:
+    """
+    Motor de coincidencias para gramáticas regex.
+
+    Agrupa las reglas en "carriles": cada carril es una única alternancia
+    compilada que se recorre en una sola pasada. Solo comparten carril reglas
+    cuyas coincidencias no pueden solaparse, de modo que el resultado es
+    idéntico a ejecutar `re.findall` regla por regla. Las reglas que son
+    listas de palabras literales no usan carriles sino un `KeywordIndex`.
+
+    Antes de recorrer un carril se descartan las reglas cuyos literales
+    obligatorios (p. ej. '@' en un email) no aparecen en el texto.
+
+    Las expresiones se compilan con el motor `backend` ('re' o 're2'). Con
+    `re`, `scan` y `findall` aceptan un límite de tiempo por carril; las
+    reglas que lo superan se omiten y se informan en lugar de bloquear la
+    llamada.
+    """
+
+    def __init__(self, rules: Dict[str, str], flags: int = re.IGNORECASE,
+                 backend: Union[str, RegexBackend, None] = None):
+        self.flags = flags
+        self.backend = get_backend(backend)
+        self.infos = analyze_rules(rules)
+        self.keywords = KeywordIndex()
+        self.lanes = self._build_lanes()
+
+    @property
+    def risky_rules(self) -> List[str]:
+        return [info.key for info in self.infos if info.risky]
+
+    def _build_lanes(self) -> List[_Lane]:
+        lanes: List[_Lane] = []
+        # El índice de palabras reproduce la semántica de `re`; con otro motor
+        # se compilan también estas reglas.
+        use_keywords = self.flags & re.IGNORECASE and self.backend.name == 're'
+        for index, info in enumerate(self.infos):
+            if info.keywords is not None and use_keywords:
+                self.keywords.add(index, info.keywords)
+            elif info.combinable:
+                for lane in lanes:
+                    if all(self.infos[m].combinable and info.compatible(self.infos[m])
+                           for m in lane.members):
+                        lane.members.append(index)
+                        break
+                else:
+                    lanes.append(_Lane([index]))
+            else:
+                lanes.append(_Lane([index]))
+
+        for lane in lanes:
+            lane.compile(self.infos, self.flags, self.backend)
+        return lanes
+
+    def _timed_scan(self, lane: _Lane, text: str, hits, timeout: float,
+                    timeouts: List[str]):
+        """
+        Recorre un carril con un límite de `timeout` segundos. En el hilo
+        principal se interrumpe con SIGALRM; en otros hilos solo se limitan los
+        carriles con reglas de riesgo, que se ejecutan en un proceso auxiliar.
+        Si un carril de varias reglas agota el tiempo se reintenta regla a
+        regla para identificar la responsable.
+        """
+        found = {index: [] for index in lane.members}
+        try:
+            if alarm_available():
+                with alarm_budget(timeout):
+                    lane.scan(text, found)
+            elif lane.risky:
+                remote = isolated_runner().finditer(
+                    lane.regex.pattern, lane.regex.flags, text, timeout)
+                lane.scan(text, found, remote)
+            else:
+                lane.scan(text, found)
+        except RuleTimeout:
+            if len(lane.members) == 1:
+                timeouts.append(self.infos[lane.members[0]].key)
+                return
+            for index in lane.members:
+                single = lane.single(index, self.infos, self.flags, self.backend)
+                self._timed_scan(single, text, hits, timeout, timeouts)
+            return
+        for index, bucket in found.items():
+            hits[index].extend(bucket)
+
+    def _label(self, members: List[int]) -> str:
+        return '+'.join(self.infos[index].key for index in members)
+
+    def scan(self, text: str, timeout: Optional[float] = None,
+             timeouts: Optional[List[str]] = None,
+             durations: Optional[Dict[str, float]] = None,
+             hits: Optional[List[Any]] = None) -> List[List[Tuple[Any, int]]]:
+        """
+        Devuelve, por regla, la lista de (match, grupo_base) encontrados.
+
+        Con `timeout`, las claves de las reglas que lo agotan se añaden a
+        `timeouts`; si no se pasa esa lista se lanza `RuleTimeout`. Con
+        `durations`, se acumula en él el tiempo de cada carril, con las
+        reglas que lo forman unidas por '+' como clave. `hits` permite pasar
+        contenedores propios (con `append` y `extend`) para cada regla.
+        """
+        if hits is None:
+            hits = [[] for _ in self.infos]
+        if self.keywords.rules:
+            start = time.perf_counter() if durations is not None else None
+            self.keywords.scan(text, hits)
+            if start is not None:
+                label = self._label(self.keywords.rules)
+                durations[label] = durations.get(label, 0.0) + time.perf_counter() - start
+        if self.backend.linear:
+            timeout = None
+        expired: List[str] = [] if timeouts is None else timeouts
+        lowered = None
+        for lane in self.lanes:
+            start = time.perf_counter() if durations is not None else None
+            members = lane.members
+            if lane.prefiltered:
+                if lowered is None:
+                    lowered = text.lower()
+                    if len(lowered) != len(text):
+                        # Algún carácter cambia de longitud al pasar a
+                        # minúsculas; el prefiltro dejaría de ser exacto.
+                        lowered = _NO_PREFILTER
+                if lowered is not _NO_PREFILTER:
+                    lane = lane.select(self.infos, self.flags, lowered, self.backend)
+                    if lane is None:
+                        continue
+            if timeout is None:
+                lane.scan(text, hits)
+            else:
+                self._timed_scan(lane, text, hits, timeout, expired)
+            if start is not None:
+                label = self._label(members)
+                durations[label] = durations.get(label, 0.0) + time.perf_counter() - start
+        if expired and timeouts is None:
+            raise RuleTimeout(f"Rules exceeded the time budget: {expired}")
+        return hits
+
+    def findall(self, text: str, timeout: Optional[float] = None,
+                durations: Optional[Dict[str, float]] = None) -> MatchList:
+        timeouts: List[str] = []
+        matches = MatchList()
+        for info, rule_hits in zip(self.infos, self.scan(text, timeout, timeouts, durations)):
+            if rule_hits:
+                matches.append({
+                    'type': info.key,
+                    'matches': [_findall_value(m, base, info.groups)
+                                for m, base in rule_hits]
+                })
+        matches.timeouts = timeouts
+        return matches
+
+    def findall_spans(self, text: str, timeout: Optional[float] = None,
+                      durations: Optional[Dict[str, float]] = None) -> MatchList:
+        """
+        Como `findall`, pero las coincidencias de cada regla son un `SpanList`
+        con el tramo completo de cada una (aunque la regla tenga grupos).
+        """
+        timeouts: List[str] = []
+        matches = MatchList()
+        # Las posiciones se guardan al encontrarlas, sin retener los `Match`.
+        collectors = [_SpanCollector(text) for _ in self.infos]
+        self.scan(text, timeout, timeouts, durations, collectors)
+        for info, collector in zip(self.infos, collectors):
+            if collector.spans:
+                matches.append({'type': info.key, 'matches': collector.spans})
+        matches.timeouts = timeouts
+        return matches
+
+
+class _SpanCollector:
+    __slots__ = ('spans',)
+
+    def __init__(self, text: str):
+        self.spans = SpanList(text)
+
+    def append(self, hit: Tuple[Any, Optional[int]]):
+        m, base = hit
+        start, end = m.span(base or 0)
+        self.spans.append(start, end)
+
+    def extend(self, hits):
+        for hit in hits:
+            self.append(hit)
@@ -0,0 +1,113 @@
+import os
+import threading
+from typing import List, Optional, Union
+
+# Rutas adicionales de datos de NLTK (separadas por os.pathsep) y permiso
+# explícito para descargar lo que falte.
+ENV_DATA_PATH = 'VOGO_NLTK_DATA'
+ENV_ALLOW_DOWNLOAD = 'VOGO_NLTK_DOWNLOAD'
+
+_lock = threading.Lock()
+_data_paths: Optional[List[str]] = None
+_allow_download: Optional[bool] = None
+_paths_ready = False
+_missing: Optional[str] = None
+
+
+def configure_nltk(data_path: Union[str, List[str], None] = None,
+                   allow_download: Optional[bool] = None):
+    """
+    Configura dónde busca vogo los datos de NLTK y si puede descargarlos.
+
+    Por defecto vogo nunca accede a la red: los datos deben estar ya en
+    `data_path`, en `$VOGO_NLTK_DATA` o en las rutas estándar de NLTK.
+    """
+    global _data_paths, _allow_download, _paths_ready, _missing
+    with _lock:
+        if isinstance(data_path, str):
+            data_path = [data_path]
+        _data_paths = list(data_path) if data_path is not None else None
+        _allow_download = allow_download
+        _paths_ready = False
+        _missing = None
+
+
+def data_paths() -> List[str]:
+    if _data_paths is not None:
+        return _data_paths
+    value = os.environ.get(ENV_DATA_PATH, '')
+    return [path for path in value.split(os.pathsep) if path]
+
+
+def download_allowed() -> bool:
+    if _allow_download is not None:
+        return _allow_download
+    return os.environ.get(ENV_ALLOW_DOWNLOAD, '').lower() in ('1', 'true', 'yes')
+
+
+def punkt_resource() -> str:
+    """Recurso que necesita `nltk.word_tokenize` en la versión instalada."""
+    import nltk.tokenize
+    return 'punkt_tab' if hasattr(nltk.tokenize, 'PunktTokenizer') else 'punkt'
+
+
+def prepare_nltk():
+    """Añade las rutas configuradas a `nltk.data.path`; solo la primera vez."""
+    global _paths_ready
+    if _paths_ready:
+        return
+    import nltk
+    with _lock:
+        if not _paths_ready:
+            for path in reversed(data_paths()):
+                if path not in nltk.data.path:
+                    nltk.data.path.insert(0, path)
+            _paths_ready = True
+
+
+def ensure_nltk_resources():
+    """
+    Comprueba (una vez por proceso) que están los datos del tokenizador.
+
+    Si faltan y la descarga no está permitida lanza `ValueError` sin
+    intentar conectarse; el resultado se recuerda hasta el siguiente
+    `configure_nltk`.
+    """
+    global _missing
+    prepare_nltk()
+    if _missing is not None:
+        raise ValueError(_missing)
+    import nltk
+    with _lock:
+        name = punkt_resource()
+        try:
+            nltk.data.find(f'tokenizers/{name}')
+            return
+        except LookupError:
+            pass
+        if download_allowed():
+            paths = data_paths()
+            nltk.download(name, download_dir=paths[0] if paths else None, quiet=True)
+            try:
+                nltk.data.find(f'tokenizers/{name}')
+                return
+            except LookupError:
+                pass
+        _missing = (
+            f"NLTK resource '{name}' not found. Install it with "
+            f"vogo.download_nltk_resources(path) and set {ENV_DATA_PATH}, or "
+            f"call vogo.configure_nltk(data_path=...)."
+        )
+        raise ValueError(_missing)
+
+
+def download_nltk_resources(data_path: Optional[str] = None) -> bool:
+    """Descarga explícitamente los datos que usa vogo (p. ej. al construir la imagen)."""
+    global _missing
+    import nltk
+    ok = nltk.download(punkt_resource(), download_dir=data_path, quiet=True)
+    with _lock:
+        if data_path and data_path not in nltk.data.path:
+            nltk.data.path.insert(0, data_path)
+        _missing = None
+    return bool(ok)
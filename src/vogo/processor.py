@@ -1,29 +1,605 @@
-from typing import Union, List, Dict, Any
+import importlib
+import os
+import threading
+import warnings
+import weakref
+from array import array
+from collections.abc import Mapping
+from functools import partial
+from itertools import chain
+from typing import IO, TYPE_CHECKING, Callable, Iterable, Iterator, Union, List, Dict, Any, Optional, Tuple
+from .base_processor import BaseProcessor
+from .cache import ResultCache, fingerprint
+from .chunking import DEFAULT_CHUNK_SIZE, DEFAULT_OVERLAP, Window, split_windows
 from .grammar import Grammar
-from .text_processor import TextProcessor
-from .voice_processor import VoiceProcessor
-from .image_processor import ImageProcessor
+from .instrumentation import Instrumentation, Timings, recording, stage
+from .result import Result
+from .tokenizer import Tokenizer, get_tokenizer
 
-class Processor:
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from .gesture_session import GestureSession
+
+# Módulo y clase del procesador de cada modalidad. Las modalidades con la
+# misma clase comparten instancia; cada módulo (y sus dependencias: OCR,
+# reconocimiento de voz...) se importa la primera vez que se usa.
+MODALITIES = {
+    'text': ('.text_processor', 'TextProcessor'),
+    'voice': ('.voice_processor', 'VoiceProcessor'),
+    'gestures': ('.gesture_processor', 'GestureProcessor'),
+    'trajectory': ('.trajectory_processor', 'TrajectoryProcessor'),
+    'image': ('.image_processor', 'ImageProcessor'),
+    'video': ('.image_processor', 'ImageProcessor'),
+}
+EXECUTORS = ('thread', 'process')
+# Llamadas asíncronas simultáneas por modalidad (None: sin límite). OCR y
+# vídeo usan la CPU; la voz espera sobre todo al servicio de reconocimiento.
+DEFAULT_CONCURRENCY: Dict[str, Optional[int]] = {
+    'text': None, 'gestures': None, 'trajectory': None, 'voice': 8,
+    'image': os.cpu_count() or 1, 'video': os.cpu_count() or 1,
+}
 
-    def __init__(self, grammar: Grammar):
+class ModalityProcessors(Mapping):
+    """
+    Procesadores de las modalidades de un `Processor`, creados al acceder a
+    cada uno por primera vez. `in`, `len` y la iteración recorren las
+    modalidades declaradas sin crear nada.
+    """
 
+    def __init__(self, grammar: Grammar, modalities: Iterable[str], options: Dict[str, Any]):
         self.grammar = grammar
-        self.processors = {
-            'text': TextProcessor(grammar),
-            'voice': VoiceProcessor(grammar),
-            'gestures': TextProcessor(grammar),
-            'image': ImageProcessor(grammar),
-            'video': ImageProcessor(grammar)
-        }
+        self.modalities = list(modalities)
+        self.options = options
+        self._loaded: Dict[str, BaseProcessor] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, type: str) -> BaseProcessor:
+        processor = self._loaded.get(type)
+        if processor is not None:
+            return processor
+        if type not in self.modalities:
+            raise KeyError(type)
+        with self._lock:
+            processor = self._loaded.get(type)
+            if processor is None:
+                module, name = MODALITIES[type]
+                cls = getattr(importlib.import_module(module, __package__), name)
+                processor = next((p for p in self._loaded.values() if p.__class__ is cls), None)
+                if processor is None:
+                    processor = cls(self.grammar, **self.options)
+                self._loaded[type] = processor
+            return processor
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.modalities)
+
+    def __len__(self) -> int:
+        return len(self.modalities)
+
+    def __contains__(self, type) -> bool:
+        return type in self.modalities
+
+    def loaded(self) -> Dict[str, BaseProcessor]:
+        """Modalidades ya creadas."""
+        return dict(self._loaded)
+
+    def set_grammar(self, grammar: Grammar):
+        with self._lock:
+            self.grammar = grammar
+            for processor in self._loaded.values():
+                processor.grammar = grammar
+
+
+class Processor:
     
-    def process_input(self, input: Union[str, List[str], bytes], 
-                    type: str = 'text') -> Dict[str, Any]:
+    def __init__(self, grammar: Grammar,
+                 instrumentation: Union[Instrumentation, bool, None] = None,
+                 tokenizer: Union[str, Tokenizer, Callable[[str], List[str]], None] = None,
+                 offsets: bool = False, lazy: bool = False,
+                 concurrency: Optional[Dict[str, Optional[int]]] = None,
+                 modalities: Optional[Iterable[str]] = None,
+                 result_cache: Union[ResultCache, bool, None] = None,
+                 cache_key: Optional[str] = None):
 
+        self.grammar = grammar
+        options = {'tokenizer': get_tokenizer(tokenizer), 'offsets': offsets, 'lazy': lazy}
+        # Se guardan para crear procesadores equivalentes en los procesos
+        # de `process_batch`.
+        self._options = options
+        # Caché de resultados opcional (True: `ResultCache()` en memoria). Las
+        # opciones que cambian el resultado forman parte de la clave; el
+        # tokenizador, por su `cache_key` o por la que se pase aquí.
+        if result_cache is True:
+            result_cache = ResultCache()
+        if cache_key is None:
+            cache_key = options['tokenizer'].cache_key
+        if result_cache and cache_key is None:
+            warnings.warn("Result cache disabled: the tokenizer has no stable identity; "
+                          "pass cache_key to enable it.", RuntimeWarning)
+            result_cache = None
+        self.result_cache: Optional[ResultCache] = result_cache or None
+        self._cache_scope = fingerprint(cache_key, offsets, lazy)
+        # Con instrumentación, cada resultado incluye 'timings' y las
+        # duraciones se agregan en `self.instrumentation`.
+        if instrumentation is True:
+            instrumentation = Instrumentation()
+        self.instrumentation: Optional[Instrumentation] = instrumentation or None
+        # Modalidades admitidas (por defecto, todas); cada una se carga al
+        # procesar su primera entrada.
+        if modalities is None:
+            modalities = MODALITIES
+        modalities = list(modalities)
+        for type in modalities:
+            if type not in MODALITIES:
+                raise ValueError(f"Invalid modality: {type}. Must be one of {list(MODALITIES)}.")
+        self.processors = ModalityProcessors(grammar, modalities, options)
+        # Límite de llamadas de `aprocess_input` por modalidad. Los semáforos
+        # se crean al usarse, uno por bucle de eventos.
+        self.concurrency = dict(DEFAULT_CONCURRENCY)
+        if concurrency:
+            for type, limit in concurrency.items():
+                self._check_type(type)
+                if limit is not None and limit < 1:
+                    raise ValueError(f"Invalid concurrency for '{type}': {limit}. Must be positive or None.")
+                self.concurrency[type] = limit
+        self._semaphores: 'weakref.WeakKeyDictionary[Any, Dict[str, Any]]' = \
+            weakref.WeakKeyDictionary()
+        # Pools de `process_batch`, que se mantienen entre lotes, con los
+        # trabajadores pedidos y los que tiene cada uno.
+        self._pools: Dict[str, 'Executor'] = {}
+        self._pool_workers: Dict[str, Tuple[Optional[int], int]] = {}
+        self._pool_lock = threading.Lock()
+    
+    def set_grammar(self, grammar: Grammar):
+        """Sustituye la gramática en todas las modalidades sin recrearlas."""
+        self.grammar = grammar
+        self.processors.set_grammar(grammar)
+        # Los procesos trabajadores tienen su propia copia de la gramática:
+        # el siguiente lote arranca un pool nuevo y los pendientes terminan
+        # con la anterior.
+        with self._pool_lock:
+            pool = self._pools.pop('process', None)
+        if pool is not None:
+            pool.shutdown(wait=False)
+    
+    def _check_type(self, type: str):
         if type not in self.processors:
             raise ValueError(
                 f"Invalid input type: '{type}'. "
                 f"Valid types: {list(self.processors.keys())}"
             )
+    
+    def process_input(self, input: Union[str, List[str], bytes], 
+                    type: str = 'text') -> Dict[str, Any]:
+
+        self._check_type(type)
+        
+        return self._instrumented(type, self._process, input, type)
+    
+    def _instrumented(self, type: str, function: Callable[..., Dict[str, Any]],
+                      *args: Any) -> Dict[str, Any]:
+        """Ejecuta `function` midiendo sus etapas si hay instrumentación."""
+        if self.instrumentation is None:
+            return function(*args)
         
-        return self.processors[type].process(input)
+        timings = Timings()
+        try:
+            with recording(timings), timings.stage('total'):
+                result = function(*args)
+        except Exception:
+            self.instrumentation.record(type, timings, error=True)
+            raise
+        result['timings'] = timings.as_dict()
+        self.instrumentation.record(type, timings)
+        return result
+    
+    def _process(self, input: Union[str, List[str], bytes], type: str) -> Dict[str, Any]:
+        if self.result_cache is None:
+            return self.processors[type].process(input)
+        key = self._cache_key(input, type)
+        with stage('cache'):
+            result = self._cache_get(key, type)
+        if result is None:
+            result = self.processors[type].process(input)
+            with stage('cache'):
+                self._cache_set(key, result)
+        return result
+    
+    def _cache_key(self, input: Union[str, List[str], bytes], type: str) -> str:
+        if isinstance(input, array) and self.grammar.type == 'gestures':
+            # Los ids de gestos dependen del vocabulario de esta gramática:
+            # la clave es la de la lista de nombres.
+            vocabulary = self.grammar.matcher.vocabulary
+            if input.typecode == 'H' and max(input, default=0) < len(vocabulary):
+                input = vocabulary.decode(input)
+        return self.result_cache.key(self.grammar.fingerprint, type, input, self._cache_scope)
+    
+    def _from_cache(self, key: str, type: str) -> Optional[Dict[str, Any]]:
+        """Resultado guardado, con sus 'timings' si hay instrumentación."""
+        if self.instrumentation is None:
+            return self._cache_get(key, type)
+        timings = Timings()
+        with timings.stage('total'), timings.stage('cache'):
+            result = self._cache_get(key, type)
+        if result is not None:
+            result['timings'] = timings.as_dict()
+            self.instrumentation.record(type, timings)
+        return result
+    
+    def _to_cache(self, key: str, result: Dict[str, Any]):
+        # Los tiempos son de esta llamada, no forman parte del resultado.
+        timings = result.pop('timings', None)
+        self._cache_set(key, result)
+        if timings is not None:
+            result['timings'] = timings
+    
+    def _cache_get(self, key: str, type: str) -> Optional[Dict[str, Any]]:
+        result = self.result_cache.get(key)
+        if isinstance(result, tuple):
+            # Resultado perezoso guardado sin tokenizar: se tokeniza al leer
+            # los tokens, con el procesador de la modalidad.
+            result = Result.from_state(
+                result, lambda text: self.processors[type]._tokenize_elements(text))
+        return result
+    
+    def _cache_set(self, key: str, result: Dict[str, Any]):
+        # Un `Result` se guarda con `state()`: serializarlo directamente lo
+        # tokenizaría (ver `Result.__reduce__`).
+        self.result_cache.set(key, result.state() if isinstance(result, Result) else result)
+    
+    def match_file(self, path: str, encoding: str = 'utf-8') -> Dict[str, Any]:
+        """Busca las reglas en un fichero mapeado en memoria; ver `TextProcessor.match_file`."""
+        self._check_type('text')
+        return self.processors['text'].match_file(path, encoding)
+    
+    def process_stream(self, source: Union[str, IO, Iterable[Union[str, bytes]]],
+                       overlap: int = DEFAULT_OVERLAP, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       encoding: str = 'utf-8') -> Iterator[Dict[str, Any]]:
+        """Procesa un texto por trozos; ver `TextProcessor.process_stream`."""
+        self._check_type('text')
+        return self.processors['text'].process_stream(source, overlap, chunk_size, encoding)
+    
+    def process_parallel(self, input: Union[str, List[str]], workers: Optional[int] = None,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         overlap: int = DEFAULT_OVERLAP) -> Dict[str, Any]:
+        """
+        Procesa un único texto grande repartiendo sus trozos entre procesos.
+
+        El texto se divide en ventanas de `chunk_size` caracteres con
+        `overlap` de contexto a cada lado; cada proceso busca coincidencias
+        y tokeniza sus ventanas, y aquí se unen en orden del documento sin
+        duplicados. El resultado es el de `process_input`, y cada regla
+        incluye además sus posiciones en 'spans'. Como en `process_stream`,
+        una coincidencia más larga que `overlap` puede quedar cortada.
+        Requiere una gramática regex; usa el pool de procesos de
+        `process_batch`.
+        """
+        self._check_type('text')
+        if self.grammar.type != 'regex':
+            raise ValueError("Parallel matching requires a regex grammar.")
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be positive.")
+        text = self.processors['text']._prepare_text(input)
+        windows = split_windows(text, chunk_size, overlap)
+        return self._instrumented('text', self._process_parallel, text, windows, workers)
+    
+    def _process_parallel(self, text: str, windows: Iterator[Window],
+                          workers: Optional[int]) -> Dict[str, Any]:
+        processor = self.processors['text']
+        first = next(windows)
+        if first.final:
+            # Una sola ventana: no compensa enviarla a otro proceso.
+            return processor._merge_windows(text, [processor._scan_window(first)])
+        from concurrent.futures.process import BrokenProcessPool
+        pool = self._pool('process', workers)
+        # Se limita el número de ventanas enviadas y aún no unidas para no
+        # copiar todo el documento a la vez en las colas del pool.
+        scanned = _bounded_map(pool, _scan_in_worker, chain([first], windows),
+                               self._pool_size('process') * 2)
+        try:
+            with stage('match'):
+                return processor._merge_windows(text, scanned)
+        except BrokenProcessPool:
+            with self._pool_lock:
+                if self._pools.get('process') is pool:
+                    del self._pools['process']
+            raise
+    
+    def process_many(self, inputs: Iterable[Union[str, List[str]]],
+                     type: str = 'text') -> List[Dict[str, Any]]:
+        """
+        Procesa en este hilo muchas entradas cortas (frases o comandos de
+        pocas palabras) buscando las reglas una sola vez sobre todas; ver
+        `TextProcessor.process_many`. Solo para texto y gestos.
+
+        Como en `process_batch`, los resultados van en orden y una entrada
+        que falla da `{'error': ..., 'error_type': ...}`. Con
+        instrumentación el lote se registra como una sola llamada y los
+        resultados no incluyen 'timings'.
+        """
+        self._check_type(type)
+        processor = self.processors[type]
+        if not hasattr(processor, 'process_many'):
+            raise ValueError(f"Batch matching is not available for '{type}' inputs.")
+        inputs = list(inputs)
+        batch: List[Optional[Dict[str, Any]]] = [None] * len(inputs)
+        keys: List[Optional[str]] = [None] * len(inputs)
+        if self.result_cache is not None:
+            for index, input in enumerate(inputs):
+                keys[index] = self._cache_key(input, type)
+                batch[index] = self._from_cache(keys[index], type)
+        pending: List[int] = []
+        texts: List[str] = []
+        for index, input in enumerate(inputs):
+            if batch[index] is not None:
+                continue
+            try:
+                texts.append(processor._prepare_text(input))
+            except Exception as e:
+                batch[index] = _error_result(e)
+                continue
+            pending.append(index)
+        if not texts:
+            return batch
+
+        timings = Timings()
+        try:
+            with recording(timings), timings.stage('total'):
+                results = processor.process_many(texts)
+        except Exception:
+            # Un error (p. ej. del tokenizador) en una entrada no debe
+            # invalidar las demás: se procesan una a una.
+            results = [self._process_item(inputs[index], type) for index in pending]
+        else:
+            if self.instrumentation is not None:
+                self.instrumentation.record(type, timings)
+        for index, result in zip(pending, results):
+            batch[index] = result
+            if self.result_cache is not None and 'error' not in result:
+                self._to_cache(keys[index], result)
+        return batch
+
+    def gesture_session(self, window: Optional[int] = None, max_duration: Optional[float] = None,
+                        debounce: float = 0.0) -> 'GestureSession':
+        """
+        Sesión para reconocer gestos en tiempo real con la gramática actual;
+        ver `GestureSession`. La sesión no sigue a `set_grammar`.
+        """
+        self._check_type('gestures')
+        from .gesture_session import GestureSession
+        return GestureSession(self.grammar, window, max_duration, debounce)
+
+    def process_batch(self, inputs: Iterable[Union[str, List[str], bytes]],
+                      type: str = 'text', workers: Optional[int] = None,
+                      executor: str = 'thread') -> List[Dict[str, Any]]:
+        """
+        Procesa varias entradas en paralelo y devuelve los resultados en el
+        mismo orden.
+
+        Con executor='thread' (OCR, voz y otras etapas que esperan a
+        subprocesos o E/S) los hilos comparten este procesador; con
+        'process' (expresiones regulares y tokenización, limitadas por la
+        CPU) cada proceso crea su propio `Processor` una sola vez. Los pools
+        se reutilizan en los lotes siguientes hasta `close()`.
+
+        Un error en una entrada no interrumpe el lote: su resultado es
+        `{'error': mensaje, 'error_type': nombre de la excepción}`.
+        """
+        self._check_type(type)
+        if executor not in EXECUTORS:
+            raise ValueError(f"Invalid executor: {executor}. Must be one of {EXECUTORS}.")
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be positive.")
+        inputs = list(inputs)
+        if not inputs:
+            return []
+
+        pool = self._pool(executor, workers)
+        if executor == 'thread':
+            return list(pool.map(partial(self._process_item, type=type), inputs))
+
+        from concurrent.futures.process import BrokenProcessPool
+        # Los aciertos de la caché se resuelven aquí; solo se envían a los
+        # procesos las entradas restantes.
+        batch: List[Optional[Dict[str, Any]]] = [None] * len(inputs)
+        keys: List[Optional[str]] = [None] * len(inputs)
+        if self.result_cache is not None:
+            for index, input in enumerate(inputs):
+                keys[index] = self._cache_key(input, type)
+                batch[index] = self._from_cache(keys[index], type)
+        pending = [index for index, result in enumerate(batch) if result is None]
+        # Se envían varias entradas por mensaje para amortizar el coste de
+        # serializarlas entre procesos.
+        size = self._pool_size('process')
+        chunksize = max(1, len(pending) // (size * 4))
+        results: List[Dict[str, Any]] = []
+        try:
+            for result in pool.map(partial(_process_in_worker, type=type),
+                                   [inputs[index] for index in pending], chunksize=chunksize):
+                results.append(result)
+        except BrokenProcessPool as e:
+            # Un trabajador ha terminado de forma abrupta (p. ej. un fallo
+            # de una librería nativa): el resto del lote se marca como
+            # error y el siguiente lote usa un pool nuevo.
+            with self._pool_lock:
+                if self._pools.get('process') is pool:
+                    del self._pools['process']
+            error = _error_result(e)
+            results.extend(dict(error) for _ in range(len(pending) - len(results)))
+
+        for index, result in zip(pending, results):
+            batch[index] = result
+            if 'error' in result:
+                if self.instrumentation is not None:
+                    self.instrumentation.record(type, Timings(), error=True)
+                continue
+            if self.instrumentation is not None:
+                self.instrumentation.record(type, Timings.from_dict(result['timings']))
+            if self.result_cache is not None:
+                self._to_cache(keys[index], result)
+        return batch
+    
+    async def aprocess_input(self, input: Union[str, List[str], bytes],
+                             type: str = 'text') -> Dict[str, Any]:
+        """
+        Versión asíncrona de `process_input` que no bloquea el bucle de
+        eventos: el OCR se ejecuta como subproceso de asyncio y las demás
+        etapas en el executor por defecto del bucle.
+
+        Se puede cancelar: el subproceso de tesseract se termina, aunque una
+        etapa que ya esté en el executor (p. ej. una transcripción) acaba en
+        segundo plano. El número de llamadas simultáneas por modalidad se
+        limita según `concurrency`; las demás esperan su turno. Los aciertos
+        de `result_cache` no esperan.
+        """
+        self._check_type(type)
+        key = None
+        if self.result_cache is not None:
+            key = self._cache_key(input, type)
+            result = self._from_cache(key, type)
+            if result is not None:
+                return result
+        semaphore = self._semaphore(type)
+        if semaphore is None:
+            result = await self._aprocess(input, type)
+        else:
+            async with semaphore:
+                result = await self._aprocess(input, type)
+        if key is not None:
+            self._to_cache(key, result)
+        return result
+    
+    async def _aprocess(self, input: Union[str, List[str], bytes], type: str) -> Dict[str, Any]:
+        if self.instrumentation is None:
+            return await self.processors[type].aprocess(input)
+
+        timings = Timings()
+        try:
+            with recording(timings), timings.stage('total'):
+                result = await self.processors[type].aprocess(input)
+        except Exception:
+            self.instrumentation.record(type, timings, error=True)
+            raise
+        result['timings'] = timings.as_dict()
+        self.instrumentation.record(type, timings)
+        return result
+    
+    async def aprocess_batch(self, inputs: Iterable[Union[str, List[str], bytes]],
+                             type: str = 'text') -> List[Dict[str, Any]]:
+        """
+        Versión asíncrona de `process_batch`: resultados en orden, con
+        `{'error': ..., 'error_type': ...}` en las entradas que fallan. La
+        concurrencia la limita `concurrency`; al cancelar el lote se cancelan
+        todas sus entradas.
+        """
+        import asyncio
+        self._check_type(type)
+        return list(await asyncio.gather(*(self._aprocess_item(input, type) for input in inputs)))
+    
+    async def _aprocess_item(self, input: Union[str, List[str], bytes], type: str) -> Dict[str, Any]:
+        try:
+            return await self.aprocess_input(input, type)
+        except Exception as e:
+            return _error_result(e)
+    
+    def _semaphore(self, type: str) -> Optional['asyncio.Semaphore']:
+        import asyncio
+        limit = self.concurrency.get(type)
+        if limit is None:
+            return None
+        semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        semaphore = semaphores.get(type)
+        if semaphore is None:
+            semaphore = semaphores[type] = asyncio.Semaphore(limit)
+        return semaphore
+    
+    def _process_item(self, input: Union[str, List[str], bytes], type: str) -> Dict[str, Any]:
+        try:
+            return self.process_input(input, type)
+        except Exception as e:
+            return _error_result(e)
+    
+    def _pool(self, executor: str, workers: Optional[int]) -> 'Executor':
+        with self._pool_lock:
+            pool = self._pools.get(executor)
+            if pool is not None and self._pool_workers[executor][0] == workers:
+                return pool
+            if pool is not None:
+                pool.shutdown(wait=False)
+            # Los mismos valores por defecto que los de `concurrent.futures`.
+            cpus = os.cpu_count() or 1
+            if executor == 'thread':
+                from concurrent.futures import ThreadPoolExecutor
+                size = workers or min(32, cpus + 4)
+                pool = ThreadPoolExecutor(size, thread_name_prefix='vogo')
+            else:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                size = workers or (min(cpus, 61) if os.name == 'nt' else cpus)
+                # 'spawn' evita heredar hilos y cerrojos del proceso padre.
+                pool = ProcessPoolExecutor(
+                    size, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.grammar, self._options, self.instrumentation is not None,
+                              self.processors.modalities))
+            self._pools[executor] = pool
+            self._pool_workers[executor] = (workers, size)
+            return pool
+    
+    def _pool_size(self, executor: str) -> int:
+        """Número de trabajadores del pool que creó `_pool`."""
+        return self._pool_workers[executor][1]
+    
+    def close(self):
+        """Detiene los pools de `process_batch`."""
+        with self._pool_lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.shutdown()
+    
+    def __enter__(self) -> 'Processor':
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _bounded_map(pool: 'Executor', function: Callable[[Any], Any], items: Iterable[Any],
+                 limit: int) -> Iterator[Any]:
+    """Como `pool.map`, en orden, pero con `limit` tareas pendientes como máximo."""
+    from collections import deque
+    pending: 'deque[Any]' = deque()
+    try:
+        for item in items:
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+            pending.append(pool.submit(function, item))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _error_result(error: Exception) -> Dict[str, Any]:
+    return {'error': str(error), 'error_type': error.__class__.__name__}
+
+
+# Procesador de cada proceso trabajador, creado una vez al arrancar.
+_worker: Optional[Processor] = None
+
+
+def _init_worker(grammar: Grammar, options: Dict[str, Any], instrumentation: bool,
+                 modalities: List[str]):
+    global _worker
+    _worker = Processor(grammar, instrumentation=instrumentation, modalities=modalities,
+                        **options)
+
+
+def _process_in_worker(input: Union[str, List[str], bytes], type: str) -> Dict[str, Any]:
+    return _worker._process_item(input, type)
+
+
+def _scan_in_worker(window: Window):
+    return _worker.processors['text']._scan_window(window)
@@ -0,0 +1,546 @@
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+    from re import _compiler as sre_compile
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+    import sre_compile
+
+import _sre
+
+C = sre_constants
+
+# Equivalencias extra de mayúsculas/minúsculas que usa `re` con IGNORECASE
+# (p. ej. 's' ~ 'ſ', 'i' ~ 'ı'); el nombre cambió en Python 3.11.
+_EXTRA_CASES: Dict[int, Tuple[int, ...]] = getattr(
+    sre_compile, '_EXTRA_CASES', getattr(sre_compile, '_ignorecase_fixes', {})
+)
+
+_REPEATS = tuple(op for op in (
+    C.MAX_REPEAT, C.MIN_REPEAT, getattr(C, 'POSSESSIVE_REPEAT', None)
+) if op is not None)
+_ATOMIC_GROUP = getattr(C, 'ATOMIC_GROUP', None)
+
+_CATEGORY_RE = {
+    C.CATEGORY_DIGIT: re.compile(r'\d'),
+    C.CATEGORY_NOT_DIGIT: re.compile(r'\D'),
+    C.CATEGORY_SPACE: re.compile(r'\s'),
+    C.CATEGORY_NOT_SPACE: re.compile(r'\S'),
+    C.CATEGORY_WORD: re.compile(r'\w'),
+    C.CATEGORY_NOT_WORD: re.compile(r'\W'),
+}
+
+_DISJOINT_CATEGORIES = {
+    frozenset(pair) for pair in (
+        (C.CATEGORY_DIGIT, C.CATEGORY_SPACE),
+        (C.CATEGORY_WORD, C.CATEGORY_SPACE),
+        (C.CATEGORY_DIGIT, C.CATEGORY_NOT_DIGIT),
+        (C.CATEGORY_WORD, C.CATEGORY_NOT_WORD),
+        (C.CATEGORY_SPACE, C.CATEGORY_NOT_SPACE),
+        (C.CATEGORY_DIGIT, C.CATEGORY_NOT_WORD),
+    )
+}
+
+_WORD_CATEGORIES = {C.CATEGORY_WORD, C.CATEGORY_DIGIT}
+_WORD = re.compile(r'\w+')
+
+# Rangos más anchos que esto se tratan de forma conservadora.
+_MAX_EXPANDED_RANGE = 512
+
+
+def case_variants(char: str) -> List[str]:
+    """Caracteres que `re` considera iguales a `char` con IGNORECASE."""
+    lower = _sre.unicode_tolower(ord(char))
+    variants = {char, chr(lower), char.upper() if len(char.upper()) == 1 else char}
+    variants.update(chr(c) for c in _EXTRA_CASES.get(lower, ()))
+    return sorted(variants)
+
+
+def fold(char: str) -> str:
+    """Forma canónica de `char` bajo IGNORECASE."""
+    lower = _sre.unicode_tolower(ord(char))
+    return chr(min((lower,) + _EXTRA_CASES.get(lower, ())))
+
+
+@lru_cache(maxsize=65536)
+def _fold_non_ascii(text: str) -> str:
+    return ''.join(fold(c) for c in text)
+
+
+def fold_text(text: str) -> str:
+    """Forma canónica de `text`: dos textos coinciden con IGNORECASE si su forma es igual."""
+    if text.isascii():
+        return text.lower()
+    return _fold_non_ascii(text)
+
+
+class CharSet:
+    """Conjunto (posiblemente negado) de caracteres que un patrón puede consumir."""
+
+    __slots__ = ('chars', 'ranges', 'categories', 'negated', 'universe')
+
+    def __init__(self, negated: bool = False, universe: bool = False):
+        self.chars = set()
+        self.ranges = []
+        self.categories = set()
+        self.negated = negated
+        self.universe = universe
+
+    @classmethod
+    def any(cls) -> 'CharSet':
+        return cls(universe=True)
+
+    def is_empty(self) -> bool:
+        return (not self.universe and not self.negated and not self.chars
+                and not self.ranges and not self.categories)
+
+    def add_char(self, char: str):
+        self.chars.update(case_variants(char))
+
+    def add_range(self, low: int, high: int):
+        if high - low <= _MAX_EXPANDED_RANGE:
+            for code in range(low, high + 1):
+                self.add_char(chr(code))
+        else:
+            self.ranges.append((low, high))
+
+    def update(self, other: 'CharSet'):
+        if other.universe or other.negated or self.negated:
+            self.universe = True
+            return
+        self.chars |= other.chars
+        self.ranges.extend(other.ranges)
+        self.categories |= other.categories
+
+    def _positive_contains(self, char: str) -> bool:
+        for variant in case_variants(char):
+            if variant in self.chars:
+                return True
+            code = ord(variant)
+            if any(low <= code <= high for low, high in self.ranges):
+                return True
+            if any(_CATEGORY_RE[cat].match(variant) for cat in self.categories):
+                return True
+        return False
+
+    def __contains__(self, char: str) -> bool:
+        if self.universe:
+            return True
+        return self._positive_contains(char) != self.negated
+
+    def intersects(self, other: 'CharSet') -> bool:
+        if self.is_empty() or other.is_empty():
+            return False
+        if self.universe or other.universe or (self.negated and other.negated):
+            return True
+        if self.negated:
+            return other.intersects(self)
+        if any(char in other for char in self.chars):
+            return True
+        if other.negated:
+            # Un rango ancho o una categoría casi siempre escapa a una negación.
+            return bool(self.ranges or self.categories)
+        if any(char in self for char in other.chars):
+            return True
+        if (self.ranges and (other.ranges or other.categories)) or \
+                (other.ranges and self.categories):
+            return True
+        return any(frozenset((a, b)) not in _DISJOINT_CATEGORIES
+                   for a in self.categories for b in other.categories)
+
+    def is_word_only(self) -> bool:
+        if self.universe or self.negated or self.ranges:
+            return False
+        if not self.categories <= _WORD_CATEGORIES:
+            return False
+        return all(_CATEGORY_RE[C.CATEGORY_WORD].match(c) for c in self.chars)
+
+
+def _charset_from_in(items) -> CharSet:
+    negated = bool(items) and items[0][0] is C.NEGATE
+    charset = CharSet(negated=negated)
+    for op, av in items:
+        if op is C.LITERAL:
+            charset.add_char(chr(av))
+        elif op is C.RANGE:
+            charset.add_range(*av)
+        elif op is C.CATEGORY:
+            if av in _CATEGORY_RE:
+                charset.categories.add(int(av))
+            else:
+                return CharSet.any()
+        elif op is not C.NEGATE:
+            return CharSet.any()
+    return charset
+
+
+def _item_charset(op, av) -> Optional[CharSet]:
+    if op is C.LITERAL:
+        charset = CharSet()
+        charset.add_char(chr(av))
+        return charset
+    if op is C.NOT_LITERAL:
+        charset = CharSet(negated=True)
+        charset.add_char(chr(av))
+        return charset
+    if op is C.IN:
+        return _charset_from_in(av)
+    if op is C.ANY:
+        return CharSet.any()
+    return None
+
+
+def _children(op, av) -> Iterable:
+    if op is C.SUBPATTERN:
+        yield av[-1]
+    elif op in _REPEATS:
+        yield av[2]
+    elif op is C.BRANCH:
+        yield from av[1]
+    elif op in (C.ASSERT, C.ASSERT_NOT):
+        yield av[1]
+    elif op is C.GROUPREF_EXISTS:
+        yield av[1]
+        if av[2] is not None:
+            yield av[2]
+    elif _ATOMIC_GROUP is not None and op is _ATOMIC_GROUP:
+        yield av
+
+
+def walk(items) -> Iterable:
+    """Recorre todos los nodos (op, av) de un patrón analizado."""
+    for op, av in items:
+        yield op, av
+        for child in _children(op, av):
+            yield from walk(child)
+
+
+def consumed_charset(items) -> CharSet:
+    charset = CharSet()
+    for op, av in walk(items):
+        if op is C.GROUPREF:
+            return CharSet.any()
+        item = _item_charset(op, av)
+        if item is not None:
+            charset.update(item)
+            if charset.universe:
+                break
+    return charset
+
+
+def _min_width(items) -> int:
+    return items.getwidth()[0] if hasattr(items, 'getwidth') else 0
+
+
+def first_charset(items) -> CharSet:
+    """Caracteres con los que puede empezar una coincidencia no vacía."""
+    charset = CharSet()
+    for op, av in items:
+        item = _item_charset(op, av)
+        if item is not None:
+            charset.update(item)
+            return charset
+        if op in (C.AT, C.ASSERT, C.ASSERT_NOT):
+            continue
+        if op is C.SUBPATTERN:
+            sub = av[-1]
+        elif op in _REPEATS:
+            sub = av[2]
+        elif _ATOMIC_GROUP is not None and op is _ATOMIC_GROUP:
+            sub = av
+        elif op is C.BRANCH:
+            for branch in av[1]:
+                charset.update(first_charset(branch))
+            if all(_min_width(branch) > 0 for branch in av[1]):
+                return charset
+            continue
+        else:
+            return CharSet.any()
+        charset.update(first_charset(sub))
+        if _min_width(sub) > 0 and not (op in _REPEATS and av[0] == 0):
+            return charset
+    return charset
+
+
+# Tope de palabras al expandir una regla a su conjunto de literales.
+MAX_KEYWORDS_PER_RULE = 10000
+
+
+def literal_strings(items, limit: int = MAX_KEYWORDS_PER_RULE) -> Optional[Set[str]]:
+    """
+    Lenguaje finito de un patrón formado solo por literales, alternancias,
+    clases de literales y opcionales; None si el patrón no es de ese tipo.
+    Los grupos de captura internos también devuelven None.
+    """
+    strings = {''}
+    for op, av in items:
+        if op is C.LITERAL:
+            options = {chr(av)}
+        elif op is C.IN and all(o is C.LITERAL for o, _ in av):
+            options = {chr(a) for _, a in av}
+        elif op is C.BRANCH:
+            options = set()
+            for branch in av[1]:
+                sub = literal_strings(branch, limit)
+                if sub is None:
+                    return None
+                options |= sub
+        elif op is C.SUBPATTERN and av[0] is None:
+            options = literal_strings(av[-1], limit)
+            if options is None:
+                return None
+        elif op in _REPEATS and av[0] == 0 and av[1] == 1:
+            options = literal_strings(av[2], limit)
+            if options is None:
+                return None
+            options.add('')
+        else:
+            return None
+        strings = {prefix + option for prefix in strings for option in options}
+        if len(strings) > limit:
+            return None
+    return strings
+
+
+def _keywords(parsed, groups: int) -> Optional[FrozenSet[str]]:
+    """Palabras de una regla `\\b(w1|w2|...)\\b` plegadas para IGNORECASE."""
+    if len(parsed) < 3 or parsed[0] != (C.AT, C.AT_BOUNDARY) \
+            or parsed[-1] != (C.AT, C.AT_BOUNDARY):
+        return None
+    body = parsed[1:-1]
+    if groups:
+        if groups != 1 or len(body) != 1 or body[0][0] is not C.SUBPATTERN:
+            return None
+        body = body[0][1][-1]
+    words = literal_strings(body)
+    if not words or not all(_WORD.fullmatch(w) for w in words):
+        return None
+    return frozenset(fold_text(w) for w in words)
+
+
+# Máximo de literales obligatorios que se comprueban por regla.
+MAX_REQUIRED_LITERALS = 3
+
+
+def _prefilter_char(code: int) -> Optional[str]:
+    """Forma en minúsculas de un literal si `str.lower` la reproduce con exactitud."""
+    lower = _sre.unicode_tolower(code)
+    if lower in _EXTRA_CASES or chr(code).lower() != chr(lower):
+        return None
+    return chr(lower)
+
+
+def _required_pieces(items, pieces: List[str]):
+    run = []
+
+    def flush():
+        if run:
+            pieces.append(''.join(run))
+            run.clear()
+
+    for op, av in items:
+        if op is C.IN and len(av) == 1 and av[0][0] is C.LITERAL:
+            op, av = av[0]
+        if op is C.LITERAL:
+            char = _prefilter_char(av)
+            if char is None:
+                flush()
+            else:
+                run.append(char)
+        elif op is C.AT:
+            continue
+        elif op is C.SUBPATTERN:
+            flush()
+            _required_pieces(av[-1], pieces)
+        elif op in _REPEATS and av[0] >= 1:
+            flush()
+            _required_pieces(av[2], pieces)
+        else:
+            flush()
+    flush()
+
+
+def required_literals(items) -> Tuple[str, ...]:
+    """
+    Fragmentos (en minúsculas) que aparecen en cualquier texto que la regla
+    pueda reconocer; sirven para descartarla sin ejecutar la expresión.
+    """
+    pieces: List[str] = []
+    _required_pieces(items, pieces)
+    unique = sorted(dict.fromkeys(pieces), key=len, reverse=True)
+    return tuple(unique[:MAX_REQUIRED_LITERALS])
+
+
+def _item_min_width(item, state) -> int:
+    return sre_parse.SubPattern(state, [item]).getwidth()[0]
+
+
+def _ambiguous_branch(av) -> bool:
+    firsts = [first_charset(branch) for branch in av[1]]
+    return any(firsts[i].intersects(firsts[j])
+               for i in range(len(firsts)) for j in range(i + 1, len(firsts)))
+
+
+def _ambiguous_body(items) -> bool:
+    """
+    True si el cuerpo de una repetición puede repartir un mismo texto entre
+    sus iteraciones de varias formas: todo lo obligatorio en él son
+    repeticiones que pueden consumir los mismos caracteres, o una única
+    alternancia o grupo que a su vez es ambiguo.
+    """
+    loops = []
+    mandatory = []
+    for op, av in items:
+        if op in (C.MAX_REPEAT, C.MIN_REPEAT) and av[1] > 1:
+            loops.append((op, av))
+        elif _item_min_width((op, av), items.state) > 0:
+            mandatory.append((op, av))
+
+    if not mandatory and loops:
+        # Una repetición que puede quedar vacía no separa a las demás.
+        loops = [loop for loop in loops if _item_min_width(loop, items.state) > 0]
+        if len(loops) <= 1:
+            return True
+        consumed = [consumed_charset([loop]) for loop in loops]
+        return any(consumed[i].intersects(consumed[j])
+                   for i in range(len(consumed)) for j in range(i + 1, len(consumed)))
+
+    if len(mandatory) == 1 and not loops:
+        op, av = mandatory[0]
+        if op is C.SUBPATTERN:
+            return _ambiguous_body(av[-1])
+        if op is C.BRANCH:
+            return _ambiguous_branch(av) or any(_ambiguous_body(branch) for branch in av[1])
+    return False
+
+
+def backtracking_risk(items) -> bool:
+    """
+    True si el patrón puede provocar un retroceso exponencial en `re`, como
+    `(a+)+$`, `(\\w+\\s?)*$` o `(x+x+)+y`: una repetición sin límite cuyo cuerpo
+    es ambiguo. Las repeticiones posesivas y los grupos atómicos no retroceden.
+    """
+    for op, av in walk(items):
+        if op in (C.MAX_REPEAT, C.MIN_REPEAT) and av[1] == C.MAXREPEAT:
+            if _ambiguous_body(av[2]):
+                return True
+    return False
+
+
+# Aserciones que dan el mismo resultado al principio o al final de un texto
+# que junto a un separador que no es carácter de palabra.
+_BOUNDARY_ATS = (C.AT_BOUNDARY, C.AT_NON_BOUNDARY)
+
+
+def _matches_char(op, av, char: str, flags: int) -> bool:
+    """True si el nodo de un solo carácter (op, av) puede consumir `char`."""
+    variants = case_variants(char) if flags & re.IGNORECASE else [char]
+    if op is C.LITERAL:
+        return chr(av) in variants
+    if op is C.NOT_LITERAL:
+        return chr(av) not in variants
+    if op is C.ANY:
+        return char != '\n' or bool(flags & re.DOTALL)
+    # IN: se evalúa la clase; lo que no se sabe evaluar cuenta como sí.
+    negated = bool(av) and av[0][0] is C.NEGATE
+    found = False
+    for item_op, item_av in av:
+        if item_op is C.LITERAL:
+            found = chr(item_av) in variants
+        elif item_op is C.RANGE:
+            found = any(item_av[0] <= ord(v) <= item_av[1] for v in variants)
+        elif item_op is C.CATEGORY and item_av in _CATEGORY_RE:
+            found = any(_CATEGORY_RE[item_av].match(v) for v in variants)
+        elif item_op is not C.NEGATE:
+            return True
+        if found:
+            break
+    return found != negated
+
+
+def _can_consume(items, char: str, flags: int) -> bool:
+    for op, av in items:
+        if op in (C.LITERAL, C.NOT_LITERAL, C.ANY, C.IN):
+            if _matches_char(op, av, char, flags):
+                return True
+        elif op is C.GROUPREF:
+            return True
+        elif op is C.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            if _can_consume(sub, char, (flags | add_flags) & ~del_flags):
+                return True
+        else:
+            if any(_can_consume(child, char, flags) for child in _children(op, av)):
+                return True
+    return False
+
+
+def joinable(pattern: str, separator: str, flags: int = 0) -> bool:
+    """
+    True si las coincidencias de `pattern` en varios textos unidos por
+    `separator` (un carácter que no es de palabra) son exactamente las de
+    cada texto por separado: la regla no puede consumir el separador, no
+    tiene anclas ni lookarounds que vean el texto vecino y no admite
+    coincidencias vacías. `\\b` y `\\B` ven el separador igual que el
+    principio o el final del texto.
+    """
+    parsed = sre_parse.parse(pattern, flags)
+    if _min_width(parsed) == 0:
+        return False
+    for op, av in walk(parsed):
+        if op is C.AT and av not in _BOUNDARY_ATS:
+            return False
+        if op in (C.ASSERT, C.ASSERT_NOT):
+            return False
+    state = getattr(parsed, 'state', None) or parsed.pattern
+    return not _can_consume(parsed, separator, flags | state.flags)
+
+
+class RuleInfo:
+    """Resultado del análisis estático de una regla regex."""
+
+    __slots__ = ('key', 'pattern', 'groups', 'combinable', 'first',
+                 'consumed', 'word_delimited', 'keywords', 'required', 'risky')
+
+    def __init__(self, key: str, pattern: str):
+        self.key = key
+        self.pattern = pattern
+        compiled = re.compile(pattern)
+        self.groups = compiled.groups
+
+        parsed = sre_parse.parse(pattern)
+        state = getattr(parsed, 'state', None) or parsed.pattern
+        global_flags = state.flags & ~re.UNICODE
+        has_refs = any(op in (C.GROUPREF, C.GROUPREF_EXISTS) for op, _ in walk(parsed))
+
+        self.first = first_charset(parsed)
+        self.consumed = consumed_charset(parsed)
+        # Las reglas de riesgo van en un carril propio para poder limitar su
+        # tiempo sin afectar al resto.
+        self.risky = backtracking_risk(parsed)
+        self.combinable = (not global_flags and not has_refs and not self.risky
+                           and not compiled.groupindex and _min_width(parsed) > 0)
+        self.word_delimited = (
+            len(parsed) >= 2
+            and parsed[0] == (C.AT, C.AT_BOUNDARY)
+            and parsed[-1] == (C.AT, C.AT_BOUNDARY)
+            and self.consumed.is_word_only()
+        )
+        self.keywords = None if global_flags else _keywords(parsed, self.groups)
+        self.required = () if global_flags else required_literals(parsed)
+
+    def compatible(self, other: 'RuleInfo') -> bool:
+        """True si ninguna coincidencia de una regla puede solaparse con la otra."""
+        if self.word_delimited and other.word_delimited:
+            return not self.first.intersects(other.first)
+        return (not self.first.intersects(other.consumed)
+                and not other.first.intersects(self.consumed))
+
+
+def analyze_rules(rules: Dict[str, str]) -> List[RuleInfo]:
+    return [RuleInfo(key, pattern) for key, pattern in rules.items()]
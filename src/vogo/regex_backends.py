@@ -0,0 +1,229 @@
+import re
+import signal
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+class RuleTimeout(Exception):
+    """Una regla superó su presupuesto de tiempo."""
+
+
+class RegexBackend:
+    """Motor de expresiones regulares por defecto: el módulo `re` de la biblioteca estándar."""
+
+    name = 're'
+    # True si el tiempo de búsqueda es lineal en el tamaño del texto.
+    linear = False
+
+    def compile(self, pattern: str, flags: int = 0):
+        return re.compile(pattern, flags)
+
+
+class RE2Backend(RegexBackend):
+    """
+    Motor de tiempo lineal basado en RE2 (paquete `google-re2`).
+
+    RE2 no admite referencias hacia atrás ni aserciones de anticipación, y
+    sus clases `\\w`, `\\d` y `\\b` solo cubren ASCII.
+    """
+
+    name = 're2'
+    linear = True
+
+    def __init__(self):
+        _import_re2()
+
+    def compile(self, pattern: str, flags: int = 0):
+        re2 = _import_re2()
+        prefix = ''.join(inline for flag, inline in (
+            (re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's')) if flags & flag)
+        try:
+            return re2.compile(f'(?{prefix}){pattern}' if prefix else pattern)
+        except Exception as e:
+            message = e.args[0] if e.args else e
+            if isinstance(message, bytes):
+                message = message.decode('utf-8', 'replace')
+            raise ValueError(f"Pattern not supported by re2: {message}")
+
+
+def _import_re2():
+    try:
+        import re2
+    except ImportError:
+        raise ValueError("The 're2' backend requires the google-re2 package: pip install google-re2")
+    return re2
+
+
+BACKENDS = {'re': RegexBackend, 're2': RE2Backend}
+
+
+def get_backend(backend: Union[str, RegexBackend, None]) -> RegexBackend:
+    if backend is None:
+        return RegexBackend()
+    if isinstance(backend, RegexBackend):
+        return backend
+    try:
+        return BACKENDS[backend]()
+    except KeyError:
+        raise ValueError(f"Invalid regex backend: {backend}. Must be one of {list(BACKENDS)}.")
+
+
+def alarm_available() -> bool:
+    """
+    El presupuesto con SIGALRM solo funciona en el hilo principal de sistemas
+    POSIX, y solo se usa si la aplicación no tiene ya un temporizador
+    ITIMER_REAL en marcha ni un manejador propio de SIGALRM.
+    """
+    return (hasattr(signal, 'setitimer')
+            and threading.current_thread() is threading.main_thread()
+            and _default_alarm_handler()
+            and signal.getitimer(signal.ITIMER_REAL)[0] == 0)
+
+
+def _default_alarm_handler() -> bool:
+    return signal.getsignal(signal.SIGALRM) in (signal.SIG_DFL, signal.SIG_IGN)
+
+
+class alarm_budget:
+    """
+    Interrumpe el bloque con `RuleTimeout` si dura más de `seconds`.
+
+    El motor de `re` comprueba las señales pendientes mientras busca, así que
+    un SIGALRM detiene también una búsqueda con retroceso catastrófico. Al
+    salir se restauran el manejador y el temporizador anteriores.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self._previous = None
+        self._timer = (0.0, 0.0)
+        self._started = 0.0
+
+    def _expired(self, signum, frame):
+        raise RuleTimeout()
+
+    def __enter__(self):
+        if not _default_alarm_handler():
+            raise ValueError("SIGALRM already has a handler; "
+                             "rule timeouts cannot use the alarm budget.")
+        self._previous = signal.signal(signal.SIGALRM, self._expired)
+        self._started = time.monotonic()
+        self._timer = signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        return self
+
+    def __exit__(self, *exc):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, self._previous)
+        delay, interval = self._timer
+        if delay or interval:
+            # El temporizador anterior sigue con el tiempo que le quedaba.
+            remaining = delay - (time.monotonic() - self._started)
+            signal.setitimer(signal.ITIMER_REAL, max(remaining, 1e-6), interval)
+        return False
+
+
+class RemoteMatch:
+    """Coincidencia devuelta por `IsolatedRunner`, con la interfaz de `re.Match` que usa vogo."""
+
+    __slots__ = ('string', 'regs', 'lastindex')
+
+    def __init__(self, string: str, regs: Tuple[Tuple[int, int], ...], lastindex: Optional[int]):
+        self.string = string
+        self.regs = regs
+        self.lastindex = lastindex
+
+    def group(self, index: int = 0) -> Optional[str]:
+        start, end = self.regs[index]
+        return None if start < 0 else self.string[start:end]
+
+    def span(self, index: int = 0) -> Tuple[int, int]:
+        return self.regs[index]
+
+    def start(self, index: int = 0) -> int:
+        return self.regs[index][0]
+
+    def end(self, index: int = 0) -> int:
+        return self.regs[index][1]
+
+
+def _isolated_worker(conn):
+    compiled: Dict[Tuple[str, int], Any] = {}
+    conn.send('ready')
+    while True:
+        try:
+            pattern, flags, text = conn.recv()
+        except EOFError:
+            return
+        regex = compiled.get((pattern, flags))
+        if regex is None:
+            regex = compiled[(pattern, flags)] = re.compile(pattern, flags)
+        conn.send([(m.regs, m.lastindex) for m in regex.finditer(text)])
+
+
+class IsolatedRunner:
+    """
+    Ejecuta búsquedas en un proceso auxiliar que se termina si excede el
+    presupuesto. Se usa fuera del hilo principal, donde no hay SIGALRM.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._process = None
+        self._conn = None
+
+    def _start(self):
+        import multiprocessing
+        context = multiprocessing.get_context('spawn')
+        parent, child = context.Pipe()
+        self._process = context.Process(target=_isolated_worker, args=(child,), daemon=True)
+        self._process.start()
+        child.close()
+        self._conn = parent
+        # El arranque del intérprete no cuenta para el presupuesto.
+        parent.recv()
+
+    def _stop(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+            self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def finditer(self, pattern: str, flags: int, text: str, timeout: float) -> List[RemoteMatch]:
+        with self._lock:
+            if self._process is None or not self._process.is_alive():
+                self._start()
+            try:
+                self._conn.send((pattern, flags, text))
+                if not self._conn.poll(timeout):
+                    self._stop()
+                    raise RuleTimeout()
+                found = self._conn.recv()
+            except (EOFError, OSError) as e:
+                self._stop()
+                raise RuntimeError(f"Regex worker process failed: {str(e)}")
+            return [RemoteMatch(text, regs, lastindex) for regs, lastindex in found]
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+
+_runner: Optional[IsolatedRunner] = None
+_runner_lock = threading.Lock()
+
+
+def isolated_runner() -> IsolatedRunner:
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = IsolatedRunner()
+        return _runner
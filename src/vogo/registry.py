@@ -0,0 +1,84 @@
+import threading
+import weakref
+from typing import Any, Dict, Iterable, Union
+from .cache import GrammarCache
+from .grammar import Grammar
+from .processor import Processor
+
+
+class GrammarRegistry:
+    """
+    Registro de gramáticas compartidas entre procesadores y clientes (tenants).
+
+    Las gramáticas se internan por el hash de su contenido: dos clientes con
+    las mismas reglas usan el mismo objeto `Grammar` compilado. Registrar una
+    versión nueva de la gramática de un cliente la sustituye de forma atómica
+    en todos sus `Processor`; las llamadas en curso terminan con la versión
+    con la que empezaron.
+    """
+
+    def __init__(self, cache: Union[GrammarCache, bool, str, None] = None):
+        self.cache = cache
+        self._lock = threading.RLock()
+        self._interned: 'weakref.WeakValueDictionary[str, Grammar]' = weakref.WeakValueDictionary()
+        self._tenants: Dict[str, Grammar] = {}
+        self._processors: Dict[str, 'weakref.WeakSet[Processor]'] = {}
+
+    def intern(self, rules: Dict[str, str], type: str = 'regex', **options: Any) -> Grammar:
+        """Devuelve la gramática compilada para estas reglas, creándola si no existe."""
+        key = Grammar.compute_fingerprint(rules, type, **options)
+        grammar = self._interned.get(key)
+        if grammar is not None:
+            return grammar
+        # Se compila sin el cerrojo para no bloquear al resto de clientes
+        # mientras se construye una gramática grande.
+        built = Grammar(dict(rules), type, cache=self.cache, **options)
+        with self._lock:
+            grammar = self._interned.get(key)
+            if grammar is None:
+                grammar = self._interned[key] = built
+            return grammar
+
+    def register(self, tenant: str, rules: Dict[str, str], type: str = 'regex',
+                 **options: Any) -> Grammar:
+        """Asigna (o sustituye) la gramática de un cliente."""
+        grammar = self.intern(rules, type, **options)
+        with self._lock:
+            self._tenants[tenant] = grammar
+            for processor in list(self._processors.get(tenant, ())):
+                processor.set_grammar(grammar)
+        return grammar
+
+    def get(self, tenant: str) -> Grammar:
+        try:
+            return self._tenants[tenant]
+        except KeyError:
+            raise ValueError(f"Unknown tenant: '{tenant}'")
+
+    def processor(self, tenant: str, **kwargs: Any) -> Processor:
+        """Crea un `Processor` que sigue a la gramática vigente del cliente."""
+        with self._lock:
+            processor = Processor(self.get(tenant), **kwargs)
+            self._processors.setdefault(tenant, weakref.WeakSet()).add(processor)
+        return processor
+
+    def remove(self, tenant: str):
+        with self._lock:
+            self._tenants.pop(tenant, None)
+            self._processors.pop(tenant, None)
+
+    def tenants(self) -> Iterable[str]:
+        return list(self._tenants)
+
+    def __contains__(self, tenant: str) -> bool:
+        return tenant in self._tenants
+
+    def __len__(self) -> int:
+        return len(self._tenants)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'tenants': len(self._tenants),
+                'grammars': len(self._interned),
+            }
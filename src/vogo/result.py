@@ -0,0 +1,154 @@
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+_RESULT_KEYS = ('text', 'tokens', 'matches', 'stats')
+_STATS_KEYS = ('token_count', 'match_count', 'unique_tokens')
+
+
+class Stats(Mapping):
+    """Estadísticas de un `Result`; cada valor se calcula al leerlo por primera vez."""
+
+    __slots__ = ('_result', '_values')
+
+    def __init__(self, result: 'Result'):
+        self._result = result
+        self._values: Dict[str, int] = {}
+
+    def __getitem__(self, key: str) -> int:
+        value = self._values.get(key)
+        if value is not None:
+            return value
+        if key == 'token_count':
+            value = len(self._result.tokens)
+        elif key == 'match_count':
+            value = sum(len(m['matches']) for m in self._result.matches)
+        elif key == 'unique_tokens':
+            value = len(set(token.lower() for token in self._result.tokens))
+        else:
+            raise KeyError(key)
+        self._values[key] = value
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_STATS_KEYS)
+
+    def __len__(self) -> int:
+        return len(_STATS_KEYS)
+
+    def __contains__(self, key) -> bool:
+        return key in _STATS_KEYS
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class Result(MutableMapping):
+    """
+    Resultado de `process` que se comporta como el diccionario de siempre
+    ('text', 'tokens', 'matches', 'stats' y claves opcionales como
+    'timeouts' o 'timings') pero calcula los tokens y las estadísticas solo
+    cuando se leen, y los guarda para los siguientes accesos.
+
+    Las claves también están disponibles como atributos (`result.matches`).
+    Para serializarlo como JSON, usar `to_dict()`.
+    """
+
+    __slots__ = ('text', 'matches', '_tokenize', '_tokens', '_stats', '_extra')
+
+    def __init__(self, text: str, matches: List[Dict[str, Any]],
+                 tokenize: Optional[Callable[[str], List[str]]] = None,
+                 tokens: Optional[List[str]] = None):
+        self.text = text
+        self.matches = matches
+        self._tokenize = tokenize
+        self._tokens = tokens
+        self._stats: Optional[Stats] = None
+        self._extra: Dict[str, Any] = {}
+
+    @property
+    def tokens(self) -> List[str]:
+        if self._tokens is None:
+            self._tokens = self._tokenize(self.text)
+            self._tokenize = None
+        return self._tokens
+
+    @property
+    def stats(self) -> Stats:
+        if self._stats is None:
+            self._stats = Stats(self)
+        return self._stats
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'text':
+            return self.text
+        if key == 'tokens':
+            return self.tokens
+        if key == 'matches':
+            return self.matches
+        if key == 'stats':
+            return self.stats
+        return self._extra[key]
+
+    def __setitem__(self, key: str, value: Any):
+        if key == 'text':
+            self.text = value
+        elif key == 'tokens':
+            self._tokens = value
+            self._stats = None
+        elif key == 'matches':
+            self.matches = value
+            self._stats = None
+        elif key == 'stats':
+            raise KeyError("'stats' is computed from tokens and matches")
+        else:
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in _RESULT_KEYS:
+            raise KeyError(f"'{key}' cannot be removed from a result")
+        del self._extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from _RESULT_KEYS
+        yield from self._extra
+
+    def __len__(self) -> int:
+        return len(_RESULT_KEYS) + len(self._extra)
+
+    def __contains__(self, key) -> bool:
+        return key in _RESULT_KEYS or key in self._extra
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {key: self[key] for key in self}
+        result['stats'] = dict(self.stats)
+        return result
+
+    def __repr__(self) -> str:
+        return f"Result({self.to_dict()!r})"
+
+    def state(self) -> Tuple[str, List[Dict[str, Any]], Optional[List[str]], Dict[str, Any]]:
+        """Datos del resultado sin tokenizar si aún no se ha hecho (para `ResultCache`)."""
+        return self.text, self.matches, self._tokens, dict(self._extra)
+
+    @classmethod
+    def from_state(cls, state: Tuple[str, List[Dict[str, Any]], Optional[List[str]], Dict[str, Any]],
+                   tokenize: Callable[[str], List[str]]) -> 'Result':
+        """Reconstruye un resultado de `state`; los tokens se calculan con `tokenize`."""
+        text, matches, tokens, extra = state
+        result = cls(text, matches, tokenize=tokenize, tokens=tokens)
+        result._extra.update(extra)
+        return result
+
+    def __reduce__(self):
+        # Al copiarse a otro proceso se envía ya tokenizado, sin el procesador.
+        return _restore, (self.text, self.matches, self.tokens, self._extra)
+
+
+def _restore(text: str, matches: List[Dict[str, Any]], tokens: List[str],
+             extra: Dict[str, Any]) -> Result:
+    result = Result(text, matches, tokens=tokens)
+    result._extra.update(extra)
+    return result
@@ -0,0 +1,96 @@
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+
+def _typecode(text: str) -> str:
+    # 4 bytes por posición salvo en textos de más de 4G caracteres.
+    return 'I' if len(text) < 2 ** 32 else 'Q'
+
+
+class SpanList(Sequence):
+    """
+    Secuencia de subcadenas de `text` guardadas como posiciones.
+
+    Los inicios y finales se guardan en dos `array` compactos y cada cadena
+    se crea solo al acceder a ella, por lo que una lista de miles de tokens
+    ocupa unos pocos bytes por elemento. Se comporta como una lista de `str`
+    (indexado, iteración, `len`, comparación con listas) y además da acceso a
+    las posiciones con `span(i)` y `spans()`.
+
+    `overrides` sustituye el texto de algunos elementos, p. ej. las comillas
+    que el tokenizador normaliza a `` y ''.
+    """
+
+    __slots__ = ('text', 'starts', 'ends', 'overrides')
+
+    def __init__(self, text: str, starts: Optional[array] = None, ends: Optional[array] = None,
+                 overrides: Optional[Dict[int, str]] = None):
+        self.text = text
+        self.starts = starts if starts is not None else array(_typecode(text))
+        self.ends = ends if ends is not None else array(_typecode(text))
+        self.overrides = overrides
+
+    @classmethod
+    def from_spans(cls, text: str, spans: Iterable[Tuple[int, int]]) -> 'SpanList':
+        result = cls(text)
+        for start, end in spans:
+            result.append(start, end)
+        return result
+
+    def append(self, start: int, end: int, value: Optional[str] = None):
+        if value is not None:
+            if self.overrides is None:
+                self.overrides = {}
+            self.overrides[len(self.starts)] = value
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def span(self, index: int) -> Tuple[int, int]:
+        return self.starts[index], self.ends[index]
+
+    def spans(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.starts, self.ends)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            indices = range(len(self.starts))[index]
+            overrides = None
+            if self.overrides:
+                overrides = {new: self.overrides[old] for new, old in enumerate(indices)
+                             if old in self.overrides}
+            return SpanList(self.text, self.starts[index], self.ends[index], overrides or None)
+        if self.overrides:
+            if index < 0:
+                index += len(self.starts)
+            value = self.overrides.get(index)
+            if value is not None:
+                return value
+        return self.text[self.starts[index]:self.ends[index]]
+
+    def __iter__(self) -> Iterator[str]:
+        text = self.text
+        if not self.overrides:
+            for start, end in zip(self.starts, self.ends):
+                yield text[start:end]
+            return
+        overrides = self.overrides
+        for index, (start, end) in enumerate(zip(self.starts, self.ends)):
+            value = overrides.get(index)
+            yield text[start:end] if value is None else value
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (SpanList, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        if len(self) > 20:
+            head = ', '.join(repr(value) for value in self[:10])
+            return f"SpanList([{head}, ...], len={len(self)})"
+        return f"SpanList({list(self)!r})"
@@ -1,10 +1,21 @@
-from typing import Union, List, Dict, Any
+from typing import IO, Iterable, Iterator, Tuple, Union, List, Dict, Any
 from .base_processor import BaseProcessor
+from .chunking import (DEFAULT_CHUNK_SIZE, DEFAULT_OVERLAP, Hit, HitMerger, Window, build_matches,
+                       iter_chunks, stream_windows, window_hits, window_tokens)
+from .instrumentation import current_timings, stage
 
 class TextProcessor(BaseProcessor):
     
+    _mapped = None
+    _batch = None
+    
     def process(self, input: Union[str, List[str]]) -> Dict[str, Any]:
 
+        processed_text = self._prepare_text(input)
+        
+        return self._result(processed_text)
+    
+    def _prepare_text(self, input: Union[str, List[str]]) -> str:
         if isinstance(input, list):
             processed_text = ' '.join(input)
         else:
@@ -13,6 +24,112 @@ class TextProcessor(BaseProcessor):
         if not processed_text:
             raise ValueError("Input is empty.")
         
-        elements = self._nltk_tokenize_elements(processed_text)
-        matches = self._match_grammar(processed_text)
-        return self._build_result(processed_text, elements, matches)
\ No newline at end of file
+        return processed_text
+    
+    def process_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Resultados de `process` para muchos textos cortos ya preparados
+        (ver `_prepare_text`). Con una gramática regex las reglas se buscan
+        con un `BatchMatcher`, una sola vez sobre todos los textos unidos.
+        """
+        grammar = self.grammar
+        if grammar.type != 'regex':
+            return [self._result(text) for text in texts]
+        # Como `_mapped`, se reutiliza mientras no cambie la gramática.
+        batch = self._batch
+        if batch is None or batch.matcher is not grammar.matcher:
+            from .batch import BatchMatcher
+            batch = self._batch = BatchMatcher(grammar.matcher)
+        timings = current_timings()
+        with stage('match'):
+            findall = batch.findall_spans if self.offsets else batch.findall
+            matches = findall(texts, timeout=grammar.rule_timeout,
+                              durations=timings.rules if timings else None)
+        return [self._result(text, text_matches) for text, text_matches in zip(texts, matches)]
+    
+    def match_file(self, path: str, encoding: str = 'utf-8') -> Dict[str, Any]:
+        """
+        Busca las reglas en un fichero mapeado en memoria, sin decodificarlo
+        ni cargarlo entero. Ver `MappedMatcher`: las reglas deben ser ASCII
+        y `\\w`, `\\b`, etc. solo reconocen caracteres ASCII.
+        """
+        grammar = self.grammar
+        if grammar.type != 'regex':
+            raise ValueError("Memory-mapped matching requires a regex grammar.")
+        # Las reglas compiladas como bytes se reutilizan mientras no cambie
+        # la gramática.
+        mapped = self._mapped
+        if mapped is None or mapped.matcher is not grammar.matcher:
+            from .mapped import MappedMatcher
+            mapped = self._mapped = MappedMatcher(grammar.matcher)
+        with stage('match'):
+            return mapped.match_file(path, encoding, grammar.rule_timeout)
+    
+    def process_stream(self, source: Union[str, IO, Iterable[Union[str, bytes]]],
+                       overlap: int = DEFAULT_OVERLAP, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       encoding: str = 'utf-8') -> Iterator[Dict[str, Any]]:
+        """
+        Procesa un texto demasiado grande para tenerlo entero en memoria.
+
+        `source` es una ruta, un fichero abierto o un iterable de trozos
+        (`str` o `bytes` en `encoding`). Devuelve un generador con un
+        resultado por ventana: 'text' es el tramo confirmado, 'offset' su
+        posición en el documento, y cada regla incluye en 'spans' las
+        posiciones absolutas de sus coincidencias. Las coincidencias que
+        cruzan el límite entre trozos se encuentran una sola vez si no son
+        más largas que `overlap` caracteres. Los tokens son los de
+        `process_input` salvo en un tramo sin espacios de más de
+        `MAX_TOKEN` caracteres, que se parte. El texto no se recorta.
+        """
+        if self.grammar.type != 'regex':
+            raise ValueError("Streaming requires a regex grammar.")
+        if overlap < 0:
+            raise ValueError("overlap must be non-negative.")
+        return self._stream(stream_windows(iter_chunks(source, chunk_size, encoding), overlap))
+    
+    def _stream(self, windows: Iterable[Window]) -> Iterator[Dict[str, Any]]:
+        matcher = self.grammar.matcher
+        rules = HitMerger(len(matcher.infos))
+        tokens = HitMerger(1)
+        for window in windows:
+            hits, spans, timeouts = self._scan_window(window)
+            hits = [rules.merge(index, rule_hits) for index, rule_hits in enumerate(hits)]
+            elements = [value for _, _, value in tokens.merge(0, spans)]
+            matches = build_matches(matcher, hits)
+            result = self._build_result(window.segment(), elements, matches)
+            result['offset'] = window.start
+            if timeouts:
+                result['timeouts'] = timeouts
+            yield result
+    
+    def _scan_window(self, window: Window) -> Tuple[List[List[Hit]], List[Hit], List[str]]:
+        """Coincidencias por regla, tokens y reglas abortadas del tramo confirmado de `window`."""
+        grammar = self.grammar
+        timeouts: List[str] = []
+        with stage('match'):
+            hits = window_hits(grammar.matcher, window, grammar.rule_timeout, timeouts)
+        with stage('tokenize'):
+            tokens = window_tokens(self.tokenizer, window)
+        return hits, tokens, timeouts
+    
+    def _merge_windows(self, text: str,
+                       scanned: Iterable[Tuple[List[List[Hit]], List[Hit], List[str]]]) -> Dict[str, Any]:
+        """
+        Une en orden los resultados de `_scan_window` de todas las ventanas
+        de `text` en un único resultado, con posiciones en 'spans'.
+        """
+        matcher = self.grammar.matcher
+        rules = HitMerger(len(matcher.infos))
+        tokens = HitMerger(1)
+        hits: List[List[Hit]] = [[] for _ in matcher.infos]
+        elements: List[str] = []
+        timeouts: List[str] = []
+        for window_hits_, spans, window_timeouts in scanned:
+            for index, rule_hits in enumerate(window_hits_):
+                hits[index].extend(rules.merge(index, rule_hits))
+            elements.extend(value for _, _, value in tokens.merge(0, spans))
+            timeouts.extend(key for key in window_timeouts if key not in timeouts)
+        result = self._build_result(text, elements, build_matches(matcher, hits))
+        if timeouts:
+            result['timeouts'] = timeouts
+        return result
@@ -0,0 +1,271 @@
+import re
+from abc import ABC, abstractmethod
+from types import ModuleType
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+from .nltk_resources import ensure_nltk_resources, prepare_nltk
+from .spans import SpanList
+
+# Caracteres que `nltk.word_tokenize` separa siempre como tokens propios.
+_SPLIT = r"""?!;@#$%&*()\[\]{}<>«»“”‘’„"""
+
+_TOKEN = re.compile(rf"""
+    \.{{2,}}                        # puntos suspensivos
+  | --|[\u2012-\u2015]              # guiones largos
+  | ``|''|"|`+                      # comillas ASCII
+  | [{_SPLIT}]
+  | [:,](?!\d)                      # ':' y ',' salvo dentro de números
+  | (?P<word>(?:[^\s{_SPLIT}"`:,.'\-]  # palabras, con puntos, guiones, apóstrofos
+     |[:,](?=\d)                   # y separadores numéricos internos
+     |\.(?!\.)
+     |-(?!-)
+     |'(?!')
+    )+)
+""", re.VERBOSE)
+
+# Clíticos que NLTK separa al final de una palabra ("don't" -> "do", "n't"),
+# en dos pasadas y en este orden.
+_CLITIC_SHORT = re.compile(r"(.*[^' ])('[sSmMdD]|')")
+_CLITIC_LONG = re.compile(r"(.*[^' ])('ll|'LL|'re|'RE|'ve|'VE|n't|N'T)")
+# Comilla simple de apertura: no va tras una letra y no inicia un clítico.
+_OPENING_QUOTE = re.compile(r"(?i)(?<!\w)'(?!(?:re|ve|ll|m|t|s|d|n)\b)(?=\w)")
+
+# Contracciones que NLTK divide en dos palabras.
+_CONTRACTIONS: Dict[str, int] = {
+    'cannot': 3, "d'ye": 1, 'gimme': 3, 'gonna': 3, 'gotta': 3,
+    'lemme': 3, "more'n": 4, 'wanna': 3,
+}
+_CONTRACTION_LENGTHS = {len(word) for word in _CONTRACTIONS}
+
+# Abreviaturas tras las que un punto no cierra la frase.
+ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'jr', 'sr', 'sra', 'srta', 'dra', 'st', 'vs', 'prof',
+})
+
+# Caracteres de cierre que pueden seguir al punto final de una frase.
+_CLOSERS = set(""")]}>"'»”’""")
+# Caracteres tras los que unas comillas dobles son de apertura.
+_OPENERS = ' ([{<'
+
+
+class Tokenizer(ABC):
+    """Interfaz de los tokenizadores de `BaseProcessor`."""
+
+    name = 'base'
+    # Identidad estable del tokenizador para `Processor(result_cache=...)`:
+    # dos tokenizadores con la misma clave deben dar los mismos tokens. Sin
+    # ella (None) no se usa la caché de resultados.
+    cache_key: Optional[str] = None
+
+    @abstractmethod
+    def tokenize(self, text: str) -> List[str]:
+        """Lista de tokens de `text`."""
+
+    def token_spans(self, text: str) -> SpanList:
+        """
+        Tokens como posiciones en `text`. Por defecto se alinean los tokens
+        con el texto; los que no aparecen literalmente (p. ej. comillas
+        normalizadas) ocupan el carácter siguiente y conservan su valor.
+        """
+        result = SpanList(text)
+        pos = 0
+        n = len(text)
+        for token in self.tokenize(text):
+            start = text.find(token, pos)
+            if start >= 0:
+                pos = start + len(token)
+                result.append(start, pos)
+                continue
+            while pos < n and text[pos].isspace():
+                pos += 1
+            start = pos
+            pos = min(pos + 1, n)
+            result.append(start, pos, token)
+        return result
+
+
+class RegexTokenizer(Tokenizer):
+    """
+    Tokenizador de una sola pasada con una expresión precompilada.
+
+    Reproduce la salida de `nltk.word_tokenize` en los casos habituales
+    (puntuación, números con separadores, comillas, clíticos ingleses y
+    punto final de frase) sin cargar Punkt. El fin de frase se detecta con
+    una heurística: un punto seguido del final del texto, o de una
+    mayúscula, un dígito o un signo de apertura, salvo tras una inicial o
+    una abreviatura de `ABBREVIATIONS`.
+    """
+
+    name = 'regex'
+    cache_key = 'regex'
+
+    def tokenize(self, text: str) -> List[str]:
+        return [text[start:end] if value is None else value
+                for start, end, value in self._normalized(text)]
+
+    def token_spans(self, text: str) -> SpanList:
+        result = SpanList(text)
+        append = result.append
+        for start, end, value in self._normalized(text):
+            append(start, end, value)
+        return result
+
+    def _normalized(self, text: str) -> Iterator[Tuple[int, int, Optional[str]]]:
+        """(inicio, fin, valor) de cada token; valor es None si es el texto original."""
+        opened = -1
+        for start, end in self.span_tokenize(text):
+            value = None
+            first = text[start]
+            # Como NLTK, las comillas dobles se convierten en `` o ''.
+            if first == '"' or first == "'" and end - start == 2 and text[start + 1] == "'":
+                if (start == 0 and first == '"' or start == opened
+                        or start > 0 and text[start - 1] in _OPENERS):
+                    value = '``'
+                    opened = end
+                elif first == '"':
+                    value = "''"
+            yield start, end, value
+
+    def span_tokenize(self, text: str) -> List[Tuple[int, int]]:
+        """Posiciones (inicio, fin) de cada token en `text`."""
+        spans: List[Tuple[int, int]] = []
+        append = spans.append
+        n = len(text)
+        for m in _TOKEN.finditer(text):
+            start, end = m.span()
+            if m.lastgroup != 'word':
+                append((start, end))
+                continue
+            # Punto final de frase, quizá seguido de comillas simples.
+            stop = end
+            while text[stop - 1] == "'" and stop - 1 > start:
+                stop -= 1
+            if stop - start > 1 and text[stop - 1] == '.' and _ends_sentence(text, start, stop, n):
+                _split_word(text, start, stop - 1, append)
+                append((stop - 1, stop))
+                if stop < end:
+                    append((stop, end))
+            else:
+                _split_word(text, start, end, append)
+        return spans
+
+
+def _split_word(text: str, start: int, end: int, append: Callable):
+    """Añade una palabra separando comillas simples de apertura, clíticos y contracciones."""
+    if "'" in text[start:end]:
+        for m in _OPENING_QUOTE.finditer(text, start, end):
+            quote = m.start()
+            if quote > start:
+                _split_clitics(text, start, quote, append)
+            append((quote, quote + 1))
+            start = quote + 1
+        if start < end:
+            _split_clitics(text, start, end, append)
+        return
+    _split_contraction(text, start, end, append)
+
+
+def _split_clitics(text: str, start: int, end: int, append: Callable):
+    suffixes = []
+    if end - start > 1 and text[end - 1] == "'" and text[end - 2] != "'":
+        suffixes.append((end - 1, end))
+        end -= 1
+    for clitic in (_CLITIC_SHORT, _CLITIC_LONG):
+        m = clitic.fullmatch(text, start, end)
+        if m:
+            suffixes.append((m.end(1), end))
+            end = m.end(1)
+    _split_contraction(text, start, end, append)
+    for span in reversed(suffixes):
+        append(span)
+
+
+def _split_contraction(text: str, start: int, end: int, append: Callable):
+    if end - start not in _CONTRACTION_LENGTHS:
+        append((start, end))
+        return
+    word = text[start:end].lower()
+    length = _CONTRACTIONS.get(word)
+    # NLTK solo separa "wanna" si le sigue un espacio.
+    if length is not None and (word != 'wanna' or (end < len(text) and text[end].isspace())):
+        append((start, start + length))
+        append((start + length, end))
+    else:
+        append((start, end))
+
+
+def _ends_sentence(text: str, start: int, end: int, n: int) -> bool:
+    """True si el punto en `end - 1` cierra una frase."""
+    word = text[start:end - 1]
+    pos = end
+    while pos < n and text[pos] in _CLOSERS:
+        pos += 1
+    while pos < n and text[pos].isspace():
+        pos += 1
+    if pos == n:
+        return True
+    if pos == end:
+        return False
+    if len(word) == 1 and word.isalpha() or '.' in word or word.lower() in ABBREVIATIONS:
+        return False
+    following = text[pos]
+    return following.isupper() or following.isdigit() or following in '¿¡"“«(['
+
+
+class NLTKTokenizer(Tokenizer):
+    """`nltk.word_tokenize` (Punkt + Treebank): más fiel y más lento."""
+
+    name = 'nltk'
+
+    def __init__(self, language: str = 'english'):
+        self.language = language
+        self.cache_key = f'nltk:{language}'
+
+    def tokenize(self, text: str) -> List[str]:
+        import nltk
+        prepare_nltk()
+        try:
+            return nltk.word_tokenize(text, language=self.language)
+        except LookupError:
+            # Faltan datos: se comprueban (o se descargan si está
+            # permitido) una sola vez y se reintenta.
+            ensure_nltk_resources()
+            return nltk.word_tokenize(text, language=self.language)
+
+
+class FunctionTokenizer(Tokenizer):
+    """Adapta una función texto -> lista de tokens."""
+
+    name = 'function'
+
+    def __init__(self, function: Callable[[str], List[str]]):
+        self.function = function
+        # Solo una función de módulo se identifica por su nombre; las
+        # lambdas, los cierres y los métodos de una instancia con el mismo
+        # nombre pueden ser distintos.
+        module = getattr(function, '__module__', None)
+        qualname = getattr(function, '__qualname__', '')
+        bound = getattr(function, '__self__', None)
+        if module and qualname and '<' not in qualname and \
+                (bound is None or isinstance(bound, ModuleType)):
+            self.cache_key = f'function:{module}.{qualname}'
+
+    def tokenize(self, text: str) -> List[str]:
+        return list(self.function(text))
+
+
+TOKENIZERS = {'regex': RegexTokenizer, 'nltk': NLTKTokenizer}
+
+
+def get_tokenizer(tokenizer: Union[str, Tokenizer, Callable[[str], List[str]], None]) -> Tokenizer:
+    if tokenizer is None:
+        return RegexTokenizer()
+    if isinstance(tokenizer, Tokenizer):
+        return tokenizer
+    if isinstance(tokenizer, str):
+        try:
+            return TOKENIZERS[tokenizer]()
+        except KeyError:
+            raise ValueError(f"Invalid tokenizer: {tokenizer}. Must be one of {list(TOKENIZERS)}.")
+    if callable(tokenizer):
+        return FunctionTokenizer(tokenizer)
+    raise ValueError(f"Invalid tokenizer: {tokenizer!r}")
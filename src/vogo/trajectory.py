@@ -0,0 +1,148 @@
+import math
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # extra 'trajectory'
+    np = None
+
+# Nombres de las direcciones en sentido antihorario desde +x.
+DIRECTIONS_4 = ('derecha', 'arriba', 'izquierda', 'abajo')
+DIRECTIONS_8 = ('derecha', 'arriba_derecha', 'arriba', 'arriba_izquierda',
+                'izquierda', 'abajo_izquierda', 'abajo', 'abajo_derecha')
+
+# Sin `step`, la trayectoria se remuestrea en pasos de 1/DEFAULT_STEPS de la
+# diagonal del rectángulo que la contiene.
+DEFAULT_STEPS = 20
+
+
+def _import_numpy():
+    if np is None:
+        raise ValueError("Trajectory processing requires numpy: pip install 'vogo[trajectory]'")
+    return np
+
+
+class TrajectoryQuantizer:
+    """
+    Convierte una trayectoria de puntero o de mano en gestos de dirección
+    (`['arriba', 'derecha', ...]`) para una gramática de gestos.
+
+    La trayectoria es un array (n, 2) de puntos (x, y) o (n, 3) de puntos
+    (x, y, t), con t en segundos. Todo el proceso son operaciones de NumPy
+    sobre el array completo:
+
+    1. Media móvil de `smoothing` muestras para quitar el temblor.
+    2. Remuestreo cada `step` unidades de recorrido, de modo que el
+       resultado no depende de la velocidad ni de la frecuencia de muestreo.
+    3. Cada paso se asigna al sector angular más próximo de `directions`.
+    4. Los pasos seguidos con la misma dirección forman un gesto; los tramos
+       de menos de `min_steps` pasos se descartan (esquinas, ruido) y, con
+       tiempos, una parada de más de `pause` segundos separa dos gestos
+       aunque tengan la misma dirección (dos deslizamientos hacia arriba).
+
+    - `directions`: 4, 8 o una secuencia de nombres en sentido antihorario
+      desde la derecha (+x).
+    - `step`: longitud del paso en las unidades de los puntos. Por defecto,
+      relativa al tamaño de la trayectoria; con sensores reales conviene
+      fijarla para que el temblor en reposo no produzca gestos.
+    - `y_down`: coordenadas de pantalla, con y creciendo hacia abajo.
+    """
+
+    def __init__(self, directions: Union[int, Sequence[str]] = 4, smoothing: int = 3,
+                 step: Optional[float] = None, min_steps: int = 2,
+                 pause: Optional[float] = 0.25, y_down: bool = True):
+        _import_numpy()
+        if directions == 4:
+            directions = DIRECTIONS_4
+        elif directions == 8:
+            directions = DIRECTIONS_8
+        elif isinstance(directions, (int, str)) or len(directions) < 2:
+            raise ValueError("directions must be 4, 8 or a sequence of at least two names.")
+        if smoothing < 1:
+            raise ValueError("smoothing must be positive.")
+        if step is not None and step <= 0:
+            raise ValueError("step must be positive.")
+        if min_steps < 1:
+            raise ValueError("min_steps must be positive.")
+        if pause is not None and pause <= 0:
+            raise ValueError("pause must be positive.")
+        self.directions = tuple(directions)
+        self.smoothing = smoothing
+        self.step = step
+        self.min_steps = min_steps
+        self.pause = pause
+        self.y_down = y_down
+
+    def quantize(self, points: Any) -> Tuple[List[str], List[Tuple[int, int]]]:
+        """
+        Gestos de la trayectoria y, por cada uno, los índices (inicio, fin)
+        de sus puntos en `points`. Sin movimiento, las dos listas están vacías.
+        """
+        points = np.asarray(points, dtype=float)
+        if points.ndim != 2 or points.shape[1] not in (2, 3):
+            raise ValueError("Trajectory must be an array of (x, y) or (x, y, t) points.")
+        if not np.isfinite(points).all():
+            raise ValueError("Trajectory contains NaN or infinite values.")
+        if len(points) < 2:
+            return [], []
+        xy = self._smooth(points[:, :2])
+
+        # Recorrido acumulado hasta cada punto y marcas cada `step`.
+        lengths = np.hypot(*np.diff(xy, axis=0).T)
+        arc = np.concatenate(([0.0], np.cumsum(lengths)))
+        step = self.step
+        if step is None:
+            step = np.hypot(*np.ptp(xy, axis=0)) / DEFAULT_STEPS
+        if arc[-1] == 0 or arc[-1] < step * self.min_steps:
+            return [], []
+        # En una parada `arc` se repite: `interp` toma el último de los
+        # puntos iguales, de modo que el paso siguiente empieza al reanudar.
+        marks = np.arange(0.0, arc[-1], step)
+        x = np.interp(marks, arc, xy[:, 0])
+        y = np.interp(marks, arc, xy[:, 1])
+        # Primer punto en o después de cada marca.
+        positions = np.minimum(np.searchsorted(arc, marks), len(arc) - 1)
+
+        # Dirección de cada paso entre marcas consecutivas.
+        dy = np.diff(y)
+        angles = np.arctan2(-dy if self.y_down else dy, np.diff(x))
+        count = len(self.directions)
+        sectors = np.round(angles / (2 * math.pi / count)).astype(int) % count
+        if len(sectors) == 0:
+            return [], []
+
+        # Pasos en que la trayectoria se detuvo más de `pause` segundos.
+        if self.pause is not None and points.shape[1] == 3:
+            times = np.interp(marks, arc, points[:, 2])
+            paused = np.diff(times) > self.pause
+        else:
+            paused = np.zeros(len(sectors), dtype=bool)
+
+        # Tramos de pasos con la misma dirección y sin paradas.
+        new = np.concatenate(([True], (sectors[1:] != sectors[:-1]) | paused[1:]))
+        starts = np.flatnonzero(new)
+        ends = np.append(starts[1:], len(sectors))
+        keep = ends - starts >= self.min_steps
+        starts, ends = starts[keep], ends[keep]
+        if len(starts) == 0:
+            return [], []
+        # Al quitar los tramos cortos se unen los vecinos con la misma
+        # dirección si no hubo una parada entre ellos.
+        pauses = np.cumsum(paused)
+        joined = ((sectors[starts[1:]] == sectors[starts[:-1]]) &
+                  (pauses[starts[1:]] == pauses[ends[:-1] - 1]))
+        first = np.concatenate(([True], ~joined))
+        last = np.concatenate((~joined, [True]))
+        gestures = [self.directions[sector] for sector in sectors[starts[first]].tolist()]
+        segments = list(zip(positions[starts[first]].tolist(),
+                            (positions[ends[last]] + 1).tolist()))
+        return gestures, segments
+
+    def _smooth(self, xy: 'np.ndarray') -> 'np.ndarray':
+        """Media móvil centrada; en los extremos se repite el primer y el último punto."""
+        window = min(self.smoothing, len(xy))
+        if window == 1:
+            return xy
+        padded = np.pad(xy, ((window // 2, window - 1 - window // 2), (0, 0)), mode='edge')
+        sums = np.cumsum(np.vstack((np.zeros((1, 2)), padded)), axis=0)
+        return (sums[window:] - sums[:-window]) / window
@@ -0,0 +1,46 @@
+from typing import Any, Callable, Dict, List, Tuple, Union
+from .gesture_processor import GestureProcessor
+from .grammar import Grammar
+from .instrumentation import stage
+from .tokenizer import Tokenizer
+from .trajectory import TrajectoryQuantizer
+
+class TrajectoryProcessor(GestureProcessor):
+    """
+    Procesa trayectorias de puntero o de mano: un array de puntos (x, y) o
+    (x, y, t) se convierte en gestos de dirección con `TrajectoryQuantizer`
+    y estos se procesan como en `GestureProcessor`. El resultado incluye
+    en 'segments' los índices (inicio, fin) de los puntos de cada gesto.
+
+    Se usan los parámetros por defecto de `TrajectoryQuantizer`; con otros,
+    se llama a `quantize` y se procesan los gestos con `type='gestures'`.
+    """
+
+    def __init__(self, grammar: Grammar,
+                 tokenizer: Union[str, Tokenizer, Callable[[str], List[str]], None] = None,
+                 offsets: bool = False, lazy: bool = False):
+        super().__init__(grammar, tokenizer, offsets, lazy)
+        self.quantizer = TrajectoryQuantizer()
+
+    def process(self, input: Any) -> Dict[str, Any]:
+        prepared, segments = self._prepare_text(input)
+        if self.grammar.type == 'gestures':
+            result = self._gesture_result(prepared)
+        else:
+            result = self._result(prepared)
+        result['segments'] = segments
+        return result
+
+    def process_many(self, texts: List[Any]) -> List[Dict[str, Any]]:
+        # `texts` son los pares (gestos preparados, segmentos) de `_prepare_text`.
+        results = super().process_many([prepared for prepared, _ in texts])
+        for result, (_, segments) in zip(results, texts):
+            result['segments'] = segments
+        return results
+
+    def _prepare_text(self, input: Any) -> Tuple[Union[str, List[str]], List[Tuple[int, int]]]:
+        with stage('quantize'):
+            gestures, segments = self.quantizer.quantize(input)
+        if not gestures:
+            raise ValueError("No gestures could be extracted from the trajectory.")
+        return super()._prepare_text(gestures), segments
@@ -1,5 +1,9 @@
 import re
-from typing import List
+from array import array
+from typing import TYPE_CHECKING, List, Optional, Union
+
+if TYPE_CHECKING:
+    from .vocabulary import GestureVocabulary
 
 def contar_ocurrencias(texto: str, patron: str) -> int:
 
@@ -9,6 +13,14 @@ def contar_ocurrencias(texto: str, patron: str) -> int:
         raise ValueError(f"Patrón regex inválido: {patron}")
 
 
-def buscar_elemento(elementos: List[str], elemento: str) -> bool:
-
-    return elemento.lower() in [e.lower() for e in elementos]
+def buscar_elemento(elementos: Union[List[str], array], elemento: str,
+                    vocabulario: Optional['GestureVocabulary'] = None) -> bool:
+    # Con `vocabulario`, `elementos` son los ids de `vocabulario.encode` y se
+    # buscan en una sola pasada los enteros de las grafías de `elemento`.
+    if vocabulario is not None:
+        if not isinstance(elemento, str):
+            return False
+        objetivos = vocabulario.spellings.get(elemento.lower())
+        return objetivos is not None and any(id in objetivos for id in elementos)
+    objetivo = elemento.lower()
+    return any(e.lower() == objetivo for e in elementos)
@@ -0,0 +1,109 @@
+import sys
+import threading
+from array import array
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+# Los ids se guardan en `array('H')` (dos bytes por gesto) y se pueden
+# leer como texto UTF-16, así que no llegan a los sustitutos (0xD800).
+MAX_GESTURES = 0xD800
+
+# Id de `lookup` para los nombres que no están en el vocabulario (no es un
+# id válido, ver `MAX_GESTURES`).
+UNKNOWN = 0xFFFF
+
+_UTF16 = 'utf-16-le' if sys.byteorder == 'little' else 'utf-16-be'
+
+
+class GestureVocabulary:
+    """
+    Vocabulario de gestos: cada nombre distinto recibe un id entero pequeño
+    la primera vez que aparece, de modo que una secuencia de gestos es un
+    `array('H')` y comparar gestos es comparar enteros.
+
+    Cada grafía tiene su propio id (`decode` devuelve los nombres tal como
+    llegaron) y `folded[id]` es el id de su forma en minúsculas: dos gestos
+    son iguales sin distinguir mayúsculas si tienen el mismo id en `folded`,
+    y `spellings[nombre en minúsculas]` son los ids de todas sus grafías.
+
+    >>> vocabulario = GestureVocabulary(['arriba', 'abajo'])
+    >>> ids = vocabulario.encode(['Arriba', 'abajo', 'arriba'])
+    >>> list(vocabulario.fold(ids))
+    [0, 1, 0]
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.folded = array('H')
+        self.spellings: Dict[str, FrozenSet[int]] = {}
+        self._lock = threading.Lock()
+        for name in names:
+            self.intern(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name) -> bool:
+        return self.get(name) is not None
+
+    def intern(self, name: str) -> int:
+        """Id de `name`, que se añade al vocabulario si es nuevo."""
+        id = self.ids.get(name)
+        if id is not None:
+            return id
+        if not isinstance(name, str):
+            raise ValueError(f"Invalid gesture: {name!r}. Gestures must be strings.")
+        lower = name.lower()
+        folded = self.intern(lower) if lower != name else None
+        with self._lock:
+            id = self.ids.get(name)
+            if id is None:
+                id = len(self.names)
+                if id >= MAX_GESTURES:
+                    raise ValueError("Too many distinct gestures in the vocabulary.")
+                self.names.append(name)
+                self.folded.append(id if folded is None else folded)
+                self.spellings[lower] = self.spellings.get(lower, frozenset()) | {id}
+                self.ids[name] = id
+        return id
+
+    def get(self, name: str) -> Optional[int]:
+        """Id (en minúsculas) de `name` sin añadirlo; None si no está."""
+        if not isinstance(name, str):
+            return None
+        id = self.ids.get(name)
+        if id is None:
+            id = self.ids.get(name.lower())
+            if id is None:
+                return None
+        return self.folded[id]
+
+    def encode(self, names: Sequence[str]) -> array:
+        """Ids de `names`, añadiendo al vocabulario los que falten."""
+        try:
+            return array('H', map(self.ids.__getitem__, names))
+        except (KeyError, TypeError):
+            return array('H', map(self.intern, names))
+
+    def lookup(self, names: Sequence[str]) -> array:
+        """
+        Ids de `names` sin cambiar el vocabulario: una grafía que no está
+        toma el id de su forma en minúsculas y, si tampoco está, `UNKNOWN`.
+        """
+        try:
+            return array('H', map(self.ids.__getitem__, names))
+        except (KeyError, TypeError):
+            return array('H', [UNKNOWN if id is None else id for id in map(self.get, names)])
+
+    def fold(self, ids: Iterable[int]) -> array:
+        """Los ids de `encode` en minúsculas."""
+        return array('H', map(self.folded.__getitem__, ids))
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        """Nombres de los ids de `encode`."""
+        return list(map(self.names.__getitem__, ids))
+
+    @staticmethod
+    def text(ids: array) -> str:
+        """Cadena con el carácter `chr(id)` de cada id (para `str.translate`)."""
+        return ids.tobytes().decode(_UTF16)
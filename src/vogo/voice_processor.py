@@ -2,6 +2,7 @@ from typing import Union, List, Dict, Any
 import io
 import speech_recognition as sr
 from .base_processor import BaseProcessor
+from .instrumentation import stage
 
 class VoiceProcessor(BaseProcessor):
     
@@ -19,9 +20,14 @@ class VoiceProcessor(BaseProcessor):
         if not processed_text:
             raise ValueError("No text could be processed from input")
         
-        elements = self._nltk_tokenize_elements(processed_text)
-        matches = self._match_grammar(processed_text)
-        return self._build_result(processed_text, elements, matches)
+        return self._result(processed_text)
+    
+    async def aprocess(self, input: Union[str, bytes]) -> Dict[str, Any]:
+        # La transcripción espera al servicio de reconocimiento: se hace en
+        # el executor y el resto es igual que con texto.
+        if isinstance(input, bytes):
+            input = await self._offload(self._transcribe_voice, input)
+        return await self._offload(self.process, input)
     
     def _transcribe_voice(self, audio_bytes: bytes) -> str:
         """Transcribe audio bytes to text"""
@@ -29,10 +35,12 @@ class VoiceProcessor(BaseProcessor):
             recognizer = sr.Recognizer()
             
             # Convert bytes to AudioFile
-            with sr.AudioFile(io.BytesIO(audio_bytes)) as source:
-                audio = recognizer.record(source)
+            with stage('audio_decode'):
+                with sr.AudioFile(io.BytesIO(audio_bytes)) as source:
+                    audio = recognizer.record(source)
             
-            return recognizer.recognize_google(audio, language='es-ES')
+            with stage('asr'):
+                return recognizer.recognize_google(audio, language='es-ES')
             
         except sr.UnknownValueError:
             raise ValueError("Could not understand audio")
@@ -57,6 +57,1143 @@ class TestGrammar(unittest.TestCase):
             Grammar(rules, type='invalid_type')
 
 
+class TestRegexMatcher(unittest.TestCase):
+    
+    def setUp(self):
+        self.rules = {
+            'accion': r'\b(encender|apagar|abrir|cerrar)\b',
+            'dispositivo': r'\b(luz|puerta|ventana|televisor)\b',
+            'fecha': r'\d{2}/\d{2}/\d{4}',
+            'palabra': r'\b\w+\b',
+            'par': r'(\d)-(\d)',
+            'pregunta': r'\?'
+        }
+        self.grammar = Grammar(self.rules, type='regex')
+    
+    def test_rules_share_single_pass(self):
+        """Probar que reglas disjuntas se combinan en un mismo recorrido"""
+        lanes = [[self.grammar.matcher.infos[i].key for i in lane.members]
+                 for lane in self.grammar.matcher.lanes]
+        self.assertIn(['fecha', 'pregunta'], lanes)
+        self.assertIn(['palabra'], lanes)
+    
+    def test_keyword_rules_use_index(self):
+        """Probar que las listas de palabras se resuelven con el índice"""
+        matcher = self.grammar.matcher
+        self.assertEqual(matcher.keywords.rules, [0, 1])
+        self.assertEqual(matcher.keywords.words['luz'], (1,))
+        
+        result = matcher.findall("ENCENDER la Luz, luzes no")
+        self.assertEqual(result[0], {'type': 'accion', 'matches': ['ENCENDER']})
+        self.assertEqual(result[1], {'type': 'dispositivo', 'matches': ['Luz']})
+    
+    def test_same_results_as_findall(self):
+        """Probar que el motor combinado equivale a re.findall por regla"""
+        import re
+        text = "¿Encender luz el 01/02/2024? abrir puerta 3-4 y cerrar 5-6"
+        expected = []
+        for key, pattern in self.rules.items():
+            found = re.findall(pattern, text, re.IGNORECASE)
+            if found:
+                expected.append({'type': key, 'matches': found})
+        self.assertEqual(self.grammar.matcher.findall(text), expected)
+
+
+class TestRegexPrefilter(unittest.TestCase):
+    
+    def setUp(self):
+        self.grammar = Grammar({
+            'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+            'url': r'https?://[^\s]+'
+        })
+    
+    def test_required_literals(self):
+        """Probar la extracción de literales obligatorios"""
+        infos = self.grammar.matcher.infos
+        self.assertEqual(infos[0].required, ('@', '.'))
+        self.assertEqual(infos[1].required, ('http', '://'))
+    
+    def test_rules_skipped_without_literals(self):
+        """Probar que se descartan reglas cuyos literales no aparecen"""
+        matcher = self.grammar.matcher
+        lane = matcher.lanes[1]
+        self.assertIsNone(lane.select(matcher.infos, matcher.flags, "sin enlaces"))
+        self.assertIs(lane.select(matcher.infos, matcher.flags, "ver http://x"), lane)
+        
+        result = matcher.findall("Visita HTTPS://ejemplo.com o escribe a a@b.es")
+        self.assertEqual(result, [
+            {'type': 'email', 'matches': ['a@b.es']},
+            {'type': 'url', 'matches': ['HTTPS://ejemplo.com']}
+        ])
+
+
+class TestRegexBackends(unittest.TestCase):
+    
+    def setUp(self):
+        self.rules = {
+            'saludo': r'\b(hola|adios)\b',
+            'numero': r'\d+',
+            'repetida': r'(a+)+$'
+        }
+    
+    def test_risky_rules(self):
+        """Probar la detección de patrones con retroceso catastrófico"""
+        grammar = Grammar(self.rules)
+        self.assertEqual(grammar.risky_rules, ['repetida'])
+        
+        with self.assertRaises(ValueError):
+            Grammar(self.rules, on_risky='error')
+        with self.assertWarns(RuntimeWarning):
+            Grammar(self.rules, on_risky='warn')
+    
+    def test_rule_timeout(self):
+        """Probar que una regla que agota su tiempo se informa y no bloquea"""
+        grammar = Grammar(self.rules, rule_timeout=0.2)
+        processor = TextProcessor(grammar)
+        
+        matches = processor._match_grammar("hola 42 " + "a" * 40 + "!")
+        self.assertEqual(matches.timeouts, ['repetida'])
+        self.assertEqual(matches, [
+            {'type': 'saludo', 'matches': ['hola']},
+            {'type': 'numero', 'matches': ['42']}
+        ])
+        
+        matches = processor._match_grammar("hola aaa")
+        self.assertEqual(matches.timeouts, [])
+        self.assertEqual(matches[0], {'type': 'saludo', 'matches': ['hola']})
+    
+    def test_rule_timeout_keeps_application_alarm(self):
+        """Probar que rule_timeout respeta el manejador y el temporizador de la aplicación"""
+        import signal
+        from vogo.regex_backends import alarm_budget
+        if not hasattr(signal, 'setitimer'):
+            self.skipTest("SIGALRM no está disponible")
+        
+        handler = lambda signum, frame: None
+        previous = signal.signal(signal.SIGALRM, handler)
+        try:
+            processor = TextProcessor(Grammar(self.rules, rule_timeout=0.2))
+            matches = processor._match_grammar("hola 42 " + "a" * 40 + "!")
+            self.assertEqual(matches.timeouts, ['repetida'])
+            self.assertIs(signal.getsignal(signal.SIGALRM), handler)
+            with self.assertRaises(ValueError):
+                with alarm_budget(1):
+                    pass
+            
+            signal.signal(signal.SIGALRM, signal.SIG_IGN)
+            signal.setitimer(signal.ITIMER_REAL, 30)
+            with alarm_budget(1):
+                pass
+            self.assertGreater(signal.getitimer(signal.ITIMER_REAL)[0], 29)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    
+    def test_re2_backend(self):
+        """Probar el motor de tiempo lineal"""
+        try:
+            import re2
+        except ImportError:
+            self.skipTest("google-re2 no está instalado")
+        
+        grammar = Grammar(self.rules, backend='re2')
+        matches = TextProcessor(grammar)._match_grammar("Hola 42 " + "a" * 40 + "!")
+        self.assertEqual(matches, [
+            {'type': 'saludo', 'matches': ['Hola']},
+            {'type': 'numero', 'matches': ['42']}
+        ])
+        
+        with self.assertRaises(ValueError):
+            Grammar({'eco': r'(a)\1'}, backend='re2')
+        with self.assertRaises(ValueError):
+            Grammar(self.rules, backend='pcre')
+
+
+class TestGrammarCache(unittest.TestCase):
+    
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = vogo.GrammarCache(self.tmp.name)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_regex_grammar_reused_from_disk(self):
+        """Probar que una gramática regex se carga desde la caché"""
+        rules = {'saludo': r'\b(hola|hi)\b', 'numero': r'\d+'}
+        first = Grammar(rules, cache=self.cache)
+        self.assertIsNotNone(self.cache.load(first.fingerprint))
+        
+        second = Grammar(rules, cache=self.cache)
+        self.assertEqual(second.fingerprint, first.fingerprint)
+        self.assertEqual(second.matcher.findall("hola 42"),
+                         [{'type': 'saludo', 'matches': ['hola']},
+                          {'type': 'numero', 'matches': ['42']}])
+    
+    def test_cfg_grammar_reused_from_disk(self):
+        """Probar que una gramática CFG se reconstruye desde la caché"""
+        rules = {'expr': 'NUMBER "+" NUMBER', 'NUMBER': '/\\d+/'}
+        Grammar(rules, type='cfg', cache=self.cache)
+        grammar = Grammar(rules, type='cfg', cache=self.cache)
+        self.assertEqual(grammar.parser.parse("1+2").data, 'expr')
+    
+    def test_size_limit(self):
+        """Probar que la caché respeta el tamaño máximo"""
+        store = vogo.cache.DiskCache(self.tmp.name, max_bytes=100)
+        store.set('a', b'x' * 60)
+        store.set('b', b'y' * 60)
+        self.assertLessEqual(store.size(), 100)
+        self.assertEqual(store.get('b'), b'y' * 60)
+
+
+class TestResultCache(unittest.TestCase):
+    
+    def setUp(self):
+        self.grammar = Grammar({'numero': r'\d+'})
+    
+    def test_memory_hits_and_copies(self):
+        """Probar aciertos en memoria, copias independientes y límite de entradas"""
+        cache = vogo.ResultCache(max_entries=2)
+        processor = Processor(self.grammar, result_cache=cache)
+        
+        first = processor.process_input("pedido 12")
+        first['matches'].clear()
+        self.assertEqual(processor.process_input("pedido 12")['matches'][0]['matches'], ['12'])
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        
+        for text in ("a 1", "b 2", "pedido 12"):
+            processor.process_input(text)
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertEqual(cache.stats()['misses'], 4)
+    
+    def test_key_scope(self):
+        """Probar que la clave depende de gramática, modalidad, opciones y entrada"""
+        key = vogo.ResultCache.key
+        self.assertEqual(key('g', 'text', 'a'), key('g', 'text', 'a'))
+        self.assertNotEqual(key('g', 'text', 'a'), key('g', 'voice', 'a'))
+        self.assertNotEqual(key('g', 'text', 'a'), key('h', 'text', 'a'))
+        self.assertNotEqual(key('g', 'text', 'a'), key('g', 'text', b'a'))
+        self.assertNotEqual(key('g', 'gestures', ['a', 'b']), key('g', 'gestures', ['ab']))
+        
+        cache = vogo.ResultCache()
+        Processor(self.grammar, result_cache=cache).process_input("a 1")
+        result = Processor(self.grammar, result_cache=cache, offsets=True).process_input("a 1")
+        self.assertEqual(result['tokens'].span(1), (2, 3))
+        self.assertEqual(cache.stats()['hits'], 0)
+    
+    def test_tokenizer_identity(self):
+        """Probar que las funciones sin nombre estable no comparten la caché"""
+        cache = vogo.ResultCache()
+        with self.assertWarns(RuntimeWarning):
+            processor = Processor(self.grammar, result_cache=cache, tokenizer=lambda s: s.split())
+        self.assertIsNone(processor.result_cache)
+        
+        Processor(self.grammar, result_cache=cache, tokenizer=lambda s: s.split(),
+                  cache_key='split').process_input("x 12")
+        result = Processor(self.grammar, result_cache=cache, tokenizer=lambda s: list(s),
+                           cache_key='chars').process_input("x 12")
+        self.assertEqual(result['tokens'], ['x', ' ', '1', '2'])
+        self.assertEqual(cache.stats()['hits'], 0)
+    
+    def test_lazy_results(self):
+        """Probar que un resultado perezoso se guarda sin tokenizar y no se mezcla con los normales"""
+        cache = vogo.ResultCache()
+        lazy = Processor(self.grammar, result_cache=cache, lazy=True)
+        result = lazy.process_input("pedido 12")
+        self.assertIsNone(result._tokens)
+        
+        cached = lazy.process_input("pedido 12")
+        self.assertIsInstance(cached, vogo.Result)
+        self.assertIsNone(cached._tokens)
+        self.assertEqual(cached['tokens'], ['pedido', '12'])
+        self.assertEqual(cache.stats()['hits'], 1)
+        
+        result = Processor(self.grammar, result_cache=cache).process_input("pedido 12")
+        self.assertIs(type(result), dict)
+        self.assertEqual(cache.stats()['hits'], 1)
+    
+    @patch('vogo.image_processor.pytesseract.image_to_string')
+    @patch('vogo.image_processor.Image.open')
+    def test_disk_tier_skips_ocr(self, mock_image_open, mock_ocr):
+        """Probar que el nivel en disco sobrevive a un proceso nuevo y evita el OCR"""
+        import tempfile
+        mock_ocr.return_value = "Factura 2024"
+        with tempfile.TemporaryDirectory() as directory:
+            Processor(self.grammar, result_cache=vogo.ResultCache(directory=directory)) \
+                .process_input(b"imagen", 'image')
+            cache = vogo.ResultCache(directory=directory)
+            result = Processor(self.grammar, result_cache=cache).process_input(b"imagen", 'image')
+        
+        self.assertEqual(result['matches'][0]['matches'], ['2024'])
+        self.assertEqual(mock_ocr.call_count, 1)
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+    
+    def test_ttl(self):
+        """Probar que las entradas caducan"""
+        cache = vogo.ResultCache(ttl=60)
+        processor = Processor(self.grammar, result_cache=cache)
+        with patch('vogo.cache.time.time', return_value=1000.0):
+            processor.process_input("a 1")
+        with patch('vogo.cache.time.time', return_value=1061.0):
+            processor.process_input("a 1")
+        self.assertEqual(cache.stats()['misses'], 2)
+        with self.assertRaises(ValueError):
+            vogo.ResultCache(ttl=0)
+
+
+class TestCFGParsing(unittest.TestCase):
+    
+    def setUp(self):
+        self.rules = {
+            'comando': 'ACCION OBJETO',
+            'ACCION': '"abrir" | "cerrar"',
+            'OBJETO': '"puerta" | "ventana"',
+        }
+    
+    def test_lalr_with_transformer(self):
+        """Probar el parser LALR con transformer sin construir el árbol"""
+        from lark import Transformer
+        
+        class Comando(Transformer):
+            def comando(self, items):
+                return {'accion': str(items[0]), 'objeto': str(items[1])}
+        
+        grammar = Grammar(self.rules, type='cfg', parser='lalr', transformer=Comando())
+        self.assertEqual(grammar.parser_type, 'lalr')
+        
+        matches = TextProcessor(grammar)._match_grammar("abrirpuerta")
+        self.assertEqual(matches[0]['tree'],
+                         {'accion': 'abrir', 'objeto': 'puerta'})
+    
+    def test_auto_falls_back_to_earley(self):
+        """Probar que 'auto' usa Earley si la gramática no es LALR(1)"""
+        rules = {'start': 'a | b', 'a': '"x"', 'b': '"x"'}
+        grammar = Grammar(rules, type='cfg', parser='auto', tree_format='tree')
+        self.assertEqual(grammar.parser_type, 'earley')
+        
+        with self.assertRaises(ValueError):
+            Grammar(rules, type='cfg', parser='lalr')
+    
+    def test_tree_format(self):
+        """Probar que el árbol se devuelve sin convertir a texto"""
+        grammar = Grammar(self.rules, type='cfg', tree_format='tree')
+        tree = TextProcessor(grammar)._match_grammar("cerrarventana")[0]['tree']
+        self.assertEqual(tree.data, 'comando')
+    
+    def test_unparseable_input(self):
+        """Probar que una entrada inválida no produce coincidencias"""
+        grammar = Grammar(self.rules, type='cfg', parser='lalr')
+        self.assertEqual(grammar.parser.parse("abrirpuerta").data, 'comando')
+        self.assertEqual(TextProcessor(grammar)._match_grammar("abrir coche"), [])
+
+
+class TestCFGScanning(unittest.TestCase):
+    
+    def setUp(self):
+        self.rules = {
+            'comando': 'ACCION OBJETO',
+            'ACCION': '"abrir" | "cerrar"',
+            'OBJETO': '"puerta" | "ventana"',
+            '%ignore': '" "'
+        }
+    
+    def test_scan_finds_embedded_commands(self):
+        """Probar que el modo scan encuentra comandos dentro del texto"""
+        grammar = Grammar(self.rules, type='cfg', cfg_mode='scan')
+        text = "por favor abrir puerta y luego cerrar  ventana"
+        matches = TextProcessor(grammar)._match_grammar(text)
+        
+        self.assertEqual(matches[0]['type'], 'cfg_scan')
+        self.assertEqual(matches[0]['matches'], ['abrir puerta', 'cerrar  ventana'])
+        self.assertEqual(matches[0]['spans'], [(10, 22), (31, 46)])
+    
+    def test_scan_all_spans(self):
+        """Probar que scan_all devuelve todos los tramos derivables"""
+        rules = {'suma': 'suma "+" NUM | NUM', 'NUM': '/\\d+/'}
+        grammar = Grammar(rules, type='cfg', cfg_mode='scan_all')
+        self.assertEqual(grammar.scanner.scan("1+2", overlapping=True),
+                         [(0, 1), (0, 3), (2, 3)])
+        self.assertEqual(grammar.scanner.scan("a 1+2 b 3"), [(2, 5), (8, 9)])
+
+
+class TestGrammarRegistry(unittest.TestCase):
+    
+    def setUp(self):
+        self.registry = vogo.GrammarRegistry()
+        self.rules = {'accion': r'\b(abrir|cerrar)\b'}
+    
+    def test_grammars_interned_by_content(self):
+        """Probar que clientes con las mismas reglas comparten gramática"""
+        first = self.registry.register('cliente_a', self.rules)
+        second = self.registry.register('cliente_b', dict(self.rules))
+        self.assertIs(first, second)
+        self.assertEqual(self.registry.stats(), {'tenants': 2, 'grammars': 1})
+    
+    def test_hot_swap(self):
+        """Probar que una nueva versión se aplica a los procesadores existentes"""
+        self.registry.register('cliente', self.rules)
+        processor = self.registry.processor('cliente')
+        text_processor = processor.processors['text']
+        
+        new_grammar = self.registry.register('cliente', {'accion': r'\b(encender)\b'})
+        self.assertIs(processor.grammar, new_grammar)
+        self.assertIs(processor.processors['text'], text_processor)
+        self.assertEqual(text_processor._match_grammar("encender"),
+                         [{'type': 'accion', 'matches': ['encender']}])
+    
+    def test_interned_by_options(self):
+        """Probar que transformers distintos y on_risky no comparten gramática"""
+        from lark import Transformer
+        
+        class Etiqueta(Transformer):
+            def __init__(self, tag):
+                super().__init__()
+                self.tag = tag
+        
+        rules = {'comando': '"abrir"'}
+        first = Etiqueta('x')
+        self.assertIs(self.registry.intern(rules, 'cfg', transformer=first),
+                      self.registry.intern(rules, 'cfg', transformer=first))
+        grammar = self.registry.intern(rules, 'cfg', transformer=Etiqueta('y'))
+        self.assertEqual(grammar.transformer.tag, 'y')
+        
+        class Fijo:
+            __slots__ = ()
+            
+            def transform(self, tree):
+                return tree
+        
+        fixed = Fijo()
+        with self.assertWarns(RuntimeWarning):
+            self.assertIsNot(self.registry.intern(rules, 'cfg', transformer=fixed),
+                             self.registry.intern(rules, 'cfg', transformer=fixed))
+        
+        risky = {'r': r'(a+)+$'}
+        kept = self.registry.intern(risky)
+        with self.assertRaises(ValueError):
+            self.registry.intern(risky, on_risky='error')
+        self.assertIs(self.registry.intern(risky), kept)
+    
+    def test_unknown_tenant(self):
+        """Probar error con cliente desconocido"""
+        with self.assertRaises(ValueError):
+            self.registry.processor('nadie')
+
+
+class TestInstrumentation(unittest.TestCase):
+    
+    def setUp(self):
+        self.grammar = Grammar({
+            'saludo': r'\b(hola|adios)\b',
+            'numero': r'\d+',
+            'signo': r'[!?]'
+        })
+        self.events = []
+        self.instrumentation = vogo.Instrumentation(
+            hook=lambda modality, timings: self.events.append((modality, timings)))
+        self.processor = Processor(self.grammar, instrumentation=self.instrumentation)
+    
+    @patch('vogo.image_processor.pytesseract.image_to_string')
+    @patch('vogo.image_processor.Image.open')
+    def test_stage_and_rule_timings(self, mock_image_open, mock_ocr):
+        """Probar los tiempos por etapa y por regla de cada resultado"""
+        mock_ocr.return_value = "hola 42 !"
+        
+        result = self.processor.process_input(b"fake image bytes", type='image')
+        timings = result['timings']
+        self.assertEqual(set(timings['stages']), {'total', 'ocr', 'tokenize', 'match'})
+        self.assertEqual(timings['calls']['match'], 1)
+        self.assertGreaterEqual(timings['stages']['total'], timings['stages']['ocr'])
+        self.assertEqual(set(timings['rules']), {'saludo', 'numero+signo'})
+        self.assertEqual(self.events, [('image', timings)])
+    
+    def test_histograms(self):
+        """Probar la agregación en histogramas y el volcado"""
+        import json
+        for _ in range(3):
+            self.processor.process_input("hola", type='text')
+        with self.assertRaises(ValueError):
+            self.processor.process_input("   ", type='text')
+        
+        snapshot = json.loads(self.instrumentation.dump())
+        self.assertEqual(snapshot['stages']['text']['total']['count'], 4)
+        self.assertEqual(snapshot['stages']['text']['match']['count'], 3)
+        self.assertEqual(snapshot['rules']['saludo']['count'], 3)
+        self.assertEqual(snapshot['errors'], {'text': 1})
+        
+        histogram = self.instrumentation.stages['text']['match']
+        self.assertLessEqual(histogram.percentile(50), histogram.max)
+    
+    def test_disabled_by_default(self):
+        """Probar que sin instrumentación no se añaden tiempos"""
+        processor = Processor(self.grammar)
+        self.assertIsNone(processor.instrumentation)
+
+
+class TestNLTKResources(unittest.TestCase):
+    
+    def setUp(self):
+        import tempfile
+        import nltk
+        self.tmp = tempfile.TemporaryDirectory()
+        self.search_path = list(nltk.data.path)
+    
+    def tearDown(self):
+        import nltk
+        from vogo.nltk_resources import configure_nltk
+        nltk.data.path[:] = self.search_path
+        configure_nltk()
+        self.tmp.cleanup()
+    
+    def test_offline_never_downloads(self):
+        """Probar que sin permiso explícito no se accede a la red"""
+        from vogo.nltk_resources import configure_nltk, ensure_nltk_resources
+        configure_nltk(data_path=self.tmp.name, allow_download=False)
+        with patch('nltk.download') as mock_download, \
+                patch('nltk.data.find', side_effect=LookupError) as mock_find:
+            with self.assertRaises(ValueError):
+                ensure_nltk_resources()
+            # El fallo se recuerda: no se vuelve a buscar en cada llamada.
+            with self.assertRaises(ValueError):
+                ensure_nltk_resources()
+        mock_download.assert_not_called()
+        self.assertEqual(mock_find.call_count, 1)
+    
+    def test_data_path(self):
+        """Probar que se usan los datos de una ruta proporcionada"""
+        import nltk
+        from vogo.nltk_resources import configure_nltk, ensure_nltk_resources, punkt_resource
+        os.makedirs(os.path.join(self.tmp.name, 'tokenizers', punkt_resource()))
+        configure_nltk(data_path=self.tmp.name)
+        ensure_nltk_resources()
+        self.assertEqual(nltk.data.path[0], self.tmp.name)
+
+
+class TestTokenizer(unittest.TestCase):
+    
+    def test_matches_nltk_word_tokenizer(self):
+        """Probar que el tokenizador regex reproduce a NLTK en casos habituales"""
+        from nltk.tokenize import NLTKWordTokenizer
+        from vogo.tokenizer import RegexTokenizer
+        reference = NLTKWordTokenizer()
+        tokenizer = RegexTokenizer()
+        for text in [
+            "Hola, ¿cómo estás?",
+            "Good muffins cost $3.88 (roughly 3,36 euros) in New York.",
+            "I don't know, can't you see?",
+            'He said "hello" to me.',
+            "Eran las 10:30 y llovía...",
+            "escribe a contacto@ejemplo.com -- ahora",
+            "John's dogs' toys cannot wait",
+        ]:
+            self.assertEqual(tokenizer.tokenize(text), reference.tokenize(text), text)
+    
+    def test_sentence_final_periods(self):
+        """Probar la separación del punto final de cada frase"""
+        from vogo.tokenizer import RegexTokenizer
+        tokens = RegexTokenizer().tokenize("Abre la puerta. Dr. García llegó a las 3.30.")
+        self.assertEqual(tokens, ['Abre', 'la', 'puerta', '.', 'Dr.', 'García',
+                                  'llegó', 'a', 'las', '3.30', '.'])
+    
+    def test_pluggable_tokenizer(self):
+        """Probar tokenizadores alternativos en el procesador"""
+        grammar = Grammar({'saludo': r'hola'})
+        processor = Processor(grammar, tokenizer=str.split)
+        result = processor.process_input("hola, mundo")
+        self.assertEqual(result['tokens'], ['hola,', 'mundo'])
+        
+        with patch('nltk.word_tokenize', return_value=['hola', ',', 'mundo']) as mock_tokenize:
+            result = Processor(grammar, tokenizer='nltk').process_input("hola, mundo")
+        mock_tokenize.assert_called_once()
+        self.assertEqual(result['tokens'], ['hola', ',', 'mundo'])
+        
+        from vogo.tokenizer import Tokenizer
+        with self.assertRaises(TypeError):
+            Tokenizer()
+        
+        with self.assertRaises(ValueError):
+            Processor(grammar, tokenizer='spacy')
+
+
+class TestOffsets(unittest.TestCase):
+    
+    def setUp(self):
+        self.grammar = Grammar({
+            'email': r'([\w.]+)@\w+\.\w+',
+            'numero': r'\d+'
+        })
+    
+    def test_span_list(self):
+        """Probar que SpanList se comporta como una lista de cadenas"""
+        from vogo.spans import SpanList
+        spans = SpanList.from_spans("hola mundo", [(0, 4), (5, 10)])
+        self.assertEqual(spans, ['hola', 'mundo'])
+        self.assertEqual(spans[-1], 'mundo')
+        self.assertEqual(spans[1:], ['mundo'])
+        self.assertEqual(list(spans.spans()), [(0, 4), (5, 10)])
+        self.assertEqual(spans.starts.itemsize, 4)
+    
+    def test_offset_results(self):
+        """Probar tokens y coincidencias como posiciones en el texto"""
+        text = 'Escribe "ya" a ana@ejemplo.com antes de las 10'
+        processor = Processor(self.grammar, offsets=True)
+        result = processor.process_input(text)
+        
+        self.assertEqual(result['tokens'], Processor(self.grammar).process_input(text)['tokens'])
+        self.assertEqual(result['tokens'][1], '``')
+        self.assertEqual(result['tokens'].span(1), (8, 9))
+        
+        email, numero = result['matches']
+        self.assertEqual(email['matches'], ['ana@ejemplo.com'])
+        start, end = email['matches'].span(0)
+        self.assertEqual(text[start:end], 'ana@ejemplo.com')
+        self.assertEqual(list(numero['matches'].spans()), [(44, 46)])
+        self.assertEqual(result['stats']['match_count'], 2)
+
+
+class TestLazyResult(unittest.TestCase):
+    
+    def setUp(self):
+        self.grammar = Grammar({'numero': r'\d+'})
+        self.tokenize = Mock(side_effect=lambda text: text.split())
+        self.processor = Processor(self.grammar, tokenizer=self.tokenize, lazy=True)
+    
+    def test_tokens_on_demand(self):
+        """Probar que solo se tokeniza al leer tokens o estadísticas que los usan"""
+        result = self.processor.process_input("pedido 12 de 3 cajas")
+        
+        self.assertEqual(result['matches'][0]['matches'], ['12', '3'])
+        self.assertEqual(result['stats']['match_count'], 2)
+        self.tokenize.assert_not_called()
+        
+        self.assertEqual(result['stats']['token_count'], 5)
+        self.assertEqual(result.tokens, ['pedido', '12', 'de', '3', 'cajas'])
+        self.tokenize.assert_called_once()
+    
+    def test_behaves_like_dict(self):
+        """Probar que Result equivale al diccionario del modo normal"""
+        text = "pedido 12 de 3 cajas"
+        result = self.processor.process_input(text)
+        expected = Processor(self.grammar, tokenizer=str.split).process_input(text)
+        
+        self.assertIsInstance(result, vogo.Result)
+        self.assertEqual(set(result), {'text', 'tokens', 'matches', 'stats'})
+        self.assertEqual(result.to_dict(), expected)
+        self.assertEqual(dict(result['stats']), expected['stats'])
+        with self.assertRaises(KeyError):
+            result['stats'] = {}
+    
+    def test_extra_keys_and_pickle(self):
+        """Probar claves añadidas por Processor y la copia entre procesos"""
+        import pickle
+        processor = Processor(self.grammar, tokenizer='regex', lazy=True,
+                              instrumentation=True)
+        result = processor.process_input("pedido 12")
+        self.assertIn('timings', result)
+        
+        copy = pickle.loads(pickle.dumps(result))
+        self.assertEqual(copy.to_dict(), result.to_dict())
+
+
+class TestAsyncProcessor(unittest.TestCase):
+    
+    def setUp(self):
+        self.grammar = Grammar({'numero': r'\d+', 'nombre': r'[A-Z]\w+'})
+        self.processor = Processor(self.grammar, concurrency={'image': 2})
+    
+    def fake_tesseract(self, text, sleep=0):
+        """Sustituye tesseract por un script que lee stdin y escribe `text`"""
+        import tempfile
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'tesseract')
+        with open(path, 'w') as f:
+            f.write(f'#!/bin/sh\ncat > /dev/null\necho "{text}"\nexec sleep {sleep}\n')
+        os.chmod(path, 0o755)
+        return patch('vogo.image_processor.pytesseract.pytesseract.tesseract_cmd', path)
+    
+    def image_bytes(self):
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new('RGB', (8, 8)).save(buffer, format='PNG')
+        return buffer.getvalue()
+    
+    def test_aprocess_text_and_batch(self):
+        """Probar aprocess_input y aprocess_batch con texto"""
+        import asyncio
+        result = asyncio.run(self.processor.aprocess_input("Pedido 42"))
+        self.assertEqual(result, self.processor.process_input("Pedido 42"))
+        
+        results = asyncio.run(self.processor.aprocess_batch(["a 1", None, "b 2"]))
+        self.assertEqual([r.get('text') for r in results], ["a 1", None, "b 2"])
+        self.assertEqual(results[1]['error_type'], 'AttributeError')
+    
+    @unittest.skipIf(os.name == 'nt', "requiere un script de shell")
+    def test_aprocess_image_subprocess(self):
+        """Probar OCR asíncrono con tesseract como subproceso y límite de concurrencia"""
+        import asyncio
+        import time
+        with self.fake_tesseract("Hola Mundo 2024", sleep=0.2):
+            start = time.perf_counter()
+            results = asyncio.run(self.processor.aprocess_batch([self.image_bytes()] * 4, 'image'))
+            elapsed = time.perf_counter() - start
+        
+        self.assertEqual(results[0]['text'].strip(), "Hola Mundo 2024")
+        self.assertEqual(results[3]['matches'][0]['matches'], ['2024'])
+        # Con un límite de 2, las 4 imágenes se procesan en dos tandas.
+        self.assertGreaterEqual(elapsed, 0.4)
+    
+    @unittest.skipIf(os.name == 'nt', "requiere un script de shell")
+    def test_aprocess_cancel(self):
+        """Probar que cancelar la llamada termina el subproceso de OCR"""
+        import asyncio
+        
+        async def cancel():
+            task = asyncio.ensure_future(self.processor.aprocess_input(self.image_bytes(), 'image'))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await asyncio.wait_for(task, 5)
+            # El semáforo de la modalidad queda libre.
+            return self.processor._semaphore('image')._value
+        
+        with self.fake_tesseract("lento", sleep=30):
+            self.assertEqual(asyncio.run(cancel()), 2)
+    
+    def test_invalid_concurrency(self):
+        """Probar límites de concurrencia no válidos"""
+        with self.assertRaises(ValueError):
+            Processor(self.grammar, concurrency={'image': 0})
+        with self.assertRaises(ValueError):
+            Processor(self.grammar, concurrency={'smell': 2})
+
+
+class TestLazyModalities(unittest.TestCase):
+    
+    def test_import_without_heavy_dependencies(self):
+        """Probar que importar vogo y procesar texto no carga Lark, NLTK, OCR ni voz"""
+        import subprocess
+        code = (
+            "import sys, vogo\n"
+            "vogo.Processor(vogo.Grammar({'n': r'\\d+'})).process_input('a 1')\n"
+            "heavy = ['lark', 'nltk', 'pytesseract', 'PIL', 'speech_recognition', 'numpy']\n"
+            "print([name for name in heavy if name in sys.modules])\n"
+        )
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        output = subprocess.run([sys.executable, '-c', code], env=env,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), '[]')
+    
+    def test_modalities(self):
+        """Probar modalidades declaradas, creación al usarse e instancias compartidas"""
+        grammar = Grammar({'n': r'\d+'})
+        processor = Processor(grammar, modalities=['text', 'image', 'video'])
+        
+        self.assertIn('image', processor.processors)
+        self.assertNotIn('voice', processor.processors)
+        self.assertEqual(processor.processors.loaded(), {})
+        with self.assertRaises(ValueError):
+            processor.process_input(b"audio", 'voice')
+        
+        other = Grammar({'n': r'[a-z]+'})
+        processor.set_grammar(other)
+        self.assertIs(processor.processors['image'], processor.processors['video'])
+        self.assertIs(processor.processors['image'].grammar, other)
+        self.assertEqual(list(processor.processors.loaded()), ['image', 'video'])
+        
+        with self.assertRaises(ValueError):
+            Processor(grammar, modalities=['smell'])
+
+
+class TestStreaming(unittest.TestCase):
+    
+    def setUp(self):
+        self.grammar = Grammar({
+            'email': r'([\w.]+)@\w+\.\w+',
+            'numero': r'\b\d+\b',
+            'dinero': r'(?<=\$)\d+'
+        })
+        self.processor = Processor(self.grammar)
+        self.text = " ".join(["escribe a ana@ejemplo.com", "pagó $40 por 3", "o llama al 555"] * 200)
+    
+    def collect(self, results):
+        matches, tokens = {}, []
+        for result in results:
+            tokens.extend(result['tokens'])
+            for match in result['matches']:
+                matches.setdefault(match['type'], []).extend(match['matches'])
+        return matches, tokens
+    
+    def test_chunks_match_full_text(self):
+        """Probar que por trozos se obtiene lo mismo que con el texto completo"""
+        full = self.processor.process_input(self.text)
+        expected = {m['type']: m['matches'] for m in full['matches']}
+        for size in (5, 37, 1000):
+            chunks = [self.text[i:i + size] for i in range(0, len(self.text), size)]
+            results = list(self.processor.process_stream(chunks, overlap=32))
+            self.assertEqual(self.collect(results), (expected, full['tokens']))
+            self.assertEqual(''.join(r['text'] for r in results), self.text)
+    
+    def test_absolute_spans(self):
+        """Probar posiciones absolutas de coincidencias que cruzan trozos"""
+        text = "uno ana@ejemplo.com dos"
+        results = list(self.processor.process_stream([text[:8], text[8:]], overlap=16))
+        spans = [span for r in results for m in r['matches'] if m['type'] == 'email'
+                 for span in m['spans']]
+        self.assertEqual(spans, [(4, 19)])
+        self.assertEqual(results[-1]['offset'] + len(results[-1]['text']), len(text))
+    
+    def test_long_tokens(self):
+        """Probar que los tokens más largos que overlap no se parten entre ventanas"""
+        text = " ".join(["x" * 50, "pedido 12", "y" * 40] * 20)
+        expected = self.processor.process_input(text)['tokens']
+        chunks = [text[i:i + 30] for i in range(0, len(text), 30)]
+        results = list(self.processor.process_stream(chunks, overlap=8))
+        self.assertEqual(self.collect(results)[1], expected)
+        self.assertEqual(self.processor.process_parallel(text, chunk_size=30, overlap=8)['tokens'],
+                         expected)
+    
+    def test_file_and_bytes(self):
+        """Probar una ruta de fichero y trozos de bytes con caracteres multibyte"""
+        import tempfile
+        text = "ñandú 12 " * 300
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.txt', delete=False) as f:
+            f.write(text)
+        try:
+            results = list(self.processor.process_stream(f.name, chunk_size=100, overlap=8))
+        finally:
+            os.unlink(f.name)
+        self.assertEqual(self.collect(results)[0], {'numero': ['12'] * 300})
+        
+        data = text.encode('utf-8')
+        chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+        results = list(self.processor.process_stream(chunks, overlap=8))
+        self.assertEqual(''.join(r['text'] for r in results), text)
+    
+    def test_cfg_not_supported(self):
+        """Probar que el streaming exige una gramática regex"""
+        processor = Processor(Grammar({'start': '"a"'}, type='cfg'))
+        with self.assertRaises(ValueError):
+            processor.process_stream(["a"])
+
+
+class TestGestureGrammar(unittest.TestCase):
+    
+    def setUp(self):
+        self.grammar = Grammar({
+            'doble_derecha': 'arriba{2} derecha',
+            'lateral': '(izquierda | derecha)+',
+            'abrir_cerrar': 'abrir _* cerrar'
+        }, type='gestures')
+        self.processor = Processor(self.grammar)
+        self.gestures = ['arriba', 'Arriba', 'derecha', 'izquierda', 'abrir', 'saludo', 'cerrar']
+    
+    def test_sequence_matches(self):
+        """Probar repeticiones, alternativas y comodines sobre la lista de gestos"""
+        result = self.processor.process_input(self.gestures, type='gestures')
+        
+        self.assertEqual(result['tokens'], self.gestures)
+        self.assertEqual(result['matches'], [
+            {'type': 'doble_derecha', 'matches': [['arriba', 'Arriba', 'derecha']], 'spans': [(0, 3)]},
+            {'type': 'lateral', 'matches': [['derecha', 'izquierda']], 'spans': [(2, 4)]},
+            {'type': 'abrir_cerrar', 'matches': [['abrir', 'saludo', 'cerrar']], 'spans': [(4, 7)]},
+        ])
+        self.assertEqual(result['stats']['match_count'], 3)
+    
+    def test_invalid_patterns(self):
+        """Probar errores de sintaxis y reglas que aceptan secuencias vacías"""
+        for pattern in ('arriba**', '(arriba', 'arriba |', 'arriba{3,1}', 'arriba*', 'arriba # abajo'):
+            with self.assertRaises(ValueError):
+                Grammar({'regla': pattern}, type='gestures')
+    
+    def test_other_inputs(self):
+        """Probar la gramática regex con gestos y la de gestos con texto"""
+        grammar = Grammar({'direccion': r'\b(arriba|abajo)\b'})
+        result = Processor(grammar).process_input(['arriba', 'saludo'], type='gestures')
+        self.assertEqual(result['matches'], [{'type': 'direccion', 'matches': ['arriba']}])
+        
+        with self.assertRaises(ValueError):
+            self.processor.process_input("arriba arriba derecha")
+        results = self.processor.process_many(["arriba arriba derecha", []], type='gestures')
+        self.assertEqual(results[0]['matches'][0]['spans'], [(0, 3)])
+        self.assertEqual(results[1]['error_type'], 'ValueError')
+
+    
+    def test_vocabulary_ids(self):
+        """Probar la entrada como ids del vocabulario de la gramática"""
+        from array import array
+        from vogo.utils import buscar_elemento
+        vocabulary = self.grammar.matcher.vocabulary
+        ids = vocabulary.encode(self.gestures)
+        self.assertIsInstance(ids, array)
+        self.assertEqual(vocabulary.decode(ids), self.gestures)
+        self.assertNotEqual(ids[0], ids[1])
+        self.assertEqual(vocabulary.folded[ids[0]], vocabulary.folded[ids[1]])
+        
+        expected = self.processor.process_input(self.gestures, type='gestures')
+        self.assertEqual(self.processor.process_input(ids, type='gestures'), expected)
+        self.assertTrue(buscar_elemento(ids, 'CERRAR', vocabulary))
+        self.assertFalse(buscar_elemento(ids, 'abajo', vocabulary))
+        self.assertEqual(vocabulary.spellings['arriba'],
+                         {vocabulary.ids['arriba'], vocabulary.ids['Arriba']})
+        self.assertTrue(buscar_elemento(self.gestures, 'ARRIBA'))
+        with self.assertRaises(ValueError):
+            self.processor.process_input(array('H', [len(vocabulary)]), type='gestures')
+
+
+
+class TestGestureSession(unittest.TestCase):
+    
+    def setUp(self):
+        self.grammar = Grammar({
+            'doble_derecha': 'arriba{2} derecha',
+            'lateral': '(izquierda | derecha)+',
+            'abrir_cerrar': 'abrir _* cerrar'
+        }, type='gestures')
+        self.processor = Processor(self.grammar)
+    
+    def test_push_emits_as_soon_as_complete(self):
+        """Probar que cada coincidencia se emite con el gesto que la completa"""
+        session = self.processor.gesture_session()
+        gestures = ['arriba', 'Arriba', 'derecha', 'izquierda', 'abrir', 'saludo', 'cerrar']
+        emitted = [session.push(gesture, timestamp=index) for index, gesture in enumerate(gestures)]
+        
+        self.assertEqual(emitted[:2], [[], []])
+        self.assertEqual(emitted[2], [
+            {'type': 'doble_derecha', 'matches': [['arriba', 'Arriba', 'derecha']], 'spans': [(0, 3)]},
+            {'type': 'lateral', 'matches': [['derecha']], 'spans': [(2, 3)]},
+        ])
+        self.assertEqual(emitted[3], [{'type': 'lateral', 'matches': [['izquierda']], 'spans': [(3, 4)]}])
+        self.assertEqual(emitted[6], [
+            {'type': 'abrir_cerrar', 'matches': [['abrir', 'saludo', 'cerrar']], 'spans': [(4, 7)]}
+        ])
+    
+    def test_window_and_debounce(self):
+        """Probar la caducidad por ventana y el descarte de gestos repetidos"""
+        session = self.processor.gesture_session(window=3)
+        self.assertEqual(session.feed(['abrir', 'saludo', 'saludo', 'cerrar']), [])
+        matches = session.feed(['abrir', 'saludo', 'cerrar'])
+        self.assertEqual(matches[0]['spans'], [(4, 7)])
+        
+        session = self.processor.gesture_session(debounce=0.2)
+        self.assertEqual(session.push('arriba', 0.0), [])
+        self.assertEqual(session.push('arriba', 0.1), [])
+        self.assertEqual(session.push('arriba', 0.25), [])
+        matches = session.push('derecha', 0.3)
+        self.assertEqual(matches[0]['type'], 'lateral')
+        self.assertEqual(session.position, 2)
+        session.push('arriba', 0.5)
+        session.push('arriba', 0.8)
+        self.assertEqual(session.push('derecha', 0.9)[0]['spans'], [(2, 5)])
+    
+    def test_requires_gesture_grammar(self):
+        """Probar que una gramática regex no admite sesiones de gestos"""
+        with self.assertRaises(ValueError):
+            Processor(Grammar({'saludo': r'\bhola\b'})).gesture_session()
+        with self.assertRaises(ValueError):
+            self.processor.gesture_session(window=0)
+
+
+class TestTrajectory(unittest.TestCase):
+    
+    def setUp(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("numpy no está instalado")
+        self.np = np
+        self.grammar = Grammar({
+            'doble_arriba': 'arriba{2}',
+            'ele': 'derecha abajo'
+        }, type='gestures')
+    
+    def swipe(self, start, end, t0, t1, points=30):
+        np = self.np
+        return np.column_stack([np.linspace(start[0], end[0], points),
+                                np.linspace(start[1], end[1], points),
+                                np.linspace(t0, t1, points)])
+    
+    def test_quantize_directions(self):
+        """Probar el suavizado, los sectores y la separación por paradas"""
+        from vogo import TrajectoryQuantizer
+        np = self.np
+        noise = np.random.default_rng(0).normal(0, 0.5, (99, 2))
+        ele = np.vstack([self.swipe((0, 0), (100, 0), 0, 1, 50)[:, :2],
+                         self.swipe((100, 0), (100, 100), 1, 2, 50)[1:, :2]]) + noise
+        gestures, segments = TrajectoryQuantizer().quantize(ele)
+        self.assertEqual(gestures, ['derecha', 'abajo'])
+        self.assertEqual(len(segments), 2)
+        self.assertLess(abs(segments[1][0] - 49), 3)
+        
+        diagonal = np.column_stack([np.arange(20.0), -np.arange(20.0)])
+        self.assertEqual(TrajectoryQuantizer(8).quantize(diagonal)[0], ['arriba_derecha'])
+        self.assertEqual(TrajectoryQuantizer(8, y_down=False).quantize(diagonal)[0], ['abajo_derecha'])
+        self.assertEqual(TrajectoryQuantizer().quantize(np.zeros((5, 2))), ([], []))
+        with self.assertRaises(ValueError):
+            TrajectoryQuantizer().quantize(np.zeros((5, 4)))
+    
+    def test_trajectory_modality(self):
+        """Probar la modalidad 'trajectory' con la gramática de gestos"""
+        np = self.np
+        # Dos deslizamientos hacia arriba separados por medio segundo quieto.
+        trajectory = np.vstack([self.swipe((0, 100), (0, 0), 0.0, 0.3),
+                                self.swipe((0, 0), (0, 0), 0.31, 0.8, 10),
+                                self.swipe((0, 0), (0, -100), 0.81, 1.1)])
+        processor = Processor(self.grammar, result_cache=True)
+        result = processor.process_input(trajectory, type='trajectory')
+        
+        self.assertEqual(result['tokens'], ['arriba', 'arriba'])
+        self.assertEqual(result['matches'][0]['type'], 'doble_arriba')
+        self.assertEqual(len(result['segments']), 2)
+        self.assertEqual(processor.process_input(trajectory, type='trajectory'), result)
+        # Sin tiempos no hay paradas: un solo gesto.
+        self.assertEqual(processor.process_input(trajectory[:, :2], type='trajectory')['tokens'],
+                         ['arriba'])
+        
+        results = processor.process_many([trajectory, np.zeros((3, 2))], type='trajectory')
+        self.assertEqual(results[0]['segments'], result['segments'])
+        self.assertEqual(results[1]['error_type'], 'ValueError')
+
+class TestProcessMany(unittest.TestCase):
+    
+    def setUp(self):
+        self.grammar = Grammar({
+            'email': r'([\w.]+)@\w+\.\w+',
+            'numero': r'\b\d+\b',
+            'saludo': r'\b(hola|adios)\b',
+            'dinero': r'(?<=\$)\d+',
+            'orden': r'^enciende',
+            'espacios': r'\s{2,}'
+        })
+        self.texts = ["Hola, enciende la luz", "enciende 2 luces", "pagó $40 a ana@ejemplo.com",
+                      "línea\ncon salto 7", "HOLA  adios", "nada"]
+    
+    def test_same_results_as_process_input(self):
+        """Probar que el lote da los mismos resultados que cada entrada por separado"""
+        for options in ({}, {'offsets': True}):
+            processor = Processor(self.grammar, **options)
+            expected = [processor.process_input(text) for text in self.texts]
+            results = processor.process_many(self.texts)
+            self.assertEqual(results, expected)
+            if options:
+                self.assertEqual(list(results[2]['matches'][0]['matches'].spans()), [(11, 26)])
+    
+    def test_rules_and_separator(self):
+        """Probar qué reglas se buscan sobre los textos unidos"""
+        from vogo.batch import BatchMatcher
+        batch = BatchMatcher(self.grammar.matcher)
+        joined = [self.grammar.matcher.infos[index].key for index in batch.joined_rules]
+        self.assertEqual(batch.separator, '\x00')
+        self.assertEqual(joined, ['email', 'numero', 'saludo', 'espacios'])
+    
+    def test_errors_and_cache(self):
+        """Probar errores por entrada, gestos y caché de resultados"""
+        processor = Processor(self.grammar, result_cache=True)
+        results = processor.process_many(["hola 1", "   ", "hola 1"])
+        self.assertEqual(results[1]['error_type'], 'ValueError')
+        self.assertEqual(results[0], results[2])
+        self.assertEqual(processor.result_cache.stats()['entries'], 1)
+        
+        gestures = processor.process_many([['hola', 'adios']], type='gestures')
+        self.assertEqual(gestures[0]['matches'], [{'type': 'saludo', 'matches': ['hola', 'adios']}])
+        with self.assertRaises(ValueError):
+            processor.process_many([b''], type='image')
+
+
+class TestParallelDocument(unittest.TestCase):
+    
+    def setUp(self):
+        self.grammar = Grammar({
+            'email': r'([\w.]+)@\w+\.\w+',
+            'numero': r'\b\d+\b',
+            'dinero': r'(?<=\$)\d+'
+        })
+        self.text = " ".join(["escribe a ana@ejemplo.com", "pagó $40 por 3", "o llama al 555"] * 100)
+    
+    def test_same_result_as_whole_text(self):
+        """Probar que los trozos repartidos entre procesos dan el resultado completo"""
+        with Processor(self.grammar) as processor:
+            full = processor.process_input(self.text)
+            for chunk_size in (50, 777):
+                result = processor.process_parallel(self.text, workers=2,
+                                                    chunk_size=chunk_size, overlap=32)
+                self.assertEqual([{'type': m['type'], 'matches': m['matches']}
+                                  for m in result['matches']], full['matches'])
+                self.assertEqual(result['tokens'], full['tokens'])
+                self.assertEqual(result['stats'], full['stats'])
+        
+        numbers = next(m for m in result['matches'] if m['type'] == 'numero')
+        self.assertEqual([self.text[start:end] for start, end in numbers['spans']],
+                         numbers['matches'])
+    
+    def test_single_window_in_process(self):
+        """Probar que un texto de una sola ventana no arranca el pool"""
+        processor = Processor(self.grammar)
+        result = processor.process_parallel("  pagó $40 por 3  ")
+        self.assertEqual(result['text'], "pagó $40 por 3")
+        self.assertEqual(result['matches'][1]['spans'], [(6, 8)])
+        self.assertEqual(processor._pools, {})
+    
+    def test_invalid(self):
+        """Probar gramáticas CFG, textos vacíos y tamaños no válidos"""
+        with self.assertRaises(ValueError):
+            Processor(Grammar({'start': '"a"'}, type='cfg')).process_parallel("a")
+        processor = Processor(self.grammar)
+        with self.assertRaises(ValueError):
+            processor.process_parallel("   ")
+        with self.assertRaises(ValueError):
+            processor.process_parallel("hola", chunk_size=0)
+
+
+class TestMappedFile(unittest.TestCase):
+    
+    def setUp(self):
+        import tempfile
+        self.grammar = Grammar({
+            'email': r'([\w.]+)@\w+\.\w+',
+            'numero': r'\b\d+\b',
+            'saludo': r'\b(hola|adios)\b'
+        })
+        self.text = "Pingüino: hola, escribe a ana@ejemplo.com antes del día 12.\n" * 50
+        with tempfile.NamedTemporaryFile('wb', suffix='.txt', delete=False) as f:
+            f.write(self.text.encode('utf-8'))
+        self.path = f.name
+    
+    def tearDown(self):
+        os.unlink(self.path)
+    
+    def test_same_matches_as_text(self):
+        """Probar que el fichero mapeado da las mismas coincidencias que el texto"""
+        processor = Processor(self.grammar)
+        result = processor.match_file(self.path)
+        expected = self.grammar.matcher.findall(self.text)
+        
+        self.assertEqual([{'type': m['type'], 'matches': m['matches']} for m in result['matches']],
+                         expected)
+        self.assertEqual(result['size'], len(self.text.encode('utf-8')))
+        self.assertEqual(result['stats']['match_count'], 150)
+    
+    def test_char_and_byte_offsets(self):
+        """Probar posiciones en caracteres y en bytes tras caracteres multibyte"""
+        result = Processor(self.grammar).match_file(self.path)
+        email = next(m for m in result['matches'] if m['type'] == 'email')
+        
+        start, end = email['spans'][1]
+        self.assertEqual(self.text[start:end], 'ana@ejemplo.com')
+        start, end = email['byte_spans'][1]
+        self.assertEqual(self.text.encode('utf-8')[start:end], b'ana@ejemplo.com')
+        self.assertEqual(email['byte_spans'][0][0] - email['spans'][0][0], 1)
+    
+    def test_rejects_non_ascii_rules(self):
+        """Probar que las reglas no ASCII no se compilan como bytes"""
+        processor = Processor(Grammar({'animal': r'pingüino'}))
+        with self.assertRaises(ValueError):
+            processor.match_file(self.path)
+        with self.assertRaises(ValueError):
+            Processor(self.grammar).match_file(self.path, encoding='utf-16')
+
+
 class TestTextProcessor(unittest.TestCase):
     
     def setUp(self):
@@ -190,6 +1327,36 @@ class TestProcessor(unittest.TestCase):
         """Probar error con tipo inválido"""
         with self.assertRaises(ValueError):
             self.processor.process_input("test", "invalid_type")
+    
+    def test_process_batch_threads(self):
+        """Probar lote en hilos: orden conservado y errores por entrada"""
+        inputs = ["a test.", None, "an example!", "nothing"]
+        results = self.processor.process_batch(inputs, workers=2)
+        
+        self.assertEqual([r.get('text') for r in results], ["a test.", None, "an example!", "nothing"])
+        self.assertEqual(results[1]['error_type'], 'AttributeError')
+        self.assertEqual(results[2]['stats']['match_count'], 2)
+        self.assertIs(self.processor._pool('thread', 2), self.processor._pools['thread'])
+        self.assertEqual(self.processor._pool_size('thread'), 2)
+        self.processor._pool('thread', None)
+        self.assertEqual(self.processor._pool_size('thread'), min(32, (os.cpu_count() or 1) + 4))
+        self.processor.close()
+        
+        with self.assertRaises(ValueError):
+            self.processor.process_batch(inputs, executor='fiber')
+    
+    def test_process_batch_processes(self):
+        """Probar lote en procesos con una gramática CFG y métricas"""
+        grammar = Grammar({'start': '"a" "b"'}, type='cfg')
+        with Processor(grammar, instrumentation=True) as processor:
+            results = processor.process_batch(['ab', 'x', 42], workers=1, executor='process')
+            
+            self.assertEqual(results[0]['matches'][0]['matches'], ['ab'])
+            self.assertEqual(results[1]['matches'], [])
+            self.assertIn('error', results[2])
+            snapshot = processor.instrumentation.snapshot()
+            self.assertEqual(snapshot['errors'], {'text': 1})
+            self.assertEqual(snapshot['stages']['text']['total']['count'], 2)
 
 
 class TestIntegration(unittest.TestCase):